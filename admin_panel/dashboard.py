@@ -0,0 +1,141 @@
+"""
+Statistics for the admin dashboard.
+
+Every figure is computed with a fixed number of aggregate queries, so the
+cost does not grow with the number of students, and the whole block is
+cached for a short time so repeated visits to the admin home are served from
+the cache.
+"""
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from content.models import Question, StudyNote, Quiz
+from progress.models import UserProgress
+from subjects.models import Subject, ClassLevel, Topic
+from users.models import User
+
+DASHBOARD_STATS_KEY = 'admin_dashboard_stats'
+DASHBOARD_STATS_TIMEOUT = 60  # 1 minute
+GRADES = range(1, 13)  # Grades 1-12
+PASS_PERCENTAGE = 70
+
+
+def get_grade_progress():
+    """
+    Active users and average completion per grade.
+
+    A grade's average is the mean of its active subjects' averages, where a
+    subject's average is the mean completion of the progress rows on its
+    active class level for that grade (0 when nobody has started it).
+    """
+    active_users = dict(
+        User.objects.filter(is_active=True, current_class_level__in=GRADES)
+        .values_list('current_class_level')
+        .annotate(count=Count('id'))
+    )
+    if not active_users:
+        return []
+
+    # One active class level per subject and grade
+    class_levels = {}
+    for class_level_id, subject_id, level_number in ClassLevel.objects.filter(
+        is_active=True, subject__is_active=True, level_number__in=active_users
+    ).order_by('id').values_list('id', 'subject_id', 'level_number'):
+        class_levels.setdefault((subject_id, level_number), class_level_id)
+
+    subject_averages = dict(
+        UserProgress.objects.filter(class_level_id__in=class_levels.values(), total_topics__gt=0)
+        .values_list('class_level_id')
+        .annotate(avg=Avg(Cast('topics_completed', FloatField()) * 100 / F('total_topics')))
+    )
+
+    grade_totals = {}
+    for (subject_id, level_number), class_level_id in class_levels.items():
+        grade_totals.setdefault(level_number, []).append(subject_averages.get(class_level_id, 0))
+
+    grade_progress = []
+    for grade_num in GRADES:
+        if not active_users.get(grade_num):
+            continue
+        averages = grade_totals.get(grade_num, [])
+        avg_progress = sum(averages) / len(averages) if averages else 0
+        grade_progress.append({
+            'level_number': grade_num,
+            'active_users': active_users[grade_num],
+            'avg_progress': round(avg_progress, 1)
+        })
+    return grade_progress
+
+
+def compute_dashboard_stats():
+    """Statistics, content counts and grade progress shown on the admin home"""
+    today = timezone.now().date()
+    this_month = today.replace(day=1)
+
+    users = User.objects.aggregate(
+        total=Count('id'),
+        new_this_month=Count('id', filter=Q(date_joined__gte=this_month)),
+    )
+    questions = Question.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+    )
+    quizzes = Quiz.objects.aggregate(
+        total=Count('id'),
+        today=Count('id', filter=Q(started_at__date=today)),
+        completed=Count('id', filter=Q(is_completed=True)),
+        passed=Count('id', filter=Q(is_completed=True, percentage__gte=PASS_PERCENTAGE)),
+        avg_score=Avg('percentage', filter=Q(is_completed=True)),
+    )
+    completed_quizzes = quizzes['completed']
+    pass_rate = (quizzes['passed'] / completed_quizzes * 100) if completed_quizzes > 0 else 0
+
+    stats = {
+        'total_users': users['total'],
+        'new_users_this_month': users['new_this_month'],
+        'total_questions': questions['total'],
+        'active_questions': questions['active'],
+        'total_quizzes': quizzes['total'],
+        'quizzes_today': quizzes['today'],
+        'avg_score': round(quizzes['avg_score'] or 0, 1),
+        'pass_rate': round(pass_rate, 1),
+    }
+
+    # Content statistics
+    subjects_count = Subject.objects.count()
+    levels_count = ClassLevel.objects.count()
+    topics_count = Topic.objects.count()
+    materials_count = StudyNote.objects.count()
+    total_questions = questions['total']
+
+    max_count = max(subjects_count, levels_count, topics_count, total_questions, materials_count) or 1
+
+    content_stats = {
+        'subjects': subjects_count,
+        'levels': levels_count,
+        'topics': topics_count,
+        'questions': total_questions,
+        'materials': materials_count,
+        'levels_percentage': (levels_count / max_count) * 100,
+        'topics_percentage': (topics_count / max_count) * 100,
+        'questions_percentage': (total_questions / max_count) * 100,
+        'materials_percentage': (materials_count / max_count) * 100,
+    }
+
+    return {
+        'stats': stats,
+        'content_stats': content_stats,
+        'grade_progress': get_grade_progress(),
+    }
+
+
+def get_dashboard_stats():
+    """Dashboard statistics, cached for DASHBOARD_STATS_TIMEOUT seconds"""
+    dashboard_stats = cache.get(DASHBOARD_STATS_KEY)
+    if dashboard_stats is None:
+        dashboard_stats = compute_dashboard_stats()
+        cache.set(DASHBOARD_STATS_KEY, dashboard_stats, DASHBOARD_STATS_TIMEOUT)
+    return dashboard_stats
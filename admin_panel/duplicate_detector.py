@@ -3,25 +3,41 @@ Optimized duplicate detection system for large question datasets.
 Handles 50,000+ questions efficiently using advanced algorithms.
 """
 
-import re
 import hashlib
 from collections import defaultdict
 from difflib import SequenceMatcher
 from django.db import models
 from django.core.cache import cache
 from content.models import Question
+from .minhash import (
+    DEFAULT_BANDS, DEFAULT_MIN_JACCARD, MinHashLSH, estimate_similarity, load_signatures,
+    normalize_question_text, signature_values
+)
 import time
 
+ENGINES = ('minhash', 'sequence')
+
 
 class OptimizedDuplicateDetector:
     """
     High-performance duplicate detection system optimized for large datasets.
     Uses text hashing, chunking, and smart filtering to handle 50,000+ questions.
+
+    ``engine`` selects how near-duplicate candidates are found: 'minhash'
+    (default) looks them up in a MinHash LSH index across all questions,
+    'sequence' compares questions of the same length and word count.
+    ``lsh_bands`` and ``min_jaccard`` tune the recall of the MinHash engine.
     """
     
-    def __init__(self, similarity_threshold=0.95, chunk_size=1000):
+    def __init__(self, similarity_threshold=0.95, chunk_size=1000, engine='minhash', lsh_bands=DEFAULT_BANDS,
+                 min_jaccard=DEFAULT_MIN_JACCARD):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown duplicate detection engine: {engine}")
         self.similarity_threshold = similarity_threshold
         self.chunk_size = chunk_size
+        self.engine = engine
+        self.lsh_bands = lsh_bands
+        self.min_jaccard = min_jaccard
         self.processed_hashes = set()
         self.text_cache = {}
         
@@ -34,10 +50,7 @@ class OptimizedDuplicateDetector:
             return self.text_cache[text]
             
         # Clean text
-        cleaned = re.sub(r'<[^>]+>', '', text)  # Remove HTML
-        cleaned = re.sub(r'\s+', ' ', cleaned)  # Normalize whitespace
-        cleaned = re.sub(r'[^\w\s\?\!\.\,\;\:]', '', cleaned)  # Remove special chars
-        cleaned = cleaned.strip().lower()
+        cleaned = normalize_question_text(text)
         
         # Create multiple hash signatures for fast filtering
         words = cleaned.split()
@@ -122,7 +135,13 @@ class OptimizedDuplicateDetector:
         remaining_questions = [q for i, q in enumerate(processed_questions) if i not in processed_indices]
         
         if remaining_questions:
-            similarity_groups = self._find_similarity_groups(remaining_questions, progress_callback, 30, 90)
+            if self.engine == 'minhash':
+                signatures = load_signatures(remaining_questions, questions_queryset.values('id'))
+                similarity_groups = self._find_lsh_groups(
+                    remaining_questions, signatures, progress_callback, 30, 90
+                )
+            else:
+                similarity_groups = self._find_similarity_groups(remaining_questions, progress_callback, 30, 90)
             duplicate_groups.extend(similarity_groups)
         
         if progress_callback:
@@ -203,6 +222,61 @@ class OptimizedDuplicateDetector:
         
         return groups
 
+    def _is_similar(self, q1, q2):
+        if q1['char_hash'] == q2['char_hash']:
+            return True
+        matcher = SequenceMatcher(None, q1['cleaned_text'], q2['cleaned_text'])
+        # Cheap upper bounds first; ratio() is the expensive comparison
+        return (
+            matcher.real_quick_ratio() >= self.similarity_threshold
+            and matcher.quick_ratio() >= self.similarity_threshold
+            and matcher.ratio() >= self.similarity_threshold
+        )
+    
+    def _find_lsh_groups(self, questions, signatures, progress_callback, start_progress, end_progress):
+        """
+        Find similarity groups using the MinHash LSH index.
+        Each question is only compared with the questions sharing an LSH band,
+        whatever their length, so the work grows with the number of
+        candidates rather than with the square of the bucket sizes.
+        """
+        index = MinHashLSH(bands=self.lsh_bands)
+        values = []
+        for i, q in enumerate(questions):
+            index.add(i, signatures[q['id']])
+            values.append(signature_values(signatures[q['id']]))
+        
+        groups = []
+        processed = set()
+        total = len(questions)
+        
+        for idx1, q1 in enumerate(questions):
+            if progress_callback and idx1 % 1000 == 0:
+                progress = start_progress + (end_progress - start_progress) * idx1 / total
+                progress_callback(f"Analyzing similarities... {len(groups)} groups found", progress)
+            
+            if idx1 in processed:
+                continue
+            
+            group = [q1]
+            processed.add(idx1)
+            
+            # Candidates in list order, as in the sequence engine
+            for idx2 in sorted(index.candidates(signatures[q1['id']]) - processed):
+                q2 = questions[idx2]
+                if q1['char_hash'] != q2['char_hash'] and (
+                    estimate_similarity(values[idx1], values[idx2]) < self.min_jaccard
+                ):
+                    continue
+                if self._is_similar(q1, q2):
+                    group.append(q2)
+                    processed.add(idx2)
+            
+            if len(group) > 1:
+                groups.append(group)
+        
+        return groups
+
 
 class DuplicateDetector:
     """
@@ -0,0 +1,174 @@
+"""
+Streaming CSV exports for the admin panel.
+
+Rows are read with chunked ``iterator()`` cursors and written to the response
+as they are produced, so memory use stays flat no matter how many questions or
+users are exported. Per-row statistics are computed with subquery annotations
+instead of per-row queries. Passing ``?compress=gzip`` streams a gzipped file.
+"""
+
+import csv
+import zlib
+from collections import defaultdict
+
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+
+from content.models import Question, AnswerChoice, Quiz
+from progress.models import UserProgress
+from users.models import User
+
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per database round trip
+FLUSH_SIZE = 64 * 1024  # bytes buffered before a chunk is sent
+
+QUESTION_EXPORT_HEADER = [
+    'subject_name', 'class_level_name', 'topic_title', 'question_text', 'question_type',
+    'correct_answer', 'explanation', 'difficulty', 'points', 'time_limit',
+    'choice_a', 'choice_b', 'choice_c', 'choice_d'
+]
+
+USER_EXPORT_HEADER = [
+    'email', 'first_name', 'last_name', 'current_grade', 'date_joined',
+    'is_active', 'total_quizzes', 'average_score', 'subjects_completed'
+]
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows):
+    """Yield encoded CSV in chunks of roughly ``FLUSH_SIZE`` bytes"""
+    writer = csv.writer(Echo())
+    buffer = [writer.writerow(header)]
+    size = len(buffer[0])
+
+    for row in rows:
+        line = writer.writerow(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_gzip(chunks):
+    """Compress a byte stream incrementally into gzip format"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def csv_streaming_response(filename, header, rows, compress=False):
+    """Build a streaming CSV download, optionally gzipped"""
+    content = iter_csv(header, rows)
+    if compress:
+        response = StreamingHttpResponse(iter_gzip(content), content_type='application/gzip')
+        filename = f'{filename}.gz'
+    else:
+        response = StreamingHttpResponse(content, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+QUESTION_EXPORT_FIELDS = [
+    'id', 'topic__class_level__subject__name', 'topic__class_level__name', 'topic__title',
+    'question_text', 'question_type', 'correct_answer', 'explanation', 'difficulty', 'points', 'time_limit',
+]
+
+
+def export_questions_queryset():
+    """Active questions as flat value rows including their topic hierarchy"""
+    return Question.objects.filter(is_active=True).values_list(*QUESTION_EXPORT_FIELDS)
+
+
+def _iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_question_rows(questions=None):
+    """
+    Yield one CSV row per question.
+
+    Answer choices are fetched once per chunk of multiple choice questions,
+    already sorted by their display order.
+    """
+    questions = export_questions_queryset() if questions is None else questions
+
+    for chunk in _iter_chunks(questions.iterator(chunk_size=EXPORT_CHUNK_SIZE), EXPORT_CHUNK_SIZE):
+        choice_ids = [row[0] for row in chunk if row[5] == 'multiple_choice']
+        choices_by_question = defaultdict(list)
+        if choice_ids:
+            for question_id, choice_text in AnswerChoice.objects.filter(
+                question_id__in=choice_ids
+            ).order_by('question_id', 'order').values_list('question_id', 'choice_text'):
+                choices_by_question[question_id].append(choice_text)
+
+        for question_id, *fields in chunk:
+            # Up to four choices for multiple choice questions
+            choices = (choices_by_question.get(question_id, []) + ['', '', '', ''])[:4]
+            yield fields + choices
+
+
+def export_users_queryset():
+    """Non-staff users annotated with quiz and completion statistics"""
+    user_quizzes = Quiz.objects.filter(user=OuterRef('pk')).order_by().values('user')
+    completed_levels = UserProgress.objects.filter(
+        user=OuterRef('pk'),
+        is_completed=True
+    ).order_by().values('user')
+
+    return User.objects.filter(is_staff=False).annotate(
+        total_quizzes=Coalesce(
+            Subquery(user_quizzes.annotate(count=Count('id')).values('count'), output_field=IntegerField()),
+            Value(0)
+        ),
+        average_score=Subquery(user_quizzes.annotate(average=Avg('percentage')).values('average')),
+        subjects_completed=Coalesce(
+            Subquery(
+                completed_levels.annotate(count=Count('class_level__subject', distinct=True)).values('count'),
+                output_field=IntegerField()
+            ),
+            Value(0)
+        ),
+    ).order_by('date_joined').values_list(
+        'email', 'first_name', 'last_name', 'current_class_level', 'date_joined',
+        'is_active', 'total_quizzes', 'average_score', 'subjects_completed'
+    )
+
+
+def iter_user_rows(users=None):
+    """Yield one CSV row per user"""
+    users = export_users_queryset() if users is None else users
+
+    for (email, first_name, last_name, class_level, date_joined,
+         is_active, total_quizzes, average_score, subjects_completed) in users.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            email,
+            first_name,
+            last_name,
+            f'Grade {class_level}' if class_level else '',
+            date_joined.strftime('%Y-%m-%d'),
+            is_active,
+            total_quizzes,
+            round(average_score or 0, 1),
+            subjects_completed
+        ]
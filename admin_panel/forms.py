@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from subjects.models import Subject, ClassLevel, Topic
 from content.models import Question, AnswerChoice, StudyNote
@@ -413,7 +414,7 @@ class CSVImportForm(forms.Form):
             'class': 'form-control',
             'accept': '.csv'
         }),
-        help_text="Upload a CSV file with questions (max 5MB). Download the template first."
+        help_text="Upload a CSV file with questions. Download the template first."
     )
 
     target_class_levels = forms.MultipleChoiceField(
@@ -425,9 +426,10 @@ class CSVImportForm(forms.Form):
 
     def clean_csv_file(self):
         file = self.cleaned_data['csv_file']
+        max_upload_mb = settings.CSV_IMPORT_MAX_UPLOAD_MB
         try:
-            if hasattr(file, 'size') and file.size > 5 * 1024 * 1024:  # 5MB limit
-                raise forms.ValidationError("File size cannot exceed 5MB")
+            if hasattr(file, 'size') and file.size > max_upload_mb * 1024 * 1024:
+                raise forms.ValidationError(f"File size cannot exceed {max_upload_mb}MB")
         except (AttributeError, FileNotFoundError):
             # Skip size check for existing files
             pass
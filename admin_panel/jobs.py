@@ -0,0 +1,109 @@
+"""
+Background jobs submitted from the admin panel (see core/jobs.py).
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+
+from content.models import Question
+from core.jobs import JobCanceled, register_job
+from .duplicate_detector import OptimizedDuplicateDetector
+from .minhash import DEFAULT_BANDS, DEFAULT_MIN_JACCARD
+from .models import AdminActivity
+
+
+@register_job('detect_duplicates')
+def detect_duplicates(context, class_level=None, subject=None, similarity_threshold=0.85, engine='minhash',
+                      lsh_bands=DEFAULT_BANDS, min_jaccard=DEFAULT_MIN_JACCARD):
+    """Find groups of near-duplicate active questions"""
+    questions = Question.objects.select_related('topic__class_level__subject').filter(is_active=True)
+    if class_level:
+        questions = questions.filter(topic__class_level__level_number=class_level)
+    if subject:
+        questions = questions.filter(topic__class_level__subject_id=subject)
+
+    total_count = questions.count()
+    result = {
+        'success': True,
+        'duplicates': [],
+        'total_groups': 0,
+        'total_duplicates': 0,
+        'similarity_threshold': similarity_threshold,
+        'processing_time': 0,
+        'questions_analyzed': total_count,
+    }
+    if total_count < 2:
+        return result
+
+    detector = OptimizedDuplicateDetector(
+        similarity_threshold=similarity_threshold,
+        chunk_size=min(1000, total_count // 10 + 100),  # Dynamic chunk size
+        engine=engine,
+        lsh_bands=lsh_bands,
+        min_jaccard=min_jaccard
+    )
+
+    start_time = time.time()
+    duplicate_groups = detector.find_duplicates_optimized(questions, progress_callback=context.progress)
+    processing_time = time.time() - start_time
+
+    result.update({
+        'duplicates': duplicate_groups,
+        'total_groups': len(duplicate_groups),
+        'total_duplicates': sum(group['count'] for group in duplicate_groups),
+        'processing_time': round(processing_time, 2),
+        'performance_stats': {
+            'questions_per_second': round(total_count / processing_time, 2) if processing_time > 0 else 0,
+            'optimization_used': 'minhash_lsh' if engine == 'minhash' else 'hash_based_chunking'
+        },
+    })
+    return result
+
+
+def delete_import_upload(file_name, **params):
+    """Delete the stored upload once its import job has ended, whether or not it ran"""
+    default_storage.delete(file_name)
+
+
+@register_job('import_questions_csv', cleanup=delete_import_upload)
+def import_questions_csv(context, file_name, import_mode='strict', user_id=None, ip_address=None, user_agent=''):
+    """Import questions from an uploaded CSV file stored with store_upload"""
+    from core.utils.csv_import import CSVImporter
+
+    user = get_user_model().objects.filter(pk=user_id).first()
+    context.progress('Reading file...', 0, force=True)
+
+    start_time = time.time()
+    with default_storage.open(file_name, 'rb') as csv_file:
+        importer = CSVImporter('questions', csv_file, user, import_mode, progress_callback=context.progress)
+        try:
+            result = importer.import_data()
+        except JobCanceled:
+            if importer.log:
+                importer.log.add_error('Import canceled; questions imported before cancellation were kept')
+                importer.log.mark_completed(status='failed')
+            raise
+
+    import_duration = time.time() - start_time
+
+    result['import_duration'] = round(import_duration, 2)
+    result['questions_per_second'] = round(result.get('successful_rows', 0) / import_duration, 2) if import_duration > 0 else 0
+
+    if result['success']:
+        action = 'CSV_IMPORT'
+        description = f'Imported questions (Mode: {import_mode}): {result["successful_rows"]} successful, {result.get("skipped_rows", result["failed_rows"])} skipped/failed'
+    else:
+        action = 'CSV_IMPORT_FAILED'
+        description = f'Failed to import questions: {result["error"]}'
+    if user is not None:
+        AdminActivity.objects.create(
+            admin_user=user,
+            action=action,
+            description=description,
+            model_name='CSVImport',
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+    return result
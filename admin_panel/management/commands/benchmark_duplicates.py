@@ -0,0 +1,127 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_panel.duplicate_detector import OptimizedDuplicateDetector
+from admin_panel.minhash import DEFAULT_BANDS, DEFAULT_MIN_JACCARD, MinHashLSH, minhash_signature
+
+TEMPLATES = [
+    'What is the {0} of the {1} in {2}?',
+    'Which of these {0} is used to {1} a {2} {3}?',
+    'Explain why the {0} {1} before the {2} and the {3}.',
+    'How many {0} are needed to {1} the {2}?',
+    'Name the {0} that {1} {2} during {3} {4}.',
+    'The {0} of {1} is called the {2}. True or false?',
+    'Fill in the blank: a {0} {1} is a type of {2} {3} {4} {5}.',
+    'Which {0} best describes how {1} {2} the {3}?',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare the sequence and MinHash duplicate detection engines on a generated question corpus (in memory)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=100000, help='Questions to generate')
+        parser.add_argument(
+            '--sequence-sample', type=int, default=2000,
+            help='Questions given to the sequence engine, which is quadratic per bucket (0 to skip)'
+        )
+        parser.add_argument('--duplicate-rate', type=float, default=0.02, help='Share of questions that are near-duplicates')
+        parser.add_argument('--threshold', type=float, default=0.85, help='Similarity threshold')
+        parser.add_argument('--bands', type=int, default=DEFAULT_BANDS, help='LSH bands for the MinHash engine')
+        parser.add_argument(
+            '--min-jaccard', type=float, default=DEFAULT_MIN_JACCARD,
+            help='Estimated Jaccard similarity below which MinHash candidates are skipped'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the generated corpus')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        texts, planted = self.generate(rng, options['questions'], options['duplicate_rate'])
+        self.stdout.write(f"Generated {len(texts):,} questions with {len(planted):,} planted near-duplicates")
+
+        detector = OptimizedDuplicateDetector(
+            similarity_threshold=options['threshold'], lsh_bands=options['bands'], min_jaccard=options['min_jaccard']
+        )
+        questions = []
+        for i, text in enumerate(texts):
+            cleaned, word_hash, char_hash, length_bucket = detector.clean_and_hash_text(text)
+            questions.append({
+                'id': i,
+                'cleaned_text': cleaned,
+                'char_hash': char_hash,
+                'length_bucket': length_bucket,
+                'word_count': len(cleaned.split()),
+            })
+
+        start = time.perf_counter()
+        signatures = {q['id']: minhash_signature(q['cleaned_text']) for q in questions}
+        signature_time = time.perf_counter() - start
+        index = MinHashLSH(bands=detector.lsh_bands)
+        self.stdout.write(
+            f"Signatures: {signature_time:.2f}s ({signature_time / len(questions) * 1000:.3f} ms/question), "
+            f"computed once and updated on save"
+        )
+        self.stdout.write(
+            f"LSH: {index.bands} bands x {index.rows} rows, candidate threshold ~{index.threshold:.2f} Jaccard, "
+            f"candidates below {detector.min_jaccard:.2f} estimated Jaccard skipped"
+        )
+
+        sample_size = min(options['sequence_sample'], len(questions))
+        if sample_size:
+            sample = questions[:sample_size]
+            sample_planted = [pair for pair in planted if pair[1] < sample_size]
+            self.stdout.write(f"\nSample of {sample_size:,} questions:")
+            self.run('sequence', lambda: detector._find_similarity_groups(sample, None, 0, 100), sample_planted)
+            self.run('minhash', lambda: detector._find_lsh_groups(sample, signatures, None, 0, 100), sample_planted)
+
+        self.stdout.write(f"\nAll {len(questions):,} questions:")
+        self.run('minhash', lambda: detector._find_lsh_groups(questions, signatures, None, 0, 100), planted)
+
+    def run(self, engine, find_groups, planted):
+        start = time.perf_counter()
+        groups = find_groups()
+        self.report(engine, groups, planted, time.perf_counter() - start)
+
+    def generate(self, rng, count, duplicate_rate):
+        vocabulary = [
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(20000)
+        ]
+        texts = []
+        planted = []
+        while len(texts) < count:
+            if texts and rng.random() < duplicate_rate:
+                # Near-duplicate of an earlier question: one word replaced, added or removed
+                original = rng.randrange(len(texts))
+                words = texts[original].split(' ')
+                position = rng.randrange(1, len(words))
+                edit = rng.choice(['replace', 'insert', 'delete'])
+                if edit == 'replace':
+                    words[position] = rng.choice(vocabulary)
+                elif edit == 'insert':
+                    words.insert(position, rng.choice(vocabulary))
+                elif len(words) > 4:
+                    del words[position]
+                planted.append((original, len(texts)))
+                texts.append(' '.join(words))
+            else:
+                template = rng.choice(TEMPLATES)
+                texts.append(template.format(*(rng.choice(vocabulary) for _ in range(6))))
+        return texts, planted
+
+    def report(self, engine, groups, planted, elapsed):
+        group_of = {}
+        for number, group in enumerate(groups):
+            for question in group:
+                group_of[question['id']] = number
+        found = sum(
+            1 for original, duplicate in planted
+            if original in group_of and group_of[original] == group_of.get(duplicate)
+        )
+        recall = found / len(planted) * 100 if planted else 100
+        self.stdout.write(
+            f"{engine:>9}: {elapsed:8.2f}s, {len(groups):,} groups, "
+            f"{found:,}/{len(planted):,} planted near-duplicates found ({recall:.1f}% recall)"
+        )
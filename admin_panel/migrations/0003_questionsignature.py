@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0002_initial'),
+        ('content', '0004_merge_20250713_0137'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSignature',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='minhash_signature', serialize=False, to='content.question')),
+                ('text_hash', models.CharField(help_text='Hash of the text and settings the signature was built from', max_length=32)),
+                ('signature', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Question Signature',
+                'verbose_name_plural': 'Question Signatures',
+                'db_table': 'admin_question_signatures',
+            },
+        ),
+    ]
@@ -0,0 +1,168 @@
+"""
+MinHash signatures and an LSH index for near-duplicate question detection.
+
+Each question's cleaned text is split into overlapping character shingles
+and summarised by a fixed-size MinHash signature; two signatures agree in
+roughly the same share of positions as the texts' shingle sets overlap
+(Jaccard similarity). The LSH index cuts signatures into bands and buckets
+questions by band, so only questions sharing at least one band are compared.
+With ``bands`` bands of ``rows`` rows, pairs above about
+``(1 / bands) ** (1 / rows)`` Jaccard similarity become candidates; more bands
+raise recall at the cost of more candidate comparisons. Candidates whose
+signatures estimate a Jaccard similarity below ``min_jaccard`` are dropped
+before the exact text comparison.
+
+Signatures are stored in QuestionSignature, refreshed when a question is
+saved or imported, and recomputed lazily for rows whose text changed.
+"""
+
+import hashlib
+import re
+from array import array
+from collections import defaultdict
+from operator import eq
+
+SHINGLE_SIZE = 4  # characters per shingle
+NUM_PERMUTATIONS = 120  # divisible into 10, 12, 15, 20, 24, 30 or 40 bands
+DEFAULT_BANDS = 20  # 6 rows per band, candidate threshold about 0.61 Jaccard
+DEFAULT_MIN_JACCARD = 0.5  # candidates estimated below this are not compared
+
+
+def normalize_question_text(text):
+    """Strip HTML and special characters, collapse whitespace and lower-case"""
+    text = re.sub(r'<[^>]+>', '', text)  # Remove HTML
+    text = re.sub(r'\s+', ' ', text)  # Normalize whitespace
+    text = re.sub(r'[^\w\s\?\!\.\,\;\:]', '', text)  # Remove special chars
+    return text.strip().lower()
+
+
+def shingles(cleaned_text, size=SHINGLE_SIZE):
+    """Overlapping character shingles of a cleaned text"""
+    if len(cleaned_text) <= size:
+        return {cleaned_text}
+    return {cleaned_text[i:i + size] for i in range(len(cleaned_text) - size + 1)}
+
+
+def minhash_signature(cleaned_text):
+    """
+    MinHash signature of a cleaned text as bytes.
+
+    Each shingle is expanded by SHAKE-128 into NUM_PERMUTATIONS independent
+    32-bit hash values, and the signature keeps the minimum of each across
+    all shingles.
+    """
+    digest_size = NUM_PERMUTATIONS * 4
+    hashes = [
+        array('I', hashlib.shake_128(shingle.encode()).digest(digest_size))
+        for shingle in shingles(cleaned_text)
+    ]
+    return array('I', map(min, zip(*hashes))).tobytes()
+
+
+def signature_text_hash(cleaned_text):
+    """Identifies the text and settings a stored signature was computed from"""
+    return hashlib.md5(f'{NUM_PERMUTATIONS}:{SHINGLE_SIZE}:{cleaned_text}'.encode()).hexdigest()
+
+
+def signature_values(signature):
+    """Hash values of a stored signature"""
+    return array('I', signature)
+
+
+def estimate_similarity(values_a, values_b):
+    """Estimated Jaccard similarity from two signatures' hash values"""
+    return sum(map(eq, values_a, values_b)) / len(values_a)
+
+
+class MinHashLSH:
+    """In-memory LSH index over MinHash signatures"""
+
+    def __init__(self, bands=DEFAULT_BANDS):
+        if not 0 < bands <= NUM_PERMUTATIONS:
+            raise ValueError(f"bands must be between 1 and {NUM_PERMUTATIONS}")
+        self.bands = bands
+        self.rows = NUM_PERMUTATIONS // bands
+        self._band_width = self.rows * array('I').itemsize
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+
+    @property
+    def threshold(self):
+        """Jaccard similarity at which a pair has about even odds of becoming a candidate"""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def _band_keys(self, signature):
+        width = self._band_width
+        return [signature[band * width:(band + 1) * width] for band in range(self.bands)]
+
+    def add(self, key, signature):
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets[band_key].append(key)
+
+    def candidates(self, signature):
+        """Keys sharing at least one band with ``signature``"""
+        found = set()
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            found.update(buckets.get(band_key, ()))
+        return found
+
+
+def load_signatures(questions, id_queryset=None):
+    """
+    Signatures for ``questions`` (dicts with ``id`` and ``cleaned_text``).
+
+    Stored signatures are read in one query, restricted to ``id_queryset``
+    when given; missing or stale ones are computed and saved in bulk.
+    """
+    from .models import QuestionSignature
+
+    stored = QuestionSignature.objects.all()
+    if id_queryset is not None:
+        stored = stored.filter(question_id__in=id_queryset)
+    stored = {
+        question_id: (text_hash, bytes(signature))
+        for question_id, text_hash, signature in stored.values_list('question_id', 'text_hash', 'signature')
+    }
+
+    signatures = {}
+    refreshed = []
+    for question in questions:
+        text_hash = signature_text_hash(question['cleaned_text'])
+        current = stored.get(question['id'])
+        if current and current[0] == text_hash:
+            signatures[question['id']] = current[1]
+            continue
+        signature = minhash_signature(question['cleaned_text'])
+        signatures[question['id']] = signature
+        refreshed.append(QuestionSignature(question_id=question['id'], text_hash=text_hash, signature=signature))
+
+    if refreshed:
+        save_signatures(refreshed)
+    return signatures
+
+
+def save_signatures(signatures):
+    from .models import QuestionSignature
+
+    QuestionSignature.objects.bulk_create(
+        signatures,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['question'],
+        update_fields=['text_hash', 'signature', 'updated_at'],
+    )
+
+
+def index_questions(questions):
+    """Store signatures for saved or imported Question instances"""
+    from .models import QuestionSignature
+
+    rows = []
+    for question in questions:
+        cleaned = normalize_question_text(question.question_text)
+        rows.append(QuestionSignature(
+            question_id=question.pk,
+            text_hash=signature_text_hash(cleaned),
+            signature=minhash_signature(cleaned),
+        ))
+    if rows:
+        save_signatures(rows)
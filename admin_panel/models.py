@@ -3,6 +3,8 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from datetime import time
 
+from core.utils.settings_snapshot import SettingsSnapshot
+
 
 class SiteSettings(models.Model):
     """
@@ -230,7 +232,12 @@ class SiteSettings(models.Model):
 
     @classmethod
     def get_settings(cls):
-        """Get the current site settings, create default if none exist"""
+        """Get the current site settings from the process-local snapshot"""
+        return site_settings_snapshot.get()
+
+    @classmethod
+    def load_settings(cls):
+        """Get the current site settings from the database, create default if none exist"""
         settings, created = cls.objects.get_or_create(
             pk=cls.objects.first().pk if cls.objects.exists() else uuid.uuid4()
         )
@@ -241,6 +248,15 @@ class SiteSettings(models.Model):
         if not self.pk and SiteSettings.objects.exists():
             self.pk = SiteSettings.objects.first().pk
         super().save(*args, **kwargs)
+        site_settings_snapshot.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        site_settings_snapshot.invalidate()
+        return result
+
+
+site_settings_snapshot = SettingsSnapshot(SiteSettings, SiteSettings.load_settings)
 
 
 class AdminActivity(models.Model):
@@ -267,4 +283,23 @@ class AdminActivity(models.Model):
         return f"{self.admin_user.full_name} - {self.action} - {self.timestamp}"
 
 
+class QuestionSignature(models.Model):
+    """
+    Stored MinHash signature of a question's text, used by the duplicate detector
+    """
+    question = models.OneToOneField(
+        'content.Question', on_delete=models.CASCADE, primary_key=True, related_name='minhash_signature'
+    )
+    text_hash = models.CharField(max_length=32, help_text="Hash of the text and settings the signature was built from")
+    signature = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'admin_question_signatures'
+        verbose_name = 'Question Signature'
+        verbose_name_plural = 'Question Signatures'
+
+    def __str__(self):
+        return f"Signature for {self.question_id}"
+
 # CSVImportLog is already defined in core.models, so we'll use that one
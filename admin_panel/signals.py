@@ -0,0 +1,30 @@
+"""
+Signal handlers for the admin panel app
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from content.models import Question
+from .minhash import index_questions, normalize_question_text, signature_text_hash
+from .models import QuestionSignature
+
+
+@receiver(post_save, sender=Question)
+def update_question_signature(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Keep the duplicate detector's signature in step with the question text"""
+    if raw or (update_fields is not None and 'question_text' not in update_fields):
+        return
+
+    stored_text = getattr(instance, '_stored_question_text', None)
+    if instance.question_text == stored_text:
+        # Unchanged since the question was loaded
+        return
+    if created or stored_text is not None:
+        index_questions([instance])
+    else:
+        # Saved without being loaded first, so compare with the stored signature
+        text_hash = signature_text_hash(normalize_question_text(instance.question_text))
+        if not QuestionSignature.objects.filter(question_id=instance.pk, text_hash=text_hash).exists():
+            index_questions([instance])
+    instance._stored_question_text = instance.question_text
@@ -1,3 +1,327 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import tempfile
+import tracemalloc
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from content.models import Question, AnswerChoice, Quiz
+from core.jobs import submit_job
+from core.models import BackgroundJob
+from core.utils.csv_import import store_upload
+from progress.models import UserProgress
+from subjects.models import Subject, ClassLevel, Topic
+from .dashboard import compute_dashboard_stats, get_dashboard_stats
+from .duplicate_detector import OptimizedDuplicateDetector
+from .exports import QUESTION_EXPORT_HEADER, iter_csv, iter_question_rows, iter_user_rows
+from .minhash import estimate_similarity, minhash_signature, normalize_question_text, shingles, signature_values
+from .models import QuestionSignature
+
+
+@override_settings(ANALYTICS_BUFFER_ENABLED=False)
+class StreamingExportTestCase(TestCase):
+    """Test cases for the streaming CSV exports"""
+
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_user(email='admin@test.com', password='testpass123', is_staff=True)
+
+        self.subject = Subject.objects.create(name='Mathematics')
+        self.class_level = ClassLevel.objects.create(subject=self.subject, name='Grade 5', level_number=5)
+        self.topic = Topic.objects.create(class_level=self.class_level, title='Fractions', order=1)
+
+        question = Question.objects.create(
+            topic=self.topic,
+            question_text='1/2 + 1/2?',
+            question_type='multiple_choice',
+            correct_answer='1'
+        )
+        # Created out of order to check the export sorts choices
+        AnswerChoice.objects.create(question=question, choice_text='2', order=1)
+        AnswerChoice.objects.create(question=question, choice_text='1', is_correct=True, order=0)
+
+        self.learner = User.objects.create_user(email='learner@test.com', password='testpass123', current_class_level=5)
+        Quiz.objects.create(topic=self.topic, user=self.learner, percentage=80)
+        Quiz.objects.create(topic=self.topic, user=self.learner, percentage=60)
+        UserProgress.objects.create(user=self.learner, class_level=self.class_level, is_completed=True)
+
+    def read_csv(self, response):
+        content = b''.join(response.streaming_content)
+        if response['Content-Type'] == 'application/gzip':
+            content = gzip.decompress(content)
+        return list(csv.reader(io.StringIO(content.decode('utf-8'))))
+
+    def test_question_export_streams_rows(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin_panel:export_questions'))
+
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0], QUESTION_EXPORT_HEADER)
+        self.assertEqual(rows[1][:3], ['Mathematics', 'Grade 5', 'Fractions'])
+        self.assertEqual(rows[1][10:], ['1', '2', '', ''])
+
+    def test_user_export_uses_annotations(self):
+        with self.assertNumQueries(1):
+            rows = list(iter_user_rows())
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][0], 'learner@test.com')
+        self.assertEqual(rows[0][3], 'Grade 5')
+        self.assertEqual(rows[0][6:], [2, 70.0, 1])
+
+    def test_gzip_export(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin_panel:export_users'), {'compress': 'gzip'})
+
+        self.assertIn('users_export.csv.gz', response['Content-Disposition'])
+        rows = self.read_csv(response)
+        self.assertEqual(rows[1][0], 'learner@test.com')
+
+    def test_question_export_memory_is_bounded(self):
+        """Exporting 100k questions never holds more than a few chunks in memory"""
+        Question.objects.bulk_create([
+            Question(
+                topic=self.topic,
+                question_text=f'What is {number} + {number}? ' + 'x' * 100,
+                question_type='fill_blank',
+                correct_answer=str(number * 2)
+            )
+            for number in range(100000)
+        ], batch_size=5000)
+
+        exported_bytes = 0
+        tracemalloc.start()
+        try:
+            for chunk in iter_csv(QUESTION_EXPORT_HEADER, iter_question_rows()):
+                exported_bytes += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # The export itself is ~15 MB; the peak stays a small fraction of it
+        self.assertGreater(exported_bytes, 10 * 1024 * 1024)
+        self.assertLess(peak, exported_bytes / 4)
+
+
+class DashboardStatsTestCase(TestCase):
+    """Test cases for the aggregated admin dashboard statistics"""
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        math = Subject.objects.create(name='Mathematics')
+        science = Subject.objects.create(name='Science')
+        self.math_level = ClassLevel.objects.create(subject=math, name='Grade 5', level_number=5)
+        self.science_level = ClassLevel.objects.create(subject=science, name='Grade 5', level_number=5)
+        ClassLevel.objects.create(subject=math, name='Grade 6', level_number=6)
+
+        for number, completed in enumerate([2, 4]):
+            learner = User.objects.create_user(
+                email=f'learner{number}@test.com', password='testpass123', current_class_level=5
+            )
+            UserProgress.objects.create(
+                user=learner, class_level=self.math_level, topics_completed=completed, total_topics=4
+            )
+        # Rows without topics do not count towards the average
+        UserProgress.objects.create(user=learner, class_level=self.science_level, total_topics=0)
+
+    def test_grade_progress(self):
+        stats = compute_dashboard_stats()
+
+        # Mathematics averages 75%, Science has no progress and counts as 0%
+        self.assertEqual(stats['grade_progress'], [{'level_number': 5, 'active_users': 2, 'avg_progress': 37.5}])
+        self.assertEqual(stats['stats']['total_users'], 2)
+        self.assertEqual(stats['content_stats']['levels'], 3)
+
+    def test_query_count_does_not_grow_with_students(self):
+        with CaptureQueriesContext(connection) as baseline:
+            compute_dashboard_stats()
+
+        User = get_user_model()
+        for number in range(10):
+            learner = User.objects.create_user(
+                email=f'extra{number}@test.com', password='testpass123', current_class_level=6 + number % 3
+            )
+            UserProgress.objects.create(user=learner, class_level=self.math_level, topics_completed=1, total_topics=4)
+
+        with self.assertNumQueries(len(baseline)):
+            compute_dashboard_stats()
+
+    def test_stats_are_cached(self):
+        get_dashboard_stats()
+
+        with self.assertNumQueries(0):
+            stats = get_dashboard_stats()
+
+        self.assertEqual(stats['stats']['total_users'], 2)
+
+
+@override_settings(ANALYTICS_BUFFER_ENABLED=False)
+class MinHashDuplicateTestCase(TestCase):
+    """Test cases for MinHash near-duplicate detection"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(email='admin@test.com', password='testpass123', is_staff=True)
+        subject = Subject.objects.create(name='Science')
+        class_level = ClassLevel.objects.create(subject=subject, name='Grade 6', level_number=6)
+        self.topic = Topic.objects.create(class_level=class_level, title='Plants', order=1)
+
+    def create_question(self, text):
+        return Question.objects.create(
+            topic=self.topic, question_text=text, question_type='short_answer', correct_answer='leaves'
+        )
+
+    def test_signature_follows_question_text(self):
+        question = self.create_question('Which part of the plant makes food for the plant?')
+        signature = QuestionSignature.objects.get(question=question)
+
+        question.question_text = 'Which part of the plant absorbs water from the soil?'
+        question.save()
+
+        updated = QuestionSignature.objects.get(question=question)
+        self.assertNotEqual(updated.text_hash, signature.text_hash)
+        self.assertEqual(
+            bytes(updated.signature), minhash_signature(normalize_question_text(question.question_text))
+        )
+
+    def test_unchanged_text_skips_the_signature(self):
+        self.create_question('Which part of the plant makes food for the plant?')
+        question = Question.objects.get()
+
+        question.is_active = False
+        with CaptureQueriesContext(connection) as queries:
+            question.save()
+
+        self.assertFalse([query for query in queries if 'admin_question_signatures' in query['sql']])
+
+    def test_signature_estimates_jaccard_similarity(self):
+        a = normalize_question_text('Which part of the green plant makes food using sunlight and water?')
+        b = normalize_question_text('Which part of the green plant makes food using sunlight and air?')
+        exact = len(shingles(a) & shingles(b)) / len(shingles(a) | shingles(b))
+
+        estimate = estimate_similarity(
+            signature_values(minhash_signature(a)), signature_values(minhash_signature(b))
+        )
+
+        self.assertAlmostEqual(estimate, exact, delta=0.15)
+
+    def test_near_duplicate_with_extra_word(self):
+        original = self.create_question('Which part of the plant makes food for the whole plant?')
+        near_duplicate = self.create_question('Which part of the green plant makes food for the whole plant?')
+        self.create_question('How many legs does an insect have?')
+        questions = Question.objects.filter(topic=self.topic)
+
+        sequence_groups = OptimizedDuplicateDetector(0.85, engine='sequence').find_duplicates_optimized(questions)
+        minhash_groups = OptimizedDuplicateDetector(0.85).find_duplicates_optimized(questions)
+
+        self.assertEqual(sequence_groups, [])
+        self.assertEqual(len(minhash_groups), 1)
+        self.assertEqual({q['id'] for q in minhash_groups[0]['questions']}, {original.id, near_duplicate.id})
+
+    def test_missing_signatures_are_filled_lazily(self):
+        Question.objects.bulk_create([
+            Question(topic=self.topic, question_text='Name the gas that plants take in from the air.'),
+            Question(topic=self.topic, question_text='Name the gas that plants take in from the air today.'),
+        ])
+        self.assertEqual(QuestionSignature.objects.count(), 0)
+
+        groups = OptimizedDuplicateDetector(0.85).find_duplicates_optimized(Question.objects.all())
+
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(QuestionSignature.objects.count(), 2)
+
+    def test_unknown_engine_is_rejected(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.post(
+            reverse('admin_panel:api_detect_duplicates'), data='{"engine": "fuzzy"}', content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    ANALYTICS_BUFFER_ENABLED=False, BACKGROUND_JOBS_EAGER=True,
+    MEDIA_ROOT=os.path.join(tempfile.gettempdir(), 'pentora-test-media')
+)
+class AdminBackgroundJobTestCase(TestCase):
+    """Test cases for duplicate detection and CSV import running as background jobs"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(email='admin@test.com', password='testpass123', is_staff=True)
+        subject = Subject.objects.create(name='Science')
+        class_level = ClassLevel.objects.create(subject=subject, name='Grade 6', level_number=6)
+        self.topic = Topic.objects.create(class_level=class_level, title='Plants', order=1)
+        self.client.force_login(self.admin)
+
+    def test_detect_duplicates_returns_pollable_job(self):
+        for text in ['Which part of the plant makes food?', 'Which part of the plant makes food?!']:
+            Question.objects.create(topic=self.topic, question_text=text, question_type='short_answer', correct_answer='leaves')
+
+        response = self.client.post(
+            reverse('admin_panel:api_detect_duplicates'), data='{"similarity_threshold": 0.85}',
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+
+        job = self.client.get(response.json()['status_url']).json()['job']
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['progress'], 100)
+        self.assertEqual(job['result']['total_groups'], 1)
+        self.assertEqual(job['result']['questions_analyzed'], 2)
+
+    def test_csv_import_runs_as_job(self):
+        csv_file = io.StringIO()
+        writer = csv.writer(csv_file)
+        writer.writerow(['subject_name', 'class_level_name', 'topic_title', 'question_text', 'question_type', 'correct_answer'])
+        writer.writerow(['Science', 'Grade 6', 'Plants', 'What do roots absorb from the soil?', 'short_answer', 'water'])
+        upload = SimpleUploadedFile('questions.csv', csv_file.getvalue().encode(), content_type='text/csv')
+
+        response = self.client.post(reverse('admin_panel:csv_import'), {
+            'action': 'import', 'csv_file': upload, 'target_class_levels': ['6'], 'import_mode': 'strict',
+        })
+
+        self.assertRedirects(response, reverse('admin_panel:csv_import'), fetch_redirect_response=False)
+        job = BackgroundJob.objects.get(job_type='import_questions_csv')
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.result['successful_rows'], 1)
+        self.assertTrue(job.params['file_name'].startswith('imports/csv/'))
+        self.assertFalse(default_storage.exists(job.params['file_name']))
+        self.assertTrue(Question.objects.filter(question_text='What do roots absorb from the soil?').exists())
+
+    def test_finished_job_cannot_be_canceled(self):
+        job = submit_job('detect_duplicates', user=self.admin)
+
+        response = self.client.post(reverse('admin_panel:api_job_cancel', args=[job.pk]))
+
+        self.assertEqual(response.status_code, 409)
+
+    @override_settings(BACKGROUND_JOBS_EAGER=False)
+    def test_canceled_import_deletes_stored_upload(self):
+        upload = SimpleUploadedFile('questions.csv', b'subject_name\nScience\n', content_type='text/csv')
+        file_name = store_upload(upload)
+        job = submit_job('import_questions_csv', {'file_name': file_name}, user=self.admin)
+
+        response = self.client.post(reverse('admin_panel:api_job_cancel', args=[job.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(default_storage.exists(file_name))
+
+    @override_settings(BACKGROUND_JOBS_EAGER=False)
+    def test_queued_job_reports_missing_worker(self):
+        job = submit_job('detect_duplicates', user=self.admin)
+
+        data = self.client.get(reverse('admin_panel:api_job_status', args=[job.pk])).json()
+
+        self.assertEqual(data['job']['status'], 'queued')
+        self.assertFalse(data['workers_available'])
+        self.assertIn('No job worker is running', data['warning'])
@@ -70,6 +70,9 @@ urlpatterns = [
     path('api/levels/', views.LevelsAPIView.as_view(), name='api_levels'),
     path('api/topics/', views.TopicsAPIView.as_view(), name='api_topics'),
     path('api/questions/', views.QuestionsAPIView.as_view(), name='api_questions'),
+    path('api/cache/stats/', views.CacheStatsAPIView.as_view(), name='api_cache_stats'),
     path('api/duplicates/detect/', views.DetectDuplicatesAPIView.as_view(), name='api_detect_duplicates'),
     path('api/duplicates/delete/', views.DeleteDuplicatesAPIView.as_view(), name='api_delete_duplicates'),
+    path('api/jobs/<uuid:job_id>/', views.JobStatusAPIView.as_view(), name='api_job_status'),
+    path('api/jobs/<uuid:job_id>/cancel/', views.CancelJobAPIView.as_view(), name='api_job_cancel'),
 ]
@@ -1,7 +1,7 @@
-import csv
 import io
 from datetime import datetime, timedelta
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth import authenticate, login
 from django.contrib import messages
@@ -11,16 +11,20 @@ from django.db.models import Count, Avg, Q, Min
 from django.db import models
 from django.utils import timezone
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 
 from subjects.models import Subject, ClassLevel, Topic
 from content.models import Question, AnswerChoice, StudyNote, Quiz
 from users.models import User
-from progress.models import UserProgress
 from analytics.models import PageVisit, UserActivity, SystemPerformanceMetrics
 from analytics.utils import business_intelligence
+from .dashboard import get_dashboard_stats
+from .duplicate_detector import ENGINES as DUPLICATE_ENGINES
+from .minhash import DEFAULT_BANDS, DEFAULT_MIN_JACCARD
 from .models import SiteSettings, AdminActivity
-from core.models import CSVImportLog
+from core.jobs import NO_WORKER_MESSAGE, cancel_job, submit_job, workers_available
+from core.models import BackgroundJob, CSVImportLog
+import logging
 import os
 import re
 from difflib import SequenceMatcher
@@ -38,6 +42,8 @@ from .forms import (
     CSVImportForm, UserEditForm
 )
 
+logger = logging.getLogger('Pentora')
+
 
 class AdminLoginView(View):
     """Custom admin login view"""
@@ -120,120 +126,8 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Get statistics
-        total_users = User.objects.count()
-        total_questions = Question.objects.count()
-        total_quizzes = Quiz.objects.count()
-
-        # Calculate date ranges
-        today = timezone.now().date()
-        this_month = today.replace(day=1)
-
-        # User stats
-        new_users_this_month = User.objects.filter(date_joined__gte=this_month).count()
-
-        # Question stats
-        active_questions = Question.objects.filter(is_active=True).count()
-
-        # Quiz stats
-        quizzes_today = Quiz.objects.filter(started_at__date=today).count()
-        avg_score = Quiz.objects.filter(is_completed=True).aggregate(
-            avg=Avg('percentage')
-        )['avg'] or 0
-
-        # Pass rate
-        passed_quizzes = Quiz.objects.filter(is_completed=True, percentage__gte=70).count()
-        completed_quizzes = Quiz.objects.filter(is_completed=True).count()
-        pass_rate = (passed_quizzes / completed_quizzes * 100) if completed_quizzes > 0 else 0
-
-        context['stats'] = {
-            'total_users': total_users,
-            'new_users_this_month': new_users_this_month,
-            'total_questions': total_questions,
-            'active_questions': active_questions,
-            'total_quizzes': total_quizzes,
-            'quizzes_today': quizzes_today,
-            'avg_score': round(avg_score, 1),
-            'pass_rate': round(pass_rate, 1),
-        }
-
-        # Content statistics
-        subjects_count = Subject.objects.count()
-        levels_count = ClassLevel.objects.count()
-        topics_count = Topic.objects.count()
-        materials_count = StudyNote.objects.count()
-
-        max_count = max(subjects_count, levels_count, topics_count, total_questions, materials_count) or 1
-
-        context['content_stats'] = {
-            'subjects': subjects_count,
-            'levels': levels_count,
-            'topics': topics_count,
-            'questions': total_questions,
-            'materials': materials_count,
-            'levels_percentage': (levels_count / max_count) * 100,
-            'topics_percentage': (topics_count / max_count) * 100,
-            'questions_percentage': (total_questions / max_count) * 100,
-            'materials_percentage': (materials_count / max_count) * 100,
-        }
-
-        # Learning progress by grade (for the new dashboard)
-        grade_progress = []
-        for grade_num in range(1, 13):  # Grades 1-12
-            # Count active users in this grade
-            active_users = User.objects.filter(
-                current_class_level=grade_num,
-                is_active=True
-            ).count()
-
-            if active_users > 0:
-                # Calculate average progress for this grade
-                grade_subjects = Subject.objects.filter(
-                    classlevels__level_number=grade_num,
-                    is_active=True
-                ).distinct()
-
-                total_progress = 0
-                progress_count = 0
-
-                for subject in grade_subjects:
-                    try:
-                        class_level = ClassLevel.objects.get(
-                            subject=subject,
-                            level_number=grade_num,
-                            is_active=True
-                        )
-
-                        # Get average progress for this subject in this grade
-                        # Calculate completion percentage manually since it's a property
-                        user_progresses = UserProgress.objects.filter(class_level=class_level)
-                        if user_progresses.exists():
-                            total_percentage = 0
-                            count = 0
-                            for up in user_progresses:
-                                if up.total_topics > 0:
-                                    percentage = (up.topics_completed / up.total_topics) * 100
-                                    total_percentage += percentage
-                                    count += 1
-                            subject_progress = total_percentage / count if count > 0 else 0
-                        else:
-                            subject_progress = 0
-
-                        total_progress += subject_progress
-                        progress_count += 1
-
-                    except ClassLevel.DoesNotExist:
-                        continue
-
-                avg_progress = (total_progress / progress_count) if progress_count > 0 else 0
-
-                grade_progress.append({
-                    'level_number': grade_num,
-                    'active_users': active_users,
-                    'avg_progress': round(avg_progress, 1)
-                })
-
-        context['grade_progress'] = grade_progress
+        # Statistics, content counts and grade progress (cached briefly)
+        context.update(get_dashboard_stats())
 
         # Site settings
         context['settings'] = SiteSettings.get_settings()
@@ -896,6 +790,12 @@ class CSVImportView(AdminRequiredMixin, TemplateView):
             imported_by=self.request.user,
             import_type='questions'
         ).order_by('-started_at')[:10]
+        context['max_upload_mb'] = settings.CSV_IMPORT_MAX_UPLOAD_MB
+        context['import_jobs'] = BackgroundJob.objects.filter(
+            created_by=self.request.user,
+            job_type='import_questions_csv'
+        ).order_by('-created_at')[:5]
+        context['workers_available'] = workers_available()
 
         # Import instructions
         from core.utils.csv_samples import get_import_instructions
@@ -939,54 +839,25 @@ class CSVImportView(AdminRequiredMixin, TemplateView):
                 'error': 'Please upload a CSV file'
             })
 
-        if csv_file.size > 5 * 1024 * 1024:  # 5MB limit
+        max_upload_mb = settings.CSV_IMPORT_MAX_UPLOAD_MB
+        if csv_file.size > max_upload_mb * 1024 * 1024:
             return JsonResponse({
                 'success': False,
-                'error': 'File size cannot exceed 5MB'
+                'error': f'File size cannot exceed {max_upload_mb}MB'
             })
 
         try:
-            # Try multiple encodings to handle different file formats
-            file_content = None
-            encoding_used = None
-
-            # List of encodings to try in order
-            encodings_to_try = [
-                'utf-8',           # Standard UTF-8
-                'utf-8-sig',       # UTF-8 with BOM (Excel often saves this way)
-                'latin1',          # Windows-1252 / ISO-8859-1
-                'cp1252',          # Windows-1252 (common in Windows Excel)
-                'iso-8859-1',      # ISO Latin-1
-                'ascii'            # Basic ASCII
-            ]
-
-            csv_bytes = csv_file.read()
-
-            for encoding in encodings_to_try:
-                try:
-                    file_content = csv_bytes.decode(encoding)
-                    encoding_used = encoding
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-            if file_content is None:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Unable to read file. The file may contain unsupported characters or be corrupted. Please save your CSV file as UTF-8 encoding or try removing special characters.'
-                })
-
-            # Parse and validate CSV
+            # The upload is streamed, with its encoding detected incrementally
             from core.utils.csv_import import CSVImporter
-            importer = CSVImporter('questions', file_content, request.user)
+            importer = CSVImporter('questions', csv_file, request.user)
 
             # Get preview data
             preview_data = importer.get_preview_data()
 
             # Add encoding info to response for debugging
             preview_data['encoding_info'] = {
-                'detected_encoding': encoding_used,
-                'file_size_bytes': len(csv_bytes)
+                'detected_encoding': importer.encoding,
+                'file_size_bytes': csv_file.size
             }
 
             return JsonResponse({
@@ -1013,104 +884,25 @@ class CSVImportView(AdminRequiredMixin, TemplateView):
             import_mode = request.POST.get('import_mode', 'strict')  # Get import mode
 
             try:
-                # Try multiple encodings to handle different file formats
-                file_content = None
-                encoding_used = None
-
-                # List of encodings to try in order
-                encodings_to_try = [
-                    'utf-8',           # Standard UTF-8
-                    'utf-8-sig',       # UTF-8 with BOM (Excel often saves this way)
-                    'latin1',          # Windows-1252 / ISO-8859-1
-                    'cp1252',          # Windows-1252 (common in Windows Excel)
-                    'iso-8859-1',      # ISO Latin-1
-                    'ascii'            # Basic ASCII
-                ]
-
-                csv_bytes = csv_file.read()
-
-                for encoding in encodings_to_try:
-                    try:
-                        file_content = csv_bytes.decode(encoding)
-                        encoding_used = encoding
-                        break
-                    except UnicodeDecodeError:
-                        continue
-
-                if file_content is None:
-                    messages.error(request, 'Unable to read file. The file may contain unsupported characters or be corrupted. Please save your CSV file as UTF-8 encoding or try removing special characters.')
-                    return redirect('admin_panel:csv_import')
-
-                # Import questions with specified mode and progress tracking
-                from core.utils.csv_import import CSVImporter
-                import time
-
-                start_time = time.time()
-                print(f"🚀 Starting CSV import with mode: {import_mode}")
-
-                importer = CSVImporter('questions', file_content, request.user, import_mode)
-                result = importer.import_data()
-
-                end_time = time.time()
-                import_duration = end_time - start_time
-                print(f"⏱️ Import completed in {import_duration:.2f} seconds")
-
-                # Add performance info to result
-                result['import_duration'] = round(import_duration, 2)
-                result['questions_per_second'] = round(result.get('successful_rows', 0) / import_duration, 2) if import_duration > 0 else 0
-
-                if result['success']:
-                    # Log successful import activity
-                    AdminActivity.objects.create(
-                        admin_user=request.user,
-                        action='CSV_IMPORT',
-                        description=f'Imported questions (Mode: {import_mode}): {result["successful_rows"]} successful, {result.get("skipped_rows", result["failed_rows"])} skipped/failed',
-                        model_name='CSVImport',
-                        ip_address=request.META.get('REMOTE_ADDR'),
-                        user_agent=request.META.get('HTTP_USER_AGENT', '')
-                    )
-
-                    # Handle different import modes and results
-                    if import_mode == 'partial':
-                        if result.get("skipped_rows", 0) > 0:
-                            messages.success(
-                                request,
-                                f'✅ Partial import completed! {result["successful_rows"]} questions imported successfully. '
-                                f'{result["skipped_rows"]} rows with errors were skipped. '
-                                f'⚡ Performance: {result["import_duration"]}s ({result["questions_per_second"]} questions/sec)'
-                            )
-
-                            # Show details about skipped rows
-                            if result.get('skipped_details'):
-                                skipped_summary = []
-                                for skip in result['skipped_details'][:3]:  # Show first 3 errors
-                                    skipped_summary.append(f"Row {skip['row_number']}: {skip['error']}")
-                                if len(result['skipped_details']) > 3:
-                                    skipped_summary.append(f"... and {len(result['skipped_details']) - 3} more errors")
-
-                                messages.info(request, f"📋 Skipped rows details:\n• " + "\n• ".join(skipped_summary))
-                        else:
-                            messages.success(
-                                request,
-                                f'✅ Import completed successfully! {result["successful_rows"]} questions imported. '
-                                f'⚡ Performance: {result["import_duration"]}s ({result["questions_per_second"]} questions/sec)'
-                            )
-                    else:
-                        # Strict mode
-                        if result["failed_rows"] > 0:
-                            messages.warning(
-                                request,
-                                f'⚠️ Import partially completed! {result["successful_rows"]} questions imported. '
-                                f'{result["failed_rows"]} failed. Check the import log for details.'
-                            )
-                        else:
-                            messages.success(
-                                request,
-                                f'✅ Import completed successfully! {result["successful_rows"]} questions imported. '
-                                f'⚡ Performance: {result["import_duration"]}s ({result["questions_per_second"]} questions/sec)'
-                            )
+                # Import runs as a background job streaming a stored copy of the upload
+                from core.utils.csv_import import store_upload
+                job = submit_job('import_questions_csv', {
+                    'file_name': store_upload(csv_file),
+                    'import_mode': import_mode,
+                    'user_id': request.user.pk,
+                    'ip_address': request.META.get('REMOTE_ADDR'),
+                    'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+                }, user=request.user)
+                logger.info(f"Queued CSV import job {job.pk} with mode: {import_mode}")
+
+                if job.status == 'queued' and not workers_available():
+                    messages.warning(request, f'⚠️ Import queued. {NO_WORKER_MESSAGE}.')
+                elif job.status == 'queued':
+                    messages.info(request, '⏳ Import queued. Progress is shown under Import jobs below.')
+                elif job.status == 'completed' and job.result.get('success'):
+                    messages.success(request, f'✅ Import completed! {job.result["successful_rows"]} questions imported.')
                 else:
-                    messages.error(request, f'Import failed: {result["error"]}')
+                    messages.error(request, f'Import failed: {job.error or (job.result or {}).get("error")}')
 
             except Exception as e:
                 # Log failed import activity
@@ -1170,55 +962,12 @@ class DownloadTemplateView(AdminRequiredMixin, View):
 
 
 class ExportQuestionsView(AdminRequiredMixin, View):
-    """Export all questions to CSV"""
+    """Export all questions to CSV (add ?compress=gzip for a gzipped file)"""
 
     def get(self, request, *args, **kwargs):
-        import csv
-        from io import StringIO
-
-        # Create CSV content
-        output = StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        header = [
-            'subject_name', 'class_level_name', 'topic_title', 'question_text', 'question_type',
-            'correct_answer', 'explanation', 'difficulty', 'points', 'time_limit',
-            'choice_a', 'choice_b', 'choice_c', 'choice_d'
-        ]
-        writer.writerow(header)
-
-        # Get all questions with related data
-        questions = Question.objects.select_related(
-            'topic__class_level__subject'
-        ).prefetch_related('answer_choices').filter(is_active=True)
-
-        for question in questions:
-            # Get choices for multiple choice questions
-            choices = ['', '', '', '']
-            if question.question_type == 'multiple_choice':
-                answer_choices = question.answer_choices.all().order_by('order')
-                for i, choice in enumerate(answer_choices[:4]):
-                    choices[i] = choice.choice_text
-
-            row = [
-                question.topic.class_level.subject.name,
-                question.topic.class_level.name,
-                question.topic.title,
-                question.question_text,
-                question.question_type,
-                question.correct_answer,
-                question.explanation,
-                question.difficulty,
-                question.points,
-                question.time_limit,
-                choices[0], choices[1], choices[2], choices[3]
-            ]
-            writer.writerow(row)
-
-        # Create response
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="questions_export.csv"'
+        from .exports import QUESTION_EXPORT_HEADER, csv_streaming_response, export_questions_queryset, iter_question_rows
+
+        questions = export_questions_queryset()
 
         # Log export activity
         AdminActivity.objects.create(
@@ -1230,68 +979,40 @@ class ExportQuestionsView(AdminRequiredMixin, View):
             user_agent=request.META.get('HTTP_USER_AGENT', '')
         )
 
-        return response
+        # Rows are read with a chunked cursor and streamed to the client
+        return csv_streaming_response(
+            'questions_export.csv',
+            QUESTION_EXPORT_HEADER,
+            iter_question_rows(questions),
+            compress=request.GET.get('compress') == 'gzip'
+        )
 
 
 class ExportUsersView(AdminRequiredMixin, View):
-    """Export all users to CSV"""
+    """Export all users to CSV (add ?compress=gzip for a gzipped file)"""
 
     def get(self, request, *args, **kwargs):
-        import csv
-        from io import StringIO
-        from django.db import models
-
-        # Create CSV content
-        output = StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        header = [
-            'email', 'first_name', 'last_name', 'current_grade', 'date_joined',
-            'is_active', 'total_quizzes', 'average_score', 'subjects_completed'
-        ]
-        writer.writerow(header)
-
-        # Get all users with progress data
-        users = User.objects.filter(is_staff=False).prefetch_related('quizzes')
-
-        for user in users:
-            # Calculate user statistics
-            quizzes = user.quizzes.all()
-            total_quizzes = quizzes.count()
-            average_score = quizzes.aggregate(avg_score=models.Avg('percentage'))['avg_score'] or 0
-
-            # Get completed subjects count
-            completed_subjects = user.progress.filter(is_completed=True).values('topic__class_level__subject').distinct().count()
-
-            row = [
-                user.email,
-                user.first_name,
-                user.last_name,
-                user.current_grade.name if user.current_grade else '',
-                user.date_joined.strftime('%Y-%m-%d'),
-                user.is_active,
-                total_quizzes,
-                round(average_score, 1),
-                completed_subjects
-            ]
-            writer.writerow(row)
-
-        # Create response
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="users_export.csv"'
+        from .exports import USER_EXPORT_HEADER, csv_streaming_response, export_users_queryset, iter_user_rows
+
+        users = export_users_queryset()
 
         # Log export activity
         AdminActivity.objects.create(
             admin_user=request.user,
             action='EXPORT_USERS',
-            description=f'Exported {users.count()} users to CSV',
+            description=f'Exported {User.objects.filter(is_staff=False).count()} users to CSV',
             model_name='User',
             ip_address=request.META.get('REMOTE_ADDR'),
             user_agent=request.META.get('HTTP_USER_AGENT', '')
         )
 
-        return response
+        # Quiz and completion statistics come from annotations, not per-user queries
+        return csv_streaming_response(
+            'users_export.csv',
+            USER_EXPORT_HEADER,
+            iter_user_rows(users),
+            compress=request.GET.get('compress') == 'gzip'
+        )
 
 
 class CreateUserView(AdminRequiredMixin, CreateView):
@@ -1587,6 +1308,25 @@ class QuestionsAPIView(AdminRequiredMixin, View):
         return JsonResponse({'questions': list(questions_data)})
 
 
+class CacheStatsAPIView(AdminRequiredMixin, View):
+    """API view exposing in-process cache counters for monitoring"""
+
+    def get(self, request, *args, **kwargs):
+        from analytics.buffer import analytics_buffer
+        from billing.models import billing_settings_snapshot
+        from content.question_pool import pool_stats
+        from .models import site_settings_snapshot
+
+        return JsonResponse({
+            'question_pool': pool_stats.as_dict(),
+            'analytics_buffer': analytics_buffer.stats(),
+            'settings_snapshots': {
+                'site_settings': site_settings_snapshot.stats(),
+                'billing_settings': billing_settings_snapshot.stats(),
+            },
+        })
+
+
 class ManageStudyNotesView(AdminRequiredMixin, TemplateView):
     """View for managing study notes with hierarchical selection"""
     template_name = 'admin_panel/manage_study_notes.html'
@@ -2170,11 +1910,7 @@ class DuplicateQuestionsView(AdminRequiredMixin, TemplateView):
 
 
 class DetectDuplicatesAPIView(AdminRequiredMixin, View):
-    """Optimized API view for detecting duplicate questions with real-time progress"""
-
-    def __init__(self):
-        super().__init__()
-        self.progress_data = {}  # Store progress for each request
+    """Queue duplicate question detection as a background job; poll JobStatusAPIView for progress"""
 
     def similarity(self, a, b):
         """Calculate similarity between two strings"""
@@ -2193,92 +1929,57 @@ class DetectDuplicatesAPIView(AdminRequiredMixin, View):
     def post(self, request):
         try:
             import json
-            import time
             data = json.loads(request.body)
 
-            # Get filter parameters
-            class_level_filter = data.get('class_level')
-            subject_filter = data.get('subject')
-            similarity_threshold = float(data.get('similarity_threshold', 0.85))
-            request_id = data.get('request_id', 'default')
+            params = {
+                'class_level': data.get('class_level') or None,
+                'subject': data.get('subject') or None,
+                'similarity_threshold': float(data.get('similarity_threshold', 0.85)),
+                'engine': data.get('engine', 'minhash'),
+                'lsh_bands': int(data.get('lsh_bands', DEFAULT_BANDS)),
+                'min_jaccard': float(data.get('min_jaccard', DEFAULT_MIN_JACCARD)),
+            }
+        except (ValueError, TypeError) as e:
+            return JsonResponse({'success': False, 'error': f'Invalid parameters: {e}'}, status=400)
 
-            print(f"🔍 Starting optimized duplicate detection with threshold: {similarity_threshold}")
+        if params['engine'] not in DUPLICATE_ENGINES:
+            return JsonResponse({'success': False, 'error': f'Unknown engine: {params["engine"]}'}, status=400)
 
-            # Build optimized query with select_related for better performance
-            questions = Question.objects.select_related(
-                'topic__class_level__subject'
-            ).filter(is_active=True)
+        job = submit_job('detect_duplicates', params, user=request.user)
+        logger.info(f"Queued duplicate detection job {job.pk} with threshold: {params['similarity_threshold']}")
 
-            if class_level_filter:
-                questions = questions.filter(topic__class_level__level_number=class_level_filter)
-            if subject_filter:
-                questions = questions.filter(topic__class_level__subject_id=subject_filter)
+        return JsonResponse({
+            'success': True,
+            'job_id': str(job.pk),
+            'status': job.status,
+            'workers_available': workers_available(),
+            'status_url': reverse('admin_panel:api_job_status', args=[job.pk]),
+            'cancel_url': reverse('admin_panel:api_job_cancel', args=[job.pk]),
+        }, status=202)
 
-            # Count total questions first
-            total_count = questions.count()
-            print(f"📊 Found {total_count} questions to analyze")
 
-            if total_count < 2:
-                return JsonResponse({
-                    'success': True,
-                    'duplicates': [],
-                    'total_groups': 0,
-                    'total_duplicates': 0,
-                    'similarity_threshold': similarity_threshold,
-                    'processing_time': 0,
-                    'questions_analyzed': total_count
-                })
-
-            # Use optimized duplicate detector
-            from .duplicate_detector import OptimizedDuplicateDetector
-
-            def progress_callback(message, percentage):
-                """Store progress for potential real-time updates"""
-                self.progress_data[request_id] = {
-                    'message': message,
-                    'percentage': percentage,
-                    'timestamp': time.time()
-                }
-                print(f"📈 Progress: {percentage:.1f}% - {message}")
-
-            detector = OptimizedDuplicateDetector(
-                similarity_threshold=similarity_threshold,
-                chunk_size=min(1000, total_count // 10 + 100)  # Dynamic chunk size
-            )
+class JobStatusAPIView(AdminRequiredMixin, View):
+    """Status, progress and (once finished) result of a background job"""
 
-            start_time = time.time()
-            duplicate_groups = detector.find_duplicates_optimized(
-                questions,
-                progress_callback=progress_callback
-            )
-            end_time = time.time()
+    def get(self, request, job_id):
+        job = get_object_or_404(BackgroundJob, pk=job_id)
+        data = {'success': True, 'job': job.to_dict(), 'workers_available': True}
+        if job.status == 'queued' and not workers_available():
+            # Nothing will pick the job up; tell the client rather than let it poll forever
+            data.update(workers_available=False, warning=NO_WORKER_MESSAGE)
+        return JsonResponse(data)
 
-            processing_time = end_time - start_time
-            total_duplicates = sum(group['count'] for group in duplicate_groups)
 
-            print(f"✅ Duplicate detection completed in {processing_time:.2f}s")
-            print(f"📋 Found {len(duplicate_groups)} groups with {total_duplicates} total duplicates")
+class CancelJobAPIView(AdminRequiredMixin, View):
+    """Cancel a queued job, or ask a running one to stop"""
 
-            return JsonResponse({
-                'success': True,
-                'duplicates': duplicate_groups,
-                'total_groups': len(duplicate_groups),
-                'total_duplicates': total_duplicates,
-                'similarity_threshold': similarity_threshold,
-                'processing_time': round(processing_time, 2),
-                'questions_analyzed': total_count,
-                'performance_stats': {
-                    'questions_per_second': round(total_count / processing_time, 2) if processing_time > 0 else 0,
-                    'optimization_used': 'hash_based_chunking'
-                }
-            })
+    def post(self, request, job_id):
+        job = get_object_or_404(BackgroundJob, pk=job_id)
+        if not cancel_job(job):
+            return JsonResponse({'success': False, 'error': f'Job is already {job.status}'}, status=409)
 
-        except Exception as e:
-            print(f"❌ Error in duplicate detection: {str(e)}")
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            }, status=500)
+        job.refresh_from_db()
+        return JsonResponse({'success': True, 'job': job.to_dict(include_result=False)})
 
 
 class DeleteDuplicatesAPIView(AdminRequiredMixin, View):
@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
-from .models import PageVisit, SystemMetrics, UserActivity, ErrorLog
+from .models import PageVisit, SystemMetrics, UserActivity, ErrorLog, RetentionRun
 
 
 @admin.register(PageVisit)
@@ -99,3 +99,17 @@ class ErrorLogAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user')
+
+
+@admin.register(RetentionRun)
+class RetentionRunAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'cutoff_date', 'total_rows_archived', 'dry_run', 'finished_at']
+    list_filter = ['dry_run', 'started_at']
+    readonly_fields = [
+        'started_at', 'finished_at', 'cutoff_date', 'dry_run', 'rows_archived',
+        'archive_files', 'table_sizes_before', 'table_sizes_after'
+    ]
+    date_hierarchy = 'started_at'
+
+    def has_add_permission(self, request):
+        return False
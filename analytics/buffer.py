@@ -0,0 +1,212 @@
+"""
+Buffered analytics ingestion.
+
+Page visits, user activity and funnel events are built in the request thread
+and handed to an in-process ring buffer. A background thread drains the buffer
+with one ``bulk_create`` per model, either when a batch is full or when the
+flush interval elapses, so requests no longer wait on analytics inserts.
+
+When the buffer is full new events are dropped (and counted) instead of
+blocking the request. A batch that fails to insert is split in halves and
+retried, so only the rows that cannot be written (e.g. for a user deleted
+since the event was tracked) are dropped. Remaining events are flushed when
+the process exits.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger('Pentora')
+
+DEFAULT_MAX_EVENTS = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 5.0  # seconds
+
+
+class AnalyticsBuffer:
+    """
+    Bounded event buffer flushed by a background thread.
+
+    Settings (all optional):
+    ``ANALYTICS_BUFFER_ENABLED`` - when False events are written immediately,
+    ``ANALYTICS_BUFFER_MAX_EVENTS`` - capacity before events are dropped,
+    ``ANALYTICS_BUFFER_BATCH_SIZE`` - buffered events that trigger a flush,
+    ``ANALYTICS_BUFFER_FLUSH_INTERVAL`` - maximum seconds between flushes.
+    """
+
+    def __init__(self, max_events=None, batch_size=None, flush_interval=None, start_thread=True):
+        self._max_events = max_events
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._start_thread = start_thread
+
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+
+        self._counters = {}
+        self.reset_counters()
+
+    # Settings are read lazily so override_settings works in tests
+    @property
+    def enabled(self):
+        return getattr(settings, 'ANALYTICS_BUFFER_ENABLED', True)
+
+    @property
+    def max_events(self):
+        return self._max_events or getattr(settings, 'ANALYTICS_BUFFER_MAX_EVENTS', DEFAULT_MAX_EVENTS)
+
+    @property
+    def batch_size(self):
+        return self._batch_size or getattr(settings, 'ANALYTICS_BUFFER_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval or getattr(settings, 'ANALYTICS_BUFFER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    def reset_counters(self):
+        with self._lock:
+            self._counters = {
+                'enqueued': 0,
+                'flushed': 0,
+                'dropped': 0,
+                'failed': 0,
+                'flushes': 0,
+            }
+
+    def add(self, instance):
+        """
+        Queue an unsaved model instance for insertion.
+
+        Returns False when the event was dropped because the buffer is full.
+        """
+        if not self.enabled:
+            self._write([instance])
+            return True
+
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self._counters['dropped'] += 1
+                return False
+            self._events.append(instance)
+            self._counters['enqueued'] += 1
+            pending = len(self._events)
+
+        if self._start_thread:
+            self._ensure_thread()
+            if pending >= self.batch_size:
+                self._wakeup.set()
+
+        return True
+
+    def flush(self):
+        """Drain the buffer and insert its events, returning the number written"""
+        with self._flush_lock:
+            with self._lock:
+                events = list(self._events)
+                self._events.clear()
+
+            if not events:
+                return 0
+
+            return self._write(events)
+
+    def _write(self, events):
+        """Insert events with one bulk_create per model and update counters"""
+        by_model = {}
+        for instance in events:
+            by_model.setdefault(type(instance), []).append(instance)
+
+        written = 0
+        failed = 0
+        for model, instances in by_model.items():
+            for start in range(0, len(instances), self.batch_size):
+                batch = instances[start:start + self.batch_size]
+                batch_written = self._insert(model, batch)
+                written += batch_written
+                failed += len(batch) - batch_written
+
+        with self._lock:
+            self._counters['flushed'] += written
+            self._counters['failed'] += failed
+            self._counters['flushes'] += 1
+
+        return written
+
+    def _insert(self, model, instances):
+        """Insert ``instances``, bisecting a failed batch down to its bad rows; returns the number written"""
+        try:
+            # Each attempt is atomic, so a failed insert rolls back cleanly
+            # (and SQLite checks deferred foreign keys before it returns)
+            with transaction.atomic():
+                model.objects.bulk_create(instances)
+            return len(instances)
+        except Exception as e:
+            if len(instances) == 1:
+                logger.error(f"Analytics buffer dropped a {model.__name__} event: {e}")
+                return 0
+
+        for instance in instances:
+            # Rows were rolled back; let them be inserted again
+            instance._state.adding = True
+            if model._meta.pk.db_returning:
+                instance.pk = None
+        middle = len(instances) // 2
+        return self._insert(model, instances[:middle]) + self._insert(model, instances[middle:])
+
+    def _ensure_thread(self):
+        """Start the flush thread on first use, and again in forked workers"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='analytics-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Analytics buffer thread error: {e}")
+            finally:
+                close_old_connections()
+
+    def shutdown(self):
+        """Stop the flush thread and write whatever is still buffered"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Analytics buffer shutdown flush error: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['pending'] = len(self._events)
+        stats['capacity'] = self.max_events
+        return stats
+
+
+analytics_buffer = AnalyticsBuffer()
+atexit.register(analytics_buffer.shutdown)
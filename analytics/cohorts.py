@@ -0,0 +1,200 @@
+"""
+Weekly signup cohort retention.
+
+Users are grouped by the Monday of the week they signed up (``created_at``).
+A user counts as retained for a period when they have a UserActivity row or a
+StudySession starting inside the period's window, measured in days since
+their own signup:
+
+* ``day_1``  - day 1
+* ``day_7``  - days 7 to 13
+* ``day_30`` - days 30 to 36
+* ``day_90`` - days 90 to 96
+
+Counts are computed with one grouped query per refresh and stored in
+CohortRetention rows. Once a period's window has closed for every user of a
+cohort the cell is final and never recomputed, so results survive the
+archival of old raw activity. The assembled matrix is cached for the day.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from progress.models import StudySession
+from .models import CohortRetention, UserActivity
+
+User = get_user_model()
+
+# Window per period as (first day, day after the last) since signup
+RETENTION_PERIODS = {
+    'day_1': (1, 2),
+    'day_7': (7, 14),
+    'day_30': (30, 37),
+    'day_90': (90, 97),
+}
+COHORT_WEEKS = 26
+MATRIX_TIMEOUT = 60 * 60 * 24  # one day
+MATRIX_KEY = 'cohort_matrix_{today}_{weeks}'
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _window_closed(cohort_start, period, today):
+    """True when every user of the cohort has passed the period's window"""
+    return cohort_start + timedelta(days=7 + RETENTION_PERIODS[period][1]) <= today
+
+
+def _window_opened(cohort_start, period, today):
+    """True when at least one user of the cohort has reached the period"""
+    return cohort_start + timedelta(days=RETENTION_PERIODS[period][0]) <= today
+
+
+def _returned_in(start_day, end_day):
+    """Whether the outer user was active between two offsets from signup"""
+    window_start = OuterRef('created_at') + timedelta(days=start_day)
+    window_end = OuterRef('created_at') + timedelta(days=end_day)
+    activity = UserActivity.objects.filter(
+        user=OuterRef('pk'), timestamp__gte=window_start, timestamp__lt=window_end
+    )
+    sessions = StudySession.objects.filter(
+        user=OuterRef('pk'), started_at__gte=window_start, started_at__lt=window_end
+    )
+    return Q(Exists(activity)) | Q(Exists(sessions))
+
+
+def compute_cohort_counts(since):
+    """
+    Cohort sizes and retained users for signups from ``since`` on.
+
+    Returns ``{cohort_start: {'size': n, 'day_1': n, ...}}`` from a single
+    grouped query.
+    """
+    rows = User.objects.filter(
+        is_staff=False,
+        created_at__gte=since,
+    ).annotate(
+        cohort=TruncWeek('created_at')
+    ).order_by().values('cohort').annotate(
+        size=Count('id'),
+        **{
+            period: Count('id', filter=_returned_in(start_day, end_day))
+            for period, (start_day, end_day) in RETENTION_PERIODS.items()
+        }
+    )
+    return {
+        row.pop('cohort').date(): row
+        for row in rows
+    }
+
+
+def refresh_cohorts(today=None, weeks=COHORT_WEEKS):
+    """
+    Bring the stored cohorts of the last ``weeks`` weeks up to date.
+
+    Only cohorts with open cells are recomputed; final cells are kept as
+    stored.
+    """
+    today = today or timezone.localdate()
+    first_cohort = week_start(today) - timedelta(weeks=weeks - 1)
+
+    stored = {
+        cohort.cohort_start: cohort
+        for cohort in CohortRetention.objects.filter(cohort_start__gte=first_cohort)
+    }
+    open_cohorts = []
+    cohort_start = first_cohort
+    while cohort_start <= today:
+        cohort = stored.get(cohort_start)
+        if cohort is None or len(cohort.final_periods) < len(RETENTION_PERIODS):
+            open_cohorts.append(cohort_start)
+        cohort_start += timedelta(weeks=1)
+
+    if not open_cohorts:
+        return
+
+    counts = compute_cohort_counts(timezone.make_aware(datetime.combine(open_cohorts[0], time.min)))
+
+    now = timezone.now()
+    new_cohorts, changed_cohorts = [], []
+    for cohort_start in open_cohorts:
+        row = counts.get(cohort_start, {'size': 0})
+        cohort = stored.get(cohort_start)
+        if cohort is None:
+            cohort = CohortRetention(cohort_start=cohort_start)
+            new_cohorts.append(cohort)
+        else:
+            changed_cohorts.append(cohort)
+
+        cohort.cohort_size = row['size']
+        retained = dict(cohort.retained)
+        final_periods = list(cohort.final_periods)
+        for period in RETENTION_PERIODS:
+            if period in final_periods:
+                continue
+            retained[period] = row.get(period, 0)
+            if _window_closed(cohort_start, period, today):
+                final_periods.append(period)
+        cohort.retained = retained
+        cohort.final_periods = final_periods
+        # bulk_update does not apply auto_now
+        cohort.updated_at = now
+
+    CohortRetention.objects.bulk_create(new_cohorts)
+    CohortRetention.objects.bulk_update(changed_cohorts, ['cohort_size', 'retained', 'final_periods', 'updated_at'])
+
+
+def build_cohort_matrix(today=None, weeks=COHORT_WEEKS):
+    """
+    Retention rates per cohort, newest first.
+
+    Each row has ``cohort_start``, ``cohort_size``, the raw ``retained``
+    counts and a percentage per period; periods no user of the cohort has
+    reached yet are None.
+    """
+    today = today or timezone.localdate()
+    refresh_cohorts(today, weeks)
+
+    first_cohort = week_start(today) - timedelta(weeks=weeks - 1)
+    matrix = []
+    for cohort in CohortRetention.objects.filter(cohort_start__gte=first_cohort, cohort_size__gt=0):
+        row = {
+            'cohort_start': cohort.cohort_start,
+            'cohort_size': cohort.cohort_size,
+            'retained': dict(cohort.retained),
+            'final_periods': list(cohort.final_periods),
+        }
+        for period in RETENTION_PERIODS:
+            if _window_opened(cohort.cohort_start, period, today):
+                row[period] = round(cohort.retained.get(period, 0) / cohort.cohort_size * 100, 1)
+            else:
+                row[period] = None
+        matrix.append(row)
+    return matrix
+
+
+def get_cohort_matrix(weeks=COHORT_WEEKS):
+    """Cohort matrix for today, refreshed at most once per day"""
+    key = MATRIX_KEY.format(today=timezone.localdate().isoformat(), weeks=weeks)
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = build_cohort_matrix(weeks=weeks)
+        cache.set(key, matrix, MATRIX_TIMEOUT)
+    return matrix
+
+
+def average_retention(matrix):
+    """User-weighted retention per period over the cohorts whose cell is final"""
+    averages = {}
+    for period in RETENTION_PERIODS:
+        rows = [row for row in matrix if period in row['final_periods']]
+        users = sum(row['cohort_size'] for row in rows)
+        retained = sum(row['retained'].get(period, 0) for row in rows)
+        averages[period] = round(retained / users * 100, 1) if users else None
+    return averages
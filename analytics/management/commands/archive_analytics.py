@@ -0,0 +1,67 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+
+from analytics.retention import run_retention
+from analytics.rollups import run_rollups
+
+
+class Command(BaseCommand):
+    help = 'Archive raw analytics rows older than the retention period and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Retention period in days (default: ANALYTICS_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Rows archived and deleted per batch (default: ANALYTICS_ARCHIVE_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--archive-dir',
+            default=None,
+            help='Persistent directory for the archive files (default: ANALYTICS_ARCHIVE_DIR)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be archived',
+        )
+
+    def handle(self, *args, **options):
+        # Archived days must be covered by the rollups first
+        run_rollups()
+
+        try:
+            run = run_retention(
+                retention_days=options['days'],
+                archive_dir=options['archive_dir'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        if run is None:
+            self.stdout.write(self.style.WARNING('⚠️  No rollups computed yet, nothing archived'))
+            return
+
+        verb = 'Would archive' if run.dry_run else 'Archived'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {verb} {run.total_rows_archived} rows older than {run.cutoff_date.isoformat()}'
+        ))
+
+        after = {size['table']: size for size in run.table_sizes_after}
+        for before in run.table_sizes_before:
+            current = after[before['table']]
+            self.stdout.write(
+                f"   {before['table']}: {before['rows']} → {current['rows']} rows"
+                + (f" ({filesizeformat(before['bytes'])} → {filesizeformat(current['bytes'])})"
+                   if before['bytes'] is not None and current['bytes'] is not None else '')
+            )
+        for path in run.archive_files:
+            self.stdout.write(f'   {path}')
@@ -0,0 +1,119 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from analytics.models import ConversionFunnel
+from analytics.utils import business_intelligence
+
+STAGES = ['visitor', 'signup', 'first_quiz', 'first_lesson', 'active_learner']
+# Share of sessions that reach each stage
+STAGE_RATES = [1.0, 0.3, 0.2, 0.15, 0.05]
+
+
+def legacy_funnel_data(start_date, end_date):
+    """Reference copy of the previous one-query-per-stage funnel, kept for comparison"""
+    funnel_data = []
+    for stage in STAGES:
+        count = ConversionFunnel.objects.filter(
+            stage=stage,
+            timestamp__gte=start_date,
+            timestamp__lte=end_date
+        ).values('user', 'session_key').distinct().count()
+        funnel_data.append({'stage': stage, 'count': count})
+    return funnel_data
+
+
+class Command(BaseCommand):
+    help = 'Benchmark conversion funnel queries over a generated ConversionFunnel fixture (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Funnel rows to generate')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per implementation')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the generated fixture')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        start_date = now - timedelta(days=30)
+
+        # Before: repeated visits stored as duplicate rows, one query per stage
+        with transaction.atomic():
+            sessions = self.generate(random.Random(options['seed']), options['rows'], now, dedup=False)
+            self.stdout.write(f"Generated {options['rows']:,} funnel rows for {sessions:,} sessions")
+            legacy_result, legacy_time = self.run(legacy_funnel_data, start_date, now, options['repeat'])
+            grouped_raw_result, grouped_raw_time = self.run(
+                business_intelligence.get_conversion_funnel_data, start_date, now, options['repeat']
+            )
+            transaction.set_rollback(True)
+
+        # After: the same sessions recorded once per stage, one grouped query
+        with transaction.atomic():
+            self.generate(random.Random(options['seed']), options['rows'], now, dedup=True)
+            deduplicated = ConversionFunnel.objects.count()
+            grouped_result, grouped_time = self.run(
+                business_intelligence.get_conversion_funnel_data, start_date, now, options['repeat']
+            )
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"Rows stored with per-session dedup: {deduplicated:,} of {options['rows']:,} "
+            f"({deduplicated / options['rows'] * 100:.1f}%)"
+        )
+        self.stdout.write(f'Per-stage queries, raw rows:      {legacy_time * 1000:,.1f} ms')
+        self.stdout.write(f'Grouped query, raw rows:          {grouped_raw_time * 1000:,.1f} ms')
+        self.stdout.write(f'Grouped query, deduplicated rows: {grouped_time * 1000:,.1f} ms')
+        self.stdout.write(f'Speedup: {legacy_time / grouped_time:.1f}x')
+
+        if not legacy_result == grouped_raw_result == grouped_result:
+            self.stdout.write(self.style.ERROR(
+                f'Results differ: {legacy_result} / {grouped_raw_result} / {grouped_result}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('All stage counts identical'))
+
+    def generate(self, rng, rows, now, dedup):
+        """
+        Insert funnel events for as many sessions as ``rows`` raw events need.
+
+        Without ``dedup`` every page view of a visitor adds a row; with it
+        each session and stage is stored once.
+        """
+        batch = []
+        written = 0
+        sessions = 0
+        while written < rows:
+            sessions += 1
+            session_key = f'{sessions:040d}'
+            for stage, rate in zip(STAGES, STAGE_RATES):
+                if rng.random() > rate:
+                    break
+                repeats = rng.randint(1, 4) if stage == 'visitor' else 1
+                # Repeated views fall within the dedup period of the first one
+                first_seen = now - timedelta(seconds=rng.randrange(60 * 60 * 24 * 29))
+                timestamps = [first_seen + timedelta(seconds=rng.randrange(60 * 60 * 12)) for _ in range(repeats)]
+                written += repeats
+                if dedup:
+                    # The first event is kept, later ones are skipped by the dedup cache
+                    timestamps = [min(timestamps)]
+                batch.extend(
+                    ConversionFunnel(session_key=session_key, stage=stage, timestamp=timestamp)
+                    for timestamp in timestamps
+                )
+            if len(batch) >= 10000:
+                ConversionFunnel.objects.bulk_create(batch)
+                batch = []
+        ConversionFunnel.objects.bulk_create(batch)
+        return sessions
+
+    def run(self, function, start_date, end_date, repeat):
+        result = None
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function(start_date, end_date)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
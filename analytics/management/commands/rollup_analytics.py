@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analytics.cohorts import refresh_cohorts
+from analytics.rollups import run_rollups, get_watermark
+
+
+class Command(BaseCommand):
+    help = 'Fold raw analytics events into the hourly rollup tables and refresh cohort retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-days',
+            type=int,
+            default=None,
+            help='Recompute rollups for the last N days instead of resuming from the watermark',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['rebuild_days']:
+            since = timezone.now() - timedelta(days=options['rebuild_days'])
+
+        hours = run_rollups(since=since)
+        watermark = get_watermark()
+        # Scheduled with the rollups so cohort cells are stored before
+        # archive_analytics prunes the raw activity they are computed from
+        refresh_cohorts()
+
+        if hours:
+            self.stdout.write(self.style.SUCCESS(f'✅ Rolled up {hours} hours'))
+        else:
+            self.stdout.write('Rollups are up to date')
+        if watermark:
+            self.stdout.write(f'   Rolled up until {watermark.isoformat()}')
@@ -1,6 +1,7 @@
 import re
 from django.utils.deprecation import MiddlewareMixin
 from django.utils import timezone
+from .buffer import analytics_buffer
 from .models import PageVisit, UserActivity
 from django.contrib.auth import get_user_model
 
@@ -58,8 +59,8 @@ class AnalyticsMiddleware(MiddlewareMixin):
             page_url = request.build_absolute_uri()
             page_title = self.extract_page_title(request)
             
-            # Create page visit record
-            PageVisit.objects.create(
+            # Queue page visit record; the buffer writes it in the background
+            analytics_buffer.add(PageVisit(
                 user=request.user if request.user.is_authenticated else None,
                 session_key=request.session.session_key,
                 ip_address=ip_address,
@@ -72,14 +73,14 @@ class AnalyticsMiddleware(MiddlewareMixin):
                 country='',
                 city='',
                 region='',
-            )
+            ))
             
             # Track user activity for authenticated users
             if request.user.is_authenticated:
                 # Determine activity type based on URL
                 activity_type = self.get_activity_type(request.path)
                 if activity_type:
-                    UserActivity.objects.create(
+                    analytics_buffer.add(UserActivity(
                         user=request.user,
                         activity_type=activity_type,
                         description=f"Visited {page_title or request.path}",
@@ -89,7 +90,7 @@ class AnalyticsMiddleware(MiddlewareMixin):
                             'user_agent': user_agent_full[:200],  # Truncate for storage
                         },
                         ip_address=ip_address,
-                    )
+                    ))
         
         except Exception as e:
             # Don't break the request if analytics fails
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrafficRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour', unique=True)),
+                ('page_views', models.PositiveIntegerField(default=0)),
+                ('desktop_views', models.PositiveIntegerField(default=0)),
+                ('mobile_views', models.PositiveIntegerField(default=0)),
+                ('tablet_views', models.PositiveIntegerField(default=0)),
+                ('bot_views', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('activities', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-bucket'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FunnelRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('stage', models.CharField(choices=[('visitor', 'Visitor'), ('signup', 'Sign Up'), ('first_quiz', 'First Quiz'), ('first_lesson', 'First Lesson'), ('active_learner', 'Active Learner'), ('subscriber', 'Subscriber')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('bucket', 'stage')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('page_url', models.URLField()),
+                ('page_title', models.CharField(blank=True, max_length=200)),
+                ('visits', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='analytics_p_bucket_ad3afd_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VisitorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('ip_address', models.GenericIPAddressField()),
+                ('page_views', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='analytics_v_bucket_ba1300_idx'), models.Index(fields=['user', 'bucket'], name='analytics_v_user_id_aeb591_idx')],
+            },
+        ),
+    ]
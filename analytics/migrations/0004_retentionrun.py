@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_trafficrollup_funnelrollup_pagerollup_visitorrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('cutoff_date', models.DateField(help_text='Rows before this date were archived')),
+                ('dry_run', models.BooleanField(default=False)),
+                ('rows_archived', models.JSONField(blank=True, default=dict)),
+                ('archive_files', models.JSONField(blank=True, default=list)),
+                ('table_sizes_before', models.JSONField(blank=True, default=list)),
+                ('table_sizes_after', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_retentionrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortRetention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort_start', models.DateField(help_text='Monday of the signup week', unique=True)),
+                ('cohort_size', models.PositiveIntegerField(default=0)),
+                ('retained', models.JSONField(blank=True, default=dict, help_text='Returning users per retention period')),
+                ('final_periods', models.JSONField(blank=True, default=list, help_text='Periods whose window has closed')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-cohort_start'],
+            },
+        ),
+    ]
@@ -277,3 +277,105 @@ class SystemPerformanceMetrics(models.Model):
 
     def __str__(self):
         return f"Performance - {self.timestamp}"
+
+
+class TrafficRollup(models.Model):
+    """Hourly page view, device, error and activity totals"""
+    bucket = models.DateTimeField(unique=True, help_text="Start of the hour")
+    page_views = models.PositiveIntegerField(default=0)
+    desktop_views = models.PositiveIntegerField(default=0)
+    mobile_views = models.PositiveIntegerField(default=0)
+    tablet_views = models.PositiveIntegerField(default=0)
+    bot_views = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    activities = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-bucket']
+
+    def __str__(self):
+        return f"Traffic - {self.bucket}"
+
+
+class VisitorRollup(models.Model):
+    """Distinct visitors (IP address and user) per hour"""
+    bucket = models.DateTimeField()
+    ip_address = models.GenericIPAddressField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    page_views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket']),
+            models.Index(fields=['user', 'bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.ip_address} - {self.bucket}"
+
+
+class PageRollup(models.Model):
+    """Page views per page per hour"""
+    bucket = models.DateTimeField()
+    page_url = models.URLField()
+    page_title = models.CharField(max_length=200, blank=True)
+    visits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.page_url} - {self.bucket}"
+
+
+class FunnelRollup(models.Model):
+    """Distinct users/sessions reaching each funnel stage per hour"""
+    bucket = models.DateTimeField()
+    stage = models.CharField(max_length=20, choices=ConversionFunnel.FUNNEL_STAGES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['bucket', 'stage']
+
+    def __str__(self):
+        return f"{self.stage} - {self.bucket}"
+
+
+class RetentionRun(models.Model):
+    """Report of one analytics archival run"""
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    cutoff_date = models.DateField(help_text="Rows before this date were archived")
+    dry_run = models.BooleanField(default=False)
+    rows_archived = models.JSONField(default=dict, blank=True)
+    archive_files = models.JSONField(default=list, blank=True)
+    table_sizes_before = models.JSONField(default=list, blank=True)
+    table_sizes_after = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Retention run - {self.started_at}"
+
+    @property
+    def total_rows_archived(self):
+        return sum(self.rows_archived.values())
+
+
+class CohortRetention(models.Model):
+    """Materialized retention counts for one weekly signup cohort"""
+    cohort_start = models.DateField(unique=True, help_text="Monday of the signup week")
+    cohort_size = models.PositiveIntegerField(default=0)
+    retained = models.JSONField(default=dict, blank=True, help_text="Returning users per retention period")
+    final_periods = models.JSONField(default=list, blank=True, help_text="Periods whose window has closed")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-cohort_start']
+
+    def __str__(self):
+        return f"Cohort {self.cohort_start} ({self.cohort_size} users)"
@@ -0,0 +1,181 @@
+"""
+Retention and archival of raw analytics rows.
+
+PageVisit, UserActivity and ConversionFunnel rows older than
+``ANALYTICS_RETENTION_DAYS`` are moved out of the database once the hourly
+rollups cover them. Each table is processed one day at a time: rows are read
+in primary key batches, appended to ``<ANALYTICS_ARCHIVE_DIR>/<table>/<day>.jsonl.gz``
+and deleted batch by batch, so no delete holds locks for long. Every run
+records table sizes before and after in a RetentionRun row.
+
+Rows are only deleted after their batch has been written; a crash between the
+two can leave a batch archived twice. Stored cohort retention is brought up
+to date before anything is deleted. The archive is the only copy of the
+deleted rows, so ``ANALYTICS_ARCHIVE_DIR`` has to be set explicitly to
+persistent storage (on Fly.io, a mounted volume rather than the machine's
+ephemeral disk); without it nothing is deleted.
+"""
+
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .cohorts import refresh_cohorts
+from .models import PageVisit, UserActivity, ConversionFunnel, RetentionRun
+from .rollups import get_watermark
+
+logger = logging.getLogger('Pentora')
+
+RETAINED_MODELS = [PageVisit, UserActivity, ConversionFunnel]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def archive_cutoff(now=None, retention_days=None):
+    """
+    First day whose raw rows are kept, or None when nothing may be archived.
+
+    The cutoff never passes the rollup watermark, so only rolled-up days are
+    archived.
+    """
+    retention_days = retention_days if retention_days is not None else _setting('ANALYTICS_RETENTION_DAYS', 90)
+    now = now or timezone.now()
+    watermark = get_watermark()
+    if watermark is None:
+        return None
+
+    cutoff = timezone.localdate(now) - timedelta(days=retention_days)
+    return min(cutoff, timezone.localdate(watermark))
+
+
+def archive_path(archive_dir, model, day):
+    return os.path.join(archive_dir, model._meta.db_table, f'{day.isoformat()}.jsonl.gz')
+
+
+def archive_day(model, day, archive_dir, batch_size):
+    """Move one day of rows into its archive file, returning the row count"""
+    start = _day_start(day)
+    rows = model.objects.filter(timestamp__gte=start, timestamp__lt=_day_start(day + timedelta(days=1)))
+    if not rows.exists():
+        return 0
+
+    fields = [field.attname for field in model._meta.concrete_fields]
+    batch_query = rows.order_by('pk').values(*fields)
+    path = archive_path(archive_dir, model, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    archived = 0
+    with gzip.open(path, 'at', encoding='utf-8') as archive:
+        while True:
+            batch = list(batch_query[:batch_size])
+            if not batch:
+                break
+            archive.writelines(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in batch)
+            archive.flush()
+            model.objects.filter(pk__in=[row['id'] for row in batch]).delete()
+            archived += len(batch)
+
+    return archived
+
+
+def _table_bytes(table):
+    query = {
+        'postgresql': "SELECT pg_total_relation_size(%s)",
+        'sqlite': "SELECT SUM(pgsize) FROM dbstat WHERE name = %s",
+    }.get(connection.vendor)
+    if query is None:
+        return None
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(query, [table])
+            return cursor.fetchone()[0]
+    except DatabaseError:
+        # e.g. SQLite builds without the dbstat table
+        return None
+
+
+def table_sizes():
+    """Row counts and on-disk sizes (when available) of the raw tables"""
+    return [
+        {
+            'table': model._meta.db_table,
+            'rows': model.objects.count(),
+            'bytes': _table_bytes(model._meta.db_table),
+        }
+        for model in RETAINED_MODELS
+    ]
+
+
+def run_retention(now=None, retention_days=None, archive_dir=None, batch_size=None, dry_run=False):
+    """
+    Archive and delete raw rows older than the retention period.
+
+    With ``dry_run`` the rows that would be archived are only counted.
+    Returns the saved RetentionRun, or None when no rollups exist yet.
+    Raises ImproperlyConfigured when rows would be deleted without an
+    explicitly configured archive directory.
+    """
+    archive_dir = archive_dir or _setting('ANALYTICS_ARCHIVE_DIR', '')
+    if not archive_dir and not dry_run:
+        raise ImproperlyConfigured(
+            "ANALYTICS_ARCHIVE_DIR is not set; point it at persistent storage before pruning raw analytics"
+        )
+
+    cutoff = archive_cutoff(now, retention_days)
+    if cutoff is None:
+        logger.warning("Analytics retention skipped: no rollups computed yet")
+        return None
+
+    batch_size = batch_size or _setting('ANALYTICS_ARCHIVE_BATCH_SIZE', 5000)
+    cutoff_start = _day_start(cutoff)
+
+    if not dry_run:
+        # Cohort cells are computed from the raw activity about to be deleted
+        refresh_cohorts()
+
+    run = RetentionRun(cutoff_date=cutoff, dry_run=dry_run, table_sizes_before=table_sizes())
+
+    for model in RETAINED_MODELS:
+        table = model._meta.db_table
+        expired = model.objects.filter(timestamp__lt=cutoff_start)
+
+        if dry_run:
+            run.rows_archived[table] = expired.count()
+            continue
+
+        archived = 0
+        first = expired.aggregate(first=Min('timestamp'))['first']
+        day = timezone.localdate(first) if first else cutoff
+        while day < cutoff:
+            day_rows = archive_day(model, day, archive_dir, batch_size)
+            if day_rows:
+                archived += day_rows
+                run.archive_files.append(archive_path(archive_dir, model, day))
+            day += timedelta(days=1)
+        run.rows_archived[table] = archived
+
+    run.table_sizes_after = run.table_sizes_before if dry_run else table_sizes()
+    run.finished_at = timezone.now()
+    run.save()
+
+    logger.info(
+        f"Analytics retention: {run.total_rows_archived} rows "
+        f"{'would be ' if dry_run else ''}archived before {cutoff.isoformat()}"
+    )
+    return run
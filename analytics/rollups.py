@@ -0,0 +1,284 @@
+"""
+Hourly analytics rollups.
+
+Raw PageVisit, ErrorLog, UserActivity and ConversionFunnel rows are folded
+into per-hour tables by ``rollup_analytics`` (run from cron or a worker):
+
+* TrafficRollup - page views by device, errors and activities
+* VisitorRollup - one row per distinct (IP address, user) pair
+* PageRollup - visits per page
+* FunnelRollup - distinct users/sessions per funnel stage
+
+Every processed hour gets a TrafficRollup row, so the latest bucket marks the
+watermark. Dashboards read complete hours from the rollups and only scan raw
+rows for the partial hour at the start of a window and the live tail after
+the watermark, keeping their cost flat as the raw tables grow.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import (
+    PageVisit, UserActivity, ErrorLog, ConversionFunnel,
+    TrafficRollup, VisitorRollup, PageRollup, FunnelRollup
+)
+
+logger = logging.getLogger('Pentora')
+
+HOUR = timedelta(hours=1)
+# Events are buffered before they are written, so recent hours are left open
+ROLLUP_DELAY = timedelta(minutes=5)
+# Hours recomputed per transaction
+ROLLUP_CHUNK_HOURS = 24
+# Rollup rows considered when merging top pages with the live tail
+TOP_PAGES_CANDIDATES = 100
+
+DEVICE_FIELDS = {
+    'desktop': 'desktop_views',
+    'mobile': 'mobile_views',
+    'tablet': 'tablet_views',
+    'bot': 'bot_views',
+}
+
+ROLLUP_MODELS = [TrafficRollup, VisitorRollup, PageRollup, FunnelRollup]
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value):
+    floored = floor_hour(value)
+    return floored if floored == value else floored + HOUR
+
+
+def get_watermark():
+    """End (exclusive) of the rolled-up period, or None before the first run"""
+    last_bucket = TrafficRollup.objects.aggregate(last=Max('bucket'))['last']
+    return last_bucket + HOUR if last_bucket else None
+
+
+def _earliest_event():
+    candidates = [
+        model.objects.aggregate(first=Min('timestamp'))['first']
+        for model in (PageVisit, ErrorLog, UserActivity, ConversionFunnel)
+    ]
+    candidates = [value for value in candidates if value is not None]
+    return min(candidates) if candidates else None
+
+
+def rollup_range(start, end):
+    """
+    Recompute the rollups for every hour in ``[start, end)``.
+
+    Existing rows for those hours are replaced, so re-running a range is
+    safe. Returns the number of hours written.
+    """
+    start, end = floor_hour(start), floor_hour(end)
+    if start >= end:
+        return 0
+
+    hours = int((end - start) / HOUR)
+    traffic = {
+        start + HOUR * offset: TrafficRollup(bucket=start + HOUR * offset)
+        for offset in range(hours)
+    }
+    window = {'timestamp__gte': start, 'timestamp__lt': end}
+
+    visits = PageVisit.objects.filter(**window).annotate(bucket=TruncHour('timestamp')).order_by()
+
+    for row in visits.values('bucket', 'device_type').annotate(count=Count('id')):
+        rollup = traffic[row['bucket']]
+        rollup.page_views += row['count']
+        field = DEVICE_FIELDS.get(row['device_type'])
+        if field:
+            setattr(rollup, field, getattr(rollup, field) + row['count'])
+
+    for model, field in ((ErrorLog, 'errors'), (UserActivity, 'activities')):
+        rows = model.objects.filter(**window).annotate(
+            bucket=TruncHour('timestamp')
+        ).order_by().values('bucket').annotate(count=Count('id'))
+        for row in rows:
+            setattr(traffic[row['bucket']], field, row['count'])
+
+    visitors = [
+        VisitorRollup(bucket=row['bucket'], ip_address=row['ip_address'],
+                      user_id=row['user'], page_views=row['count'])
+        for row in visits.values('bucket', 'ip_address', 'user').annotate(count=Count('id'))
+    ]
+
+    pages = [
+        PageRollup(bucket=row['bucket'], page_url=row['page_url'],
+                   page_title=row['page_title'], visits=row['count'])
+        for row in visits.values('bucket', 'page_url', 'page_title').annotate(count=Count('id'))
+    ]
+
+    funnel_counts = {}
+    funnel_rows = ConversionFunnel.objects.filter(**window).annotate(
+        bucket=TruncHour('timestamp')
+    ).order_by().values_list('bucket', 'stage', 'user', 'session_key').distinct()
+    for bucket, stage, _user, _session_key in funnel_rows:
+        funnel_counts[bucket, stage] = funnel_counts.get((bucket, stage), 0) + 1
+    funnel = [
+        FunnelRollup(bucket=bucket, stage=stage, count=count)
+        for (bucket, stage), count in funnel_counts.items()
+    ]
+
+    with transaction.atomic():
+        for model in ROLLUP_MODELS:
+            model.objects.filter(bucket__gte=start, bucket__lt=end).delete()
+        TrafficRollup.objects.bulk_create(traffic.values(), batch_size=1000)
+        VisitorRollup.objects.bulk_create(visitors, batch_size=1000)
+        PageRollup.objects.bulk_create(pages, batch_size=1000)
+        FunnelRollup.objects.bulk_create(funnel, batch_size=1000)
+
+    return hours
+
+
+def run_rollups(now=None, since=None):
+    """
+    Roll up every complete hour after the watermark.
+
+    On the first run (or when ``since`` is given) processing starts at
+    ``since`` or the earliest raw event. Hours are processed in chunks of
+    ``ROLLUP_CHUNK_HOURS``. Returns the number of hours written.
+    """
+    now = now or timezone.now()
+    end = floor_hour(now - ROLLUP_DELAY)
+
+    start = since or get_watermark() or _earliest_event()
+    if start is None:
+        return 0
+    start = floor_hour(start)
+
+    written = 0
+    while start < end:
+        chunk_end = min(start + HOUR * ROLLUP_CHUNK_HOURS, end)
+        written += rollup_range(start, chunk_end)
+        start = chunk_end
+
+    if written:
+        logger.info(f"Analytics rollup: {written} hours processed up to {end.isoformat()}")
+    return written
+
+
+class RollupWindow:
+    """
+    Metrics for the period from ``since`` until now.
+
+    Complete hours up to the watermark come from the rollup tables; the
+    partial first hour and everything after the watermark come from the raw
+    tables.
+    """
+
+    def __init__(self, since, now=None, watermark=None):
+        now = now or timezone.now()
+        watermark = watermark if watermark is not None else get_watermark()
+        rollup_start = ceil_hour(since)
+        rollup_end = min(watermark, floor_hour(now)) if watermark else None
+
+        if rollup_end is None or rollup_end <= rollup_start:
+            self.rollup_range = None
+            self.raw_ranges = [(since, now)]
+        else:
+            self.rollup_range = (rollup_start, rollup_end)
+            self.raw_ranges = [
+                (range_start, range_end)
+                for range_start, range_end in ((since, rollup_start), (rollup_end, now))
+                if range_start < range_end
+            ]
+
+    def _rollups(self, model):
+        if self.rollup_range is None:
+            return model.objects.none()
+        start, end = self.rollup_range
+        return model.objects.filter(bucket__gte=start, bucket__lt=end).order_by()
+
+    def _raw(self, model):
+        if not self.raw_ranges:
+            return model.objects.none()
+        condition = Q()
+        for start, end in self.raw_ranges:
+            condition |= Q(timestamp__gte=start, timestamp__lt=end)
+        return model.objects.filter(condition).order_by()
+
+    def page_views(self):
+        rolled = self._rollups(TrafficRollup).aggregate(total=Sum('page_views'))['total'] or 0
+        return rolled + self._raw(PageVisit).count()
+
+    def errors(self):
+        rolled = self._rollups(TrafficRollup).aggregate(total=Sum('errors'))['total'] or 0
+        return rolled + self._raw(ErrorLog).count()
+
+    def device_breakdown(self):
+        """``[{'device_type', 'count'}]`` ordered by count"""
+        totals = self._rollups(TrafficRollup).aggregate(
+            **{device: Sum(field) for device, field in DEVICE_FIELDS.items()}
+        )
+        counts = {device: count or 0 for device, count in totals.items()}
+        for row in self._raw(PageVisit).values('device_type').annotate(count=Count('id')):
+            counts[row['device_type']] = counts.get(row['device_type'], 0) + row['count']
+
+        breakdown = [
+            {'device_type': device, 'count': count}
+            for device, count in counts.items() if count
+        ]
+        return sorted(breakdown, key=lambda row: row['count'], reverse=True)
+
+    def unique_visitors(self):
+        """Distinct IP addresses"""
+        rolled = self._rollups(VisitorRollup).values('ip_address')
+        return rolled.union(self._raw(PageVisit).values('ip_address')).count()
+
+    def active_users(self):
+        """Distinct signed-in users"""
+        rolled = self._rollups(VisitorRollup).filter(user__isnull=False).values('user')
+        raw = self._raw(PageVisit).filter(user__isnull=False).values('user')
+        return rolled.union(raw).count()
+
+    def popular_pages(self, limit=10, with_titles=True):
+        """
+        Most visited pages as ``[{'page_url', 'page_title', 'visit_count'}]``.
+
+        The top ``TOP_PAGES_CANDIDATES`` rolled-up pages are merged with the
+        live tail.
+        """
+        fields = ['page_url', 'page_title'] if with_titles else ['page_url']
+
+        counts = {}
+        rolled = self._rollups(PageRollup).values(*fields).annotate(
+            visit_count=Sum('visits')
+        ).order_by('-visit_count')[:TOP_PAGES_CANDIDATES]
+        raw = self._raw(PageVisit).values(*fields).annotate(visit_count=Count('id'))
+        for rows in (rolled, raw):
+            for row in rows:
+                key = tuple(row[field] for field in fields)
+                counts[key] = counts.get(key, 0) + row['visit_count']
+
+        pages = [
+            dict(zip(fields, key), visit_count=count)
+            for key, count in counts.items()
+        ]
+        return sorted(pages, key=lambda row: row['visit_count'], reverse=True)[:limit]
+
+    def funnel_counts(self):
+        """
+        Users/sessions per funnel stage.
+
+        Rolled-up hours are counted independently, so a user reaching the
+        same stage in two different hours is counted twice.
+        """
+        counts = dict(
+            self._rollups(FunnelRollup).values('stage').annotate(
+                total=Sum('count')
+            ).values_list('stage', 'total')
+        )
+        raw = self._raw(ConversionFunnel).values('stage', 'user', 'session_key').distinct()
+        for row in raw:
+            counts[row['stage']] = counts.get(row['stage'], 0) + 1
+        return counts
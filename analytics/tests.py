@@ -1,3 +1,434 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Sum
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .buffer import AnalyticsBuffer
+from .cohorts import build_cohort_matrix, compute_cohort_counts, week_start
+from .models import (
+    PageVisit, UserActivity, ErrorLog, ConversionFunnel, TrafficRollup, PageRollup, RetentionRun, CohortRetention
+)
+from .utils import analytics_manager, business_intelligence
+from .retention import run_retention, archive_path
+from .rollups import RollupWindow, run_rollups, get_watermark, floor_hour
+
+
+class AnalyticsBufferTestCase(TestCase):
+    """Test cases for buffered analytics ingestion"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='visitor@test.com', password='testpass123')
+
+    def make_visit(self, number):
+        return PageVisit(
+            ip_address='127.0.0.1',
+            user_agent='test',
+            page_url=f'http://testserver/page/{number}/',
+        )
+
+    def test_events_are_written_in_bulk_on_flush(self):
+        """Buffered events cost no queries until flushed, then one insert per model"""
+        buffer = AnalyticsBuffer(start_thread=False)
+
+        with self.assertNumQueries(0):
+            for number in range(5):
+                buffer.add(self.make_visit(number))
+            buffer.add(UserActivity(user=self.user, activity_type='lesson_view'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 6)
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+
+        self.assertEqual(PageVisit.objects.count(), 5)
+        self.assertEqual(UserActivity.objects.count(), 1)
+        self.assertEqual(buffer.stats()['flushed'], 6)
+        self.assertEqual(buffer.stats()['pending'], 0)
+
+    def test_full_buffer_drops_new_events(self):
+        """Events beyond capacity are dropped and counted instead of blocking"""
+        buffer = AnalyticsBuffer(max_events=3, start_thread=False)
+
+        results = [buffer.add(self.make_visit(number)) for number in range(5)]
+
+        self.assertEqual(results, [True, True, True, False, False])
+        stats = buffer.stats()
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['pending'], 3)
+
+    def test_failed_batch_drops_only_bad_rows(self):
+        """A failed batch is retried in halves, so its valid rows are still written"""
+        buffer = AnalyticsBuffer(start_thread=False)
+        for number in range(6):
+            buffer.add(self.make_visit(number))
+        bad_visit = self.make_visit(6)
+        bad_visit.ip_address = None
+        buffer.add(bad_visit)
+        buffer.add(self.make_visit(7))
+
+        with self.assertLogs('Pentora', level='ERROR') as logs:
+            self.assertEqual(buffer.flush(), 7)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual(PageVisit.objects.count(), 7)
+        self.assertFalse(PageVisit.objects.filter(pk=bad_visit.pk).exists())
+        stats = buffer.stats()
+        self.assertEqual((stats['flushed'], stats['failed']), (7, 1))
+
+    def test_failed_batch_is_counted(self):
+        """A batch that cannot be inserted is discarded and counted as failed"""
+        buffer = AnalyticsBuffer(start_thread=False)
+        buffer.add(UserActivity(user=self.user, activity_type='login'))
+        buffer.add(self.make_visit(1))
+
+        with mock.patch.object(PageVisit.objects, 'bulk_create', side_effect=ValueError('insert failed')):
+            with self.assertLogs('Pentora', level='ERROR'):
+                buffer.flush()
+
+        stats = buffer.stats()
+        self.assertEqual(stats['flushed'], 1)
+        self.assertEqual(stats['failed'], 1)
+
+    @override_settings(ANALYTICS_BUFFER_ENABLED=False)
+    def test_disabled_buffer_writes_immediately(self):
+        buffer = AnalyticsBuffer(start_thread=False)
+        buffer.add(self.make_visit(1))
+
+        self.assertEqual(PageVisit.objects.count(), 1)
+        self.assertEqual(buffer.stats()['pending'], 0)
+
+
+class AnalyticsRollupTestCase(TestCase):
+    """Test cases for hourly analytics rollups"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='visitor@test.com', password='testpass123')
+        self.now = floor_hour(timezone.now()) + timedelta(minutes=30)
+
+        visits = []
+        for hour in range(72):
+            timestamp = self.now - timedelta(hours=hour, minutes=7)
+            for number in range(hour % 4):
+                visits.append(PageVisit(
+                    ip_address=f'10.0.0.{number + hour % 3}',
+                    user=self.user if number == 0 else None,
+                    user_agent='test',
+                    page_url=f'http://testserver/page/{number}/',
+                    page_title=f'Page {number}',
+                    device_type='mobile' if number % 2 else 'desktop',
+                    timestamp=timestamp,
+                ))
+        PageVisit.objects.bulk_create(visits)
+        ErrorLog.objects.create(error_type='ValueError', error_message='test',
+                                timestamp=self.now - timedelta(hours=5))
+        ConversionFunnel.objects.create(user=self.user, stage='signup',
+                                        timestamp=self.now - timedelta(hours=3))
+
+    def raw_metrics(self, since):
+        visits = PageVisit.objects.filter(timestamp__gte=since, timestamp__lt=self.now)
+        return {
+            'page_views': visits.count(),
+            'unique_visitors': visits.values('ip_address').distinct().count(),
+            'active_users': visits.filter(user__isnull=False).values('user').distinct().count(),
+            'devices': {
+                row['device_type']: row['count']
+                for row in visits.values('device_type').annotate(count=Count('id'))
+            },
+            'pages': {
+                row['page_url']: row['count']
+                for row in visits.values('page_url').annotate(count=Count('id'))
+            },
+        }
+
+    def window_metrics(self, since):
+        window = RollupWindow(since, self.now)
+        return {
+            'page_views': window.page_views(),
+            'unique_visitors': window.unique_visitors(),
+            'active_users': window.active_users(),
+            'devices': {row['device_type']: row['count'] for row in window.device_breakdown()},
+            'pages': {
+                row['page_url']: row['visit_count']
+                for row in window.popular_pages(with_titles=False)
+            },
+        }
+
+    def test_rollups_match_raw_counts(self):
+        """Windows mixing rollups and raw rows match a full raw scan"""
+        hours = run_rollups(now=self.now)
+
+        self.assertGreater(hours, 0)
+        self.assertEqual(get_watermark(), floor_hour(self.now))
+        self.assertEqual(TrafficRollup.objects.count(), hours)
+
+        for since in (self.now - timedelta(hours=24), self.now - timedelta(days=7)):
+            self.assertEqual(self.window_metrics(since), self.raw_metrics(since))
+
+        window = RollupWindow(self.now - timedelta(hours=24), self.now)
+        self.assertEqual(window.errors(), 1)
+        self.assertEqual(window.funnel_counts(), {'signup': 1})
+
+    def test_live_tail_is_read_from_raw_rows(self):
+        """Events after the watermark are counted before the next rollup run"""
+        run_rollups(now=self.now)
+        PageVisit.objects.create(ip_address='10.9.9.9', user_agent='test',
+                                 page_url='http://testserver/new/', timestamp=self.now - timedelta(minutes=1))
+
+        since = self.now - timedelta(hours=24)
+        self.assertEqual(self.window_metrics(since), self.raw_metrics(since))
+
+    def test_rerun_is_incremental_and_idempotent(self):
+        """A second run only processes new hours and never duplicates rows"""
+        run_rollups(now=self.now)
+        page_rows = PageRollup.objects.count()
+
+        self.assertEqual(run_rollups(now=self.now), 0)
+        self.assertEqual(run_rollups(now=self.now + timedelta(hours=2)), 2)
+        self.assertEqual(PageRollup.objects.count(), page_rows)
+
+        run_rollups(now=self.now, since=self.now - timedelta(days=1))
+        self.assertEqual(PageRollup.objects.count(), page_rows)
+
+
+@override_settings(ANALYTICS_BUFFER_ENABLED=False)
+class AnalyticsRetentionTestCase(TestCase):
+    """Test cases for raw analytics archival"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='visitor@test.com', password='testpass123')
+        self.now = timezone.now()
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        self.old_day = (self.now - timedelta(days=100)).date()
+
+        PageVisit.objects.bulk_create([
+            PageVisit(
+                ip_address='10.0.0.1',
+                user_agent='test',
+                page_url=f'http://testserver/page/{number}/',
+                timestamp=self.now - timedelta(days=100, minutes=number),
+            )
+            for number in range(7)
+        ] + [
+            PageVisit(ip_address='10.0.0.2', user_agent='test', page_url='http://testserver/recent/',
+                      timestamp=self.now - timedelta(days=1)),
+        ])
+        UserActivity.objects.create(user=self.user, activity_type='login',
+                                    timestamp=self.now - timedelta(days=100))
+
+    def test_nothing_is_archived_before_rollups_exist(self):
+        self.assertIsNone(run_retention(now=self.now, archive_dir=self.archive_dir))
+        self.assertEqual(PageVisit.objects.count(), 8)
+
+    def test_old_rows_are_archived_in_batches_and_deleted(self):
+        """Expired rows move into per-day gzipped JSONL files; rollups are kept"""
+        run_rollups(now=self.now)
+        rolled_up_views = TrafficRollup.objects.aggregate(total=Sum('page_views'))['total']
+
+        run = run_retention(now=self.now, archive_dir=self.archive_dir, batch_size=3)
+
+        self.assertEqual(run.rows_archived, {
+            'analytics_pagevisit': 7,
+            'analytics_useractivity': 1,
+            'analytics_conversionfunnel': 0,
+        })
+        self.assertEqual(PageVisit.objects.count(), 1)
+        self.assertEqual(UserActivity.objects.count(), 0)
+        self.assertEqual(TrafficRollup.objects.aggregate(total=Sum('page_views'))['total'], rolled_up_views)
+
+        sizes_after = {size['table']: size['rows'] for size in run.table_sizes_after}
+        self.assertEqual(sizes_after['analytics_pagevisit'], 1)
+
+        archived_days = {path for path in run.archive_files if 'pagevisit' in path}
+        with gzip.open(archived_days.pop(), 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(len({row['id'] for row in rows}), 7)
+        self.assertIn('page_url', rows[0])
+
+    @override_settings(ANALYTICS_ARCHIVE_DIR='')
+    def test_rows_are_kept_without_a_configured_archive_dir(self):
+        run_rollups(now=self.now)
+
+        with self.assertRaises(ImproperlyConfigured):
+            run_retention(now=self.now)
+        self.assertEqual(PageVisit.objects.count(), 8)
+        self.assertFalse(RetentionRun.objects.exists())
+
+    def test_cohorts_are_stored_before_rows_are_deleted(self):
+        run_rollups(now=self.now)
+        run_retention(now=self.now, archive_dir=self.archive_dir)
+
+        self.assertTrue(CohortRetention.objects.exists())
+
+    def test_dry_run_only_counts(self):
+        run_rollups(now=self.now)
+        run = run_retention(now=self.now, archive_dir=self.archive_dir, dry_run=True)
+
+        self.assertEqual(run.total_rows_archived, 8)
+        self.assertEqual(PageVisit.objects.count(), 8)
+        self.assertFalse(os.path.exists(archive_path(self.archive_dir, PageVisit, self.old_day)))
+
+    def test_dashboard_shows_latest_run(self):
+        run_rollups(now=self.now)
+        run_retention(now=self.now, archive_dir=self.archive_dir)
+        staff = get_user_model().objects.create_user(
+            email='staff@test.com', password='testpass123', is_staff=True
+        )
+        self.client.force_login(staff)
+
+        response = self.client.get(reverse('analytics:dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['retention_run'], RetentionRun.objects.get())
+        self.assertContains(response, 'Data Retention')
+
+
+class CohortRetentionTestCase(TestCase):
+    """Test cases for weekly signup cohort retention"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        # A cohort old enough for every period to be final
+        self.cohort_start = week_start(self.today) - timedelta(weeks=20)
+        signup = timezone.make_aware(datetime.combine(self.cohort_start, time.min)) + timedelta(hours=10)
+
+        User = get_user_model()
+        self.users = []
+        for number in range(4):
+            user = User.objects.create_user(email=f'cohort{number}@test.com', password='testpass123')
+            User.objects.filter(pk=user.pk).update(created_at=signup)
+            self.users.append(user)
+
+        # Two users come back the next day, one of them again a month later
+        for user in self.users[:2]:
+            UserActivity.objects.create(user=user, activity_type='login', timestamp=signup + timedelta(days=1, hours=2))
+        UserActivity.objects.create(user=self.users[0], activity_type='quiz_start',
+                                    timestamp=signup + timedelta(days=31))
+
+    def test_counts_come_from_one_grouped_query(self):
+        since = timezone.now() - timedelta(weeks=30)
+        with self.assertNumQueries(1):
+            counts = compute_cohort_counts(since)
+
+        self.assertEqual(counts[self.cohort_start], {
+            'size': 4, 'day_1': 2, 'day_7': 0, 'day_30': 1, 'day_90': 0,
+        })
+
+    def test_matrix_rates_and_averages(self):
+        data = business_intelligence.get_user_retention_data()
+
+        cohort = next(row for row in data['cohorts'] if row['cohort_start'] == self.cohort_start)
+        self.assertEqual(cohort['day_1'], 50.0)
+        self.assertEqual(cohort['day_30'], 25.0)
+        self.assertEqual(data['day_1'], 50.0)
+        self.assertEqual(data['day_7'], 0.0)
+        self.assertEqual(data['day_30'], 25.0)
+
+    def test_refresh_touches_updated_at(self):
+        build_cohort_matrix(self.today)
+        stale = timezone.now() - timedelta(days=2)
+        CohortRetention.objects.filter(cohort_start=week_start(self.today)).update(updated_at=stale)
+
+        build_cohort_matrix(self.today)
+
+        self.assertGreater(CohortRetention.objects.get(cohort_start=week_start(self.today)).updated_at, stale)
+
+    def test_final_cells_survive_activity_archival(self):
+        """Closed periods are not recomputed, so deleted raw rows do not change them"""
+        build_cohort_matrix(self.today)
+        UserActivity.objects.all().delete()
+
+        matrix = build_cohort_matrix(self.today)
+
+        cohort = next(row for row in matrix if row['cohort_start'] == self.cohort_start)
+        self.assertEqual(cohort['day_1'], 50.0)
+        self.assertEqual(cohort['day_30'], 25.0)
+
+    def test_scheduled_rollups_store_cohorts(self):
+        """Cells are stored without anyone opening the dashboard"""
+        call_command('rollup_analytics', stdout=io.StringIO())
+        UserActivity.objects.all().delete()
+
+        cohort = CohortRetention.objects.get(cohort_start=self.cohort_start)
+        self.assertEqual(cohort.retained['day_1'], 2)
+        self.assertEqual(cohort.retained['day_30'], 1)
+
+
+@override_settings(ANALYTICS_BUFFER_ENABLED=False)
+class ConversionFunnelTestCase(TestCase):
+    """Test cases for funnel tracking and stage counts"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='visitor@test.com', password='testpass123')
+
+    def make_request(self, session_key, user=None):
+        request = RequestFactory().get('/')
+        request.user = user or AnonymousUser()
+        request.session = mock.Mock(session_key=session_key)
+        return request
+
+    def test_stage_is_recorded_once_per_session(self):
+        for _ in range(3):
+            analytics_manager.track_conversion_stage(self.make_request('session-a'), 'visitor')
+        analytics_manager.track_conversion_stage(self.make_request('session-b'), 'visitor')
+        analytics_manager.track_conversion_stage(self.make_request('session-a', self.user), 'visitor')
+        analytics_manager.track_conversion_stage(self.make_request('session-a'), 'signup')
+
+        self.assertEqual(ConversionFunnel.objects.filter(stage='visitor').count(), 3)
+        self.assertEqual(ConversionFunnel.objects.filter(stage='signup').count(), 1)
+
+    def test_sessionless_visitors_are_not_deduplicated(self):
+        for _ in range(3):
+            analytics_manager.track_conversion_stage(self.make_request(None), 'visitor')
+
+        self.assertEqual(ConversionFunnel.objects.filter(stage='visitor').count(), 3)
+
+    def test_dropped_event_is_not_marked_seen(self):
+        with mock.patch('analytics.utils.analytics_buffer.add', return_value=False):
+            analytics_manager.track_conversion_stage(self.make_request('session-a'), 'visitor')
+        analytics_manager.track_conversion_stage(self.make_request('session-a'), 'visitor')
+        analytics_manager.track_conversion_stage(self.make_request('session-a'), 'visitor')
+
+        self.assertEqual(ConversionFunnel.objects.filter(stage='visitor').count(), 1)
+
+    def test_funnel_counts_come_from_one_grouped_query(self):
+        """Duplicate rows still count once per user/session pair"""
+        now = timezone.now()
+        rows = [
+            ('visitor', None, 'session-a'), ('visitor', None, 'session-a'),
+            ('visitor', self.user, 'session-a'), ('visitor', None, None), ('visitor', None, None),
+            ('signup', self.user, 'session-a'), ('first_quiz', self.user, 'session-b'),
+        ]
+        ConversionFunnel.objects.bulk_create([
+            ConversionFunnel(stage=stage, user=user, session_key=session_key, timestamp=now - timedelta(hours=1))
+            for stage, user, session_key in rows
+        ])
+
+        with self.assertNumQueries(1):
+            funnel = business_intelligence.get_conversion_funnel_data(now - timedelta(days=1), now)
+
+        self.assertEqual(funnel, [
+            {'stage': 'visitor', 'count': 3},
+            {'stage': 'signup', 'count': 1},
+            {'stage': 'first_quiz', 'count': 1},
+            {'stage': 'first_lesson', 'count': 0},
+            {'stage': 'active_learner', 'count': 0},
+        ])
@@ -7,9 +7,13 @@ import json
 import random
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Count, Avg, Q, F
+from django.db.models import Count, Avg, Q, F, CharField, Value
+from django.db.models.functions import Cast, Coalesce, Concat
 from django.core.cache import cache
 from django.contrib.auth import get_user_model
+from .buffer import analytics_buffer
+from .cohorts import COHORT_WEEKS, average_retention, get_cohort_matrix
+from .rollups import RollupWindow
 from .models import (
     PageVisit, UserActivity, ConversionFunnel, ABTestVariant, 
     ABTestAssignment, UserEngagementMetrics, SystemPerformanceMetrics
@@ -17,6 +21,19 @@ from .models import (
 
 User = get_user_model()
 
+FUNNEL_DEDUP_KEY = 'funnel_seen_{stage}_{user_id}_{session_key}'
+FUNNEL_DEDUP_TIMEOUT = 60 * 60 * 24  # 24 hours
+
+
+def funnel_identity():
+    """Expression identifying the user/session pair of a funnel row"""
+    return Concat(
+        Coalesce(Cast('user_id', CharField()), Value('')),
+        Value(':'),
+        Coalesce('session_key', Value('')),
+        output_field=CharField()
+    )
+
 
 class AnalyticsManager:
     """Centralized analytics management"""
@@ -43,7 +60,7 @@ class AnalyticsManager:
             geo_data = self.get_geographic_data(visit_data['ip_address'])
             visit_data.update(geo_data)
             
-            PageVisit.objects.create(**visit_data)
+            analytics_buffer.add(PageVisit(**visit_data))
             
             # Track conversion funnel
             self.track_conversion_stage(request, 'visitor')
@@ -57,12 +74,12 @@ class AnalyticsManager:
     def track_user_activity(self, user, activity_type, metadata=None):
         """Track user activity with metadata"""
         try:
-            UserActivity.objects.create(
+            analytics_buffer.add(UserActivity(
                 user=user,
                 activity_type=activity_type,
                 metadata=metadata or {},
                 ip_address=getattr(user, '_current_ip', None)
-            )
+            ))
             
             # Update engagement metrics
             self.update_engagement_metrics(user)
@@ -73,17 +90,35 @@ class AnalyticsManager:
             logger.error(f"Activity tracking error: {e}")
     
     def track_conversion_stage(self, request, stage):
-        """Track user through conversion funnel"""
+        """Track user through conversion funnel, once per user/session and stage"""
         try:
-            ConversionFunnel.objects.create(
-                user=request.user if request.user.is_authenticated else None,
-                session_key=request.session.session_key,
+            user = request.user if request.user.is_authenticated else None
+            session_key = request.session.session_key
+
+            # Without a user or session there is nothing to tell visitors apart
+            # by, so those events are not deduplicated
+            dedup_key = None
+            if user or session_key:
+                dedup_key = FUNNEL_DEDUP_KEY.format(
+                    stage=stage,
+                    user_id=user.pk if user else '',
+                    session_key=session_key or ''
+                )
+                if cache.get(dedup_key):
+                    return
+
+            buffered = analytics_buffer.add(ConversionFunnel(
+                user=user,
+                session_key=session_key,
                 stage=stage,
                 metadata={
                     'page_url': request.build_absolute_uri(),
                     'user_agent': request.META.get('HTTP_USER_AGENT', ''),
                 }
-            )
+            ))
+            # Only an event that was buffered counts as seen; a dropped one is tracked again
+            if buffered and dedup_key:
+                cache.set(dedup_key, True, FUNNEL_DEDUP_TIMEOUT)
         except Exception as e:
             pass  # Silent fail for conversion tracking
     
@@ -242,10 +277,9 @@ class BusinessIntelligence:
         ).count()
         
         # Activity metrics
-        page_views = PageVisit.objects.filter(timestamp__gte=start_date).count()
-        unique_visitors = PageVisit.objects.filter(
-            timestamp__gte=start_date
-        ).values('ip_address').distinct().count()
+        window = RollupWindow(start_date, end_date)
+        page_views = window.page_views()
+        unique_visitors = window.unique_visitors()
         
         # Engagement metrics
         avg_session_duration = UserEngagementMetrics.objects.filter(
@@ -256,11 +290,10 @@ class BusinessIntelligence:
         funnel_data = self.get_conversion_funnel_data(start_date, end_date)
         
         # Popular content
-        popular_pages = PageVisit.objects.filter(
-            timestamp__gte=start_date
-        ).values('page_url').annotate(
-            visits=Count('id')
-        ).order_by('-visits')[:10]
+        popular_pages = [
+            {'page_url': page['page_url'], 'visits': page['visit_count']}
+            for page in window.popular_pages(limit=10, with_titles=False)
+        ]
         
         metrics = {
             'total_users': total_users,
@@ -269,7 +302,7 @@ class BusinessIntelligence:
             'unique_visitors': unique_visitors,
             'avg_session_duration': avg_session_duration,
             'funnel_data': funnel_data,
-            'popular_pages': list(popular_pages),
+            'popular_pages': popular_pages,
             'user_growth_rate': self.calculate_growth_rate('users', days),
             'engagement_rate': self.calculate_engagement_rate(start_date, end_date),
         }
@@ -279,23 +312,23 @@ class BusinessIntelligence:
         return metrics
     
     def get_conversion_funnel_data(self, start_date, end_date):
-        """Get conversion funnel data"""
+        """Get conversion funnel data, counting distinct users/sessions per stage"""
         stages = ['visitor', 'signup', 'first_quiz', 'first_lesson', 'active_learner']
         
-        funnel_data = []
-        for stage in stages:
-            count = ConversionFunnel.objects.filter(
-                stage=stage,
+        counts = dict(
+            ConversionFunnel.objects.filter(
+                stage__in=stages,
                 timestamp__gte=start_date,
                 timestamp__lte=end_date
-            ).values('user', 'session_key').distinct().count()
-            
-            funnel_data.append({
-                'stage': stage,
-                'count': count
-            })
+            ).order_by().values('stage').annotate(
+                count=Count(funnel_identity(), distinct=True)
+            ).values_list('stage', 'count')
+        )
         
-        return funnel_data
+        return [
+            {'stage': stage, 'count': counts.get(stage, 0)}
+            for stage in stages
+        ]
     
     def calculate_growth_rate(self, metric_type, days):
         """Calculate growth rate for a metric"""
@@ -342,16 +375,18 @@ class BusinessIntelligence:
         
         return (engaged_users / total_users) * 100
     
-    def get_user_retention_data(self, cohort_days=30):
-        """Get user retention data by cohort"""
-        # This would implement cohort analysis
-        # For now, return placeholder data
-        return {
-            'day_1': 85,
-            'day_7': 65,
-            'day_30': 45,
-            'day_90': 30,
-        }
+    def get_user_retention_data(self, weeks=COHORT_WEEKS):
+        """
+        Get user retention data by weekly signup cohort.
+
+        Returns the average day 1/7/30/90 retention percentages over the
+        cohorts whose period has closed (None when there is none yet) and the
+        per-cohort matrix under ``cohorts``.
+        """
+        matrix = get_cohort_matrix(weeks)
+        data = average_retention(matrix)
+        data['cohorts'] = matrix
+        return data
 
 
 # Global instances
@@ -8,7 +8,8 @@ from datetime import timedelta
 import os
 from django.db import connection
 from django.contrib.auth import get_user_model
-from .models import PageVisit, SystemMetrics, UserActivity, ErrorLog
+from .models import PageVisit, SystemMetrics, UserActivity, ErrorLog, RetentionRun
+from .rollups import RollupWindow, get_watermark
 
 # Optional import for system monitoring
 try:
@@ -33,17 +34,23 @@ class AnalyticsDashboardView(TemplateView):
         last_7d = now - timedelta(days=7)
         last_30d = now - timedelta(days=30)
 
+        # Traffic windows read hourly rollups plus the live tail
+        watermark = get_watermark()
+        window_24h = RollupWindow(last_24h, now, watermark)
+        window_7d = RollupWindow(last_7d, now, watermark)
+        window_30d = RollupWindow(last_30d, now, watermark)
+
         # System metrics
         context['system_metrics'] = self.get_system_metrics()
 
         # User statistics
-        context['user_stats'] = self.get_user_statistics(last_24h, last_7d, last_30d)
+        context['user_stats'] = self.get_user_statistics(last_24h, last_7d, last_30d, window_24h)
 
         # Page visit statistics
-        context['visit_stats'] = self.get_visit_statistics(last_24h, last_7d, last_30d)
+        context['visit_stats'] = self.get_visit_statistics(window_24h, window_7d, window_30d)
 
         # Error statistics
-        context['error_stats'] = self.get_error_statistics(last_24h, last_7d)
+        context['error_stats'] = self.get_error_statistics(last_7d, window_24h, window_7d)
 
         # Geographic data
         context['geographic_data'] = self.get_geographic_data(last_7d)
@@ -52,6 +59,9 @@ class AnalyticsDashboardView(TemplateView):
         context['recent_activities'] = UserActivity.objects.select_related('user')[:10]
         context['recent_errors'] = ErrorLog.objects.filter(resolved=False)[:5]
 
+        # Latest raw data archival report
+        context['retention_run'] = RetentionRun.objects.first()
+
         return context
 
     def get_system_metrics(self):
@@ -108,7 +118,7 @@ class AnalyticsDashboardView(TemplateView):
                 'error': str(e)
             }
 
-    def get_user_statistics(self, last_24h, last_7d, last_30d):
+    def get_user_statistics(self, last_24h, last_7d, last_30d, window_24h):
         """Get user statistics"""
         total_users = User.objects.count()
         new_users_24h = User.objects.filter(date_joined__gte=last_24h).count()
@@ -116,10 +126,7 @@ class AnalyticsDashboardView(TemplateView):
         new_users_30d = User.objects.filter(date_joined__gte=last_30d).count()
 
         # Active users (users who visited in the last 24h)
-        active_users_24h = PageVisit.objects.filter(
-            timestamp__gte=last_24h,
-            user__isnull=False
-        ).values('user').distinct().count()
+        active_users_24h = window_24h.active_users()
 
         return {
             'total_users': total_users,
@@ -129,25 +136,17 @@ class AnalyticsDashboardView(TemplateView):
             'active_users_24h': active_users_24h,
         }
 
-    def get_visit_statistics(self, last_24h, last_7d, last_30d):
+    def get_visit_statistics(self, window_24h, window_7d, window_30d):
         """Get page visit statistics"""
-        visits_24h = PageVisit.objects.filter(timestamp__gte=last_24h).count()
-        visits_7d = PageVisit.objects.filter(timestamp__gte=last_7d).count()
-        visits_30d = PageVisit.objects.filter(timestamp__gte=last_30d).count()
+        visits_24h = window_24h.page_views()
+        visits_7d = window_7d.page_views()
+        visits_30d = window_30d.page_views()
 
         # Popular pages
-        popular_pages = PageVisit.objects.filter(
-            timestamp__gte=last_7d
-        ).values('page_url', 'page_title').annotate(
-            visit_count=Count('id')
-        ).order_by('-visit_count')[:10]
+        popular_pages = window_7d.popular_pages(limit=10)
 
         # Device breakdown
-        device_breakdown = PageVisit.objects.filter(
-            timestamp__gte=last_7d
-        ).values('device_type').annotate(
-            count=Count('id')
-        ).order_by('-count')
+        device_breakdown = window_7d.device_breakdown()
 
         return {
             'visits_24h': visits_24h,
@@ -157,10 +156,10 @@ class AnalyticsDashboardView(TemplateView):
             'device_breakdown': device_breakdown,
         }
 
-    def get_error_statistics(self, last_24h, last_7d):
+    def get_error_statistics(self, last_7d, window_24h, window_7d):
         """Get error statistics"""
-        errors_24h = ErrorLog.objects.filter(timestamp__gte=last_24h).count()
-        errors_7d = ErrorLog.objects.filter(timestamp__gte=last_7d).count()
+        errors_24h = window_24h.errors()
+        errors_7d = window_7d.errors()
         unresolved_errors = ErrorLog.objects.filter(resolved=False).count()
 
         # Error types
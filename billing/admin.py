@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import (
     BillingSettings, SubscriptionPlan, UserSubscription,
-    PaymentMethod, Payment, BillingEvent
+    PaymentMethod, Payment, BillingEvent, DailyUsage, EmailCampaign, WebhookEvent
 )
 
 
@@ -193,3 +193,48 @@ class BillingEventAdmin(admin.ModelAdmin):
     def description_short(self, obj):
         return obj.description[:50] + '...' if len(obj.description) > 50 else obj.description
     description_short.short_description = 'Description'
+
+
+@admin.register(DailyUsage)
+class DailyUsageAdmin(admin.ModelAdmin):
+    list_display = ['user_email', 'date', 'quiz_count', 'updated_at']
+    list_filter = ['date']
+    search_fields = ['user__email']
+    readonly_fields = ['user', 'date', 'quiz_count', 'updated_at']
+    date_hierarchy = 'date'
+
+    def user_email(self, obj):
+        return obj.user.email
+    user_email.short_description = 'User Email'
+
+
+@admin.register(EmailCampaign)
+class EmailCampaignAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'progress_display', 'sent_count', 'failed_count', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['name', 'subject']
+    readonly_fields = [
+        'name', 'template_name', 'subject', 'status', 'total_recipients', 'sent_count',
+        'failed_count', 'failures', 'error', 'created_at', 'started_at', 'finished_at'
+    ]
+
+    def progress_display(self, obj):
+        return f"{obj.progress_percentage}%"
+    progress_display.short_description = 'Progress'
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['reference', 'provider', 'event_type', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['provider', 'event_type', 'status', 'received_at']
+    search_fields = ['reference']
+    readonly_fields = [
+        'provider', 'event_type', 'reference', 'status', 'payload', 'attempts', 'error', 'received_at', 'processed_at'
+    ]
+    date_hierarchy = 'received_at'
+
+    def has_add_permission(self, request):
+        return False
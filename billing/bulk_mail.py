@@ -0,0 +1,133 @@
+"""
+Bulk email pipeline for billing campaigns.
+
+The text and HTML templates are loaded once per campaign. Recipients are read
+from the queryset in chunks, and every chunk is rendered and sent over the
+same backend connection, opened once for the whole run and reopened after a
+connection-level error. Progress and failed recipients are saved on the
+EmailCampaign after each chunk, so a campaign can be followed from the admin
+while it runs as a background job (see billing/jobs.py).
+"""
+
+import logging
+import smtplib
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import EmailCampaign
+
+logger = logging.getLogger(__name__)
+
+MAIL_BATCH_SIZE = 200  # recipients rendered and sent per chunk
+MAX_RECORDED_FAILURES = 500  # failed recipients kept on the campaign
+
+# Errors after which the connection is unusable, as opposed to a refused recipient
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+class BulkMailTemplate:
+    """Text and HTML templates of one email, loaded once"""
+
+    def __init__(self, template_name):
+        self.text_template = get_template(f'{template_name}.txt')
+        self.html_template = get_template(f'{template_name}.html')
+
+    def render(self, context):
+        return self.text_template.render(context), self.html_template.render(context)
+
+
+def _chunks(users, size):
+    chunk = []
+    for user in users.iterator(chunk_size=size):
+        chunk.append(user)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def create_campaign(name, template_name, subject, users):
+    """Record a pending campaign for the given recipients"""
+    return EmailCampaign.objects.create(
+        name=name,
+        template_name=template_name,
+        subject=subject,
+        total_recipients=users.count(),
+    )
+
+
+def _reconnect(connection):
+    """Replace a dropped connection before the next message"""
+    try:
+        connection.close()
+    except Exception:
+        pass  # Already gone
+    try:
+        connection.open()
+    except Exception as e:
+        # The next send opens it again, and records the error if that fails too
+        logger.error(f"Failed to reopen the email connection: {e}")
+
+
+def run_campaign(campaign, users, from_email, context=None, batch_size=MAIL_BATCH_SIZE, connection=None,
+                 progress_callback=None):
+    """
+    Send the campaign email to every user in ``users``.
+
+    ``context`` is shared by all messages; each message also gets ``user``.
+    A failed recipient is recorded and does not stop the run; after a
+    connection-level error the connection is reopened for the next one.
+    ``progress_callback`` is called as (message, percentage) after each
+    chunk. Returns the campaign with its final counts.
+    """
+    campaign.status = 'running'
+    campaign.started_at = timezone.now()
+    campaign.save(update_fields=['status', 'started_at'])
+
+    try:
+        template = BulkMailTemplate(campaign.template_name)
+        connection = connection or get_connection()
+
+        with connection:
+            for chunk in _chunks(users, batch_size):
+                for user in chunk:
+                    text_message, html_message = template.render(dict(context or {}, user=user))
+                    message = EmailMultiAlternatives(
+                        subject=campaign.subject,
+                        body=text_message,
+                        from_email=from_email,
+                        to=[user.email],
+                        connection=connection,
+                    )
+                    message.attach_alternative(html_message, 'text/html')
+
+                    try:
+                        # One recipient per call so failures are attributed correctly
+                        connection.send_messages([message])
+                        campaign.sent_count += 1
+                    except Exception as e:
+                        campaign.failed_count += 1
+                        if len(campaign.failures) < MAX_RECORDED_FAILURES:
+                            campaign.failures.append({'email': user.email, 'error': str(e)})
+                        logger.error(f"Failed to send {campaign.name} email to {user.email}: {e}")
+                        if isinstance(e, CONNECTION_ERRORS):
+                            _reconnect(connection)
+
+                campaign.save(update_fields=['sent_count', 'failed_count', 'failures'])
+                if progress_callback:
+                    progress_callback(
+                        f'Sent {campaign.sent_count}, failed {campaign.failed_count}', campaign.progress_percentage
+                    )
+
+        campaign.status = 'completed'
+    except Exception as e:
+        campaign.status = 'failed'
+        campaign.error = str(e)
+        logger.error(f"Email campaign {campaign.name} failed: {e}")
+
+    campaign.finished_at = timezone.now()
+    campaign.save(update_fields=['status', 'error', 'finished_at', 'sent_count', 'failed_count', 'failures'])
+    return campaign
@@ -1,3 +1,4 @@
+from .entitlements import get_entitlements
 from .models import BillingSettings
 
 
@@ -20,15 +21,16 @@ def billing_context(request):
     
     # Add user subscription status if authenticated
     if request.user.is_authenticated:
-        try:
-            subscription = request.user.subscription
+        entitlements = get_entitlements(request.user)
+        subscription = entitlements.subscription
+        if subscription is not None:
             context.update({
                 'user_subscription': subscription,
-                'user_subscription_active': subscription.is_active,
+                'user_subscription_active': entitlements.is_active,
                 'user_subscription_trial': subscription.is_trial,
                 'user_subscription_expires_soon': subscription.days_until_expiry is not None and subscription.days_until_expiry <= 7,
             })
-        except:
+        else:
             context.update({
                 'user_subscription': None,
                 'user_subscription_active': not billing_settings.billing_enabled,  # Active if billing disabled
@@ -0,0 +1,153 @@
+"""
+Per-user billing entitlements.
+
+BillingMiddleware, UsageLimitMiddleware and the billing context processor all
+need the user's subscription, plan and subject access on every request. The
+Entitlements object bundles them: it is memoized on the request's user object
+and cached across requests, keyed by two version stamps - one bumped when the
+user's subscription or payments change and one bumped when any plan changes.
+Subject access is read from the in-memory plan subject index. With a warm
+cache billing checks run no queries.
+"""
+
+from django.core.cache import cache
+
+from .models import BillingSettings, UserSubscription
+from .plan_access import plan_subject_index
+
+ENTITLEMENTS_TIMEOUT = 60 * 5  # 5 minutes
+USER_VERSION_KEY = 'billing_entitlements_version_{user_id}'
+PLAN_VERSION_KEY = 'billing_entitlements_plan_version'
+ENTITLEMENTS_KEY = 'billing_entitlements_{user_id}_v{user_version}_{plan_version}'
+
+ACTIVE_STATUSES = ('active', 'trialing')
+PLAN_FEATURES = ('priority_support', 'advanced_analytics', 'offline_access')
+
+
+class Entitlements:
+    """
+    What a user's subscription allows.
+
+    ``subscription`` is the user's UserSubscription with its plan loaded, or
+    None.
+    """
+
+    def __init__(self, user_id, subscription=None):
+        self.user_id = user_id
+        self.subscription = subscription
+
+    @classmethod
+    def load(cls, user):
+        """Read the subscription and plan from the database"""
+        return cls(user.pk, UserSubscription.objects.select_related('plan').filter(user=user).first())
+
+    @property
+    def has_subscription(self):
+        return self.subscription is not None
+
+    @property
+    def plan(self):
+        return self.subscription.plan if self.subscription else None
+
+    @property
+    def status(self):
+        return self.subscription.status if self.subscription else None
+
+    @property
+    def expires_at(self):
+        return self.subscription.current_period_end if self.subscription else None
+
+    @property
+    def allowed_subject_ids(self):
+        """Frozenset of subject ids, or None when subjects are not restricted"""
+        if self.subscription is None:
+            return None
+        return plan_subject_index.subject_ids(self.subscription.plan_id)
+
+    @property
+    def is_active(self):
+        """Same rule as UserSubscription.is_active; no subscription is inactive"""
+        if not BillingSettings.get_settings().billing_enabled:
+            return True
+        return self.status in ACTIVE_STATUSES
+
+    @property
+    def max_quizzes_per_day(self):
+        """Daily quiz limit, or None when unlimited"""
+        if self.subscription is None or not BillingSettings.get_settings().billing_enabled:
+            return None
+        return self.subscription.plan.max_quizzes_per_day
+
+    def get_usage_limits(self):
+        """Same as UserSubscription.get_usage_limits"""
+        if self.subscription is None or not BillingSettings.get_settings().billing_enabled:
+            return {
+                'max_subjects': None,
+                'max_quizzes_per_day': None,
+            }
+        return {
+            'max_subjects': self.subscription.plan.max_subjects,
+            'max_quizzes_per_day': self.subscription.plan.max_quizzes_per_day,
+        }
+
+    def can_access_subject(self, subject_id):
+        subject_ids = self.allowed_subject_ids
+        return subject_ids is None or subject_id in subject_ids
+
+    def filter_subjects(self, subjects):
+        """Restrict a Subject queryset to the subjects the user may access"""
+        subject_ids = self.allowed_subject_ids
+        if subject_ids is None:
+            return subjects
+        return subjects.filter(id__in=subject_ids)
+
+    def can_access_feature(self, feature):
+        """Same as UserSubscription.can_access_feature"""
+        if not BillingSettings.get_settings().billing_enabled:
+            return True
+        if not self.is_active:
+            return False
+        if feature in PLAN_FEATURES:
+            return getattr(self.subscription.plan, feature)
+        return True
+
+
+def get_entitlements(user):
+    """Return the user's entitlements, memoized for the request and cached"""
+    entitlements = getattr(user, '_billing_entitlements', None)
+    if entitlements is not None:
+        return entitlements
+
+    user_version_key = USER_VERSION_KEY.format(user_id=user.pk)
+    versions = cache.get_many([user_version_key, PLAN_VERSION_KEY])
+    key = ENTITLEMENTS_KEY.format(
+        user_id=user.pk,
+        user_version=versions.get(user_version_key, 0),
+        plan_version=versions.get(PLAN_VERSION_KEY, 0)
+    )
+
+    entitlements = cache.get(key)
+    if entitlements is None:
+        entitlements = Entitlements.load(user)
+        cache.set(key, entitlements, ENTITLEMENTS_TIMEOUT)
+
+    user._billing_entitlements = entitlements
+    return entitlements
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing key: start after the implicit version 0
+        cache.set(key, 1, None)
+
+
+def invalidate_entitlements(user_id):
+    """Drop the cached entitlements of one user"""
+    _bump(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def invalidate_all_entitlements():
+    """Drop every cached entitlements object after a plan change"""
+    _bump(PLAN_VERSION_KEY)
@@ -0,0 +1,38 @@
+"""
+Background jobs for the billing app (see core/jobs.py).
+"""
+
+from django.utils import timezone
+
+from core.jobs import JobCanceled, register_job
+from .bulk_mail import run_campaign
+from .models import EmailCampaign
+from .notifications import BillingNotificationService, activation_announcement_recipients
+
+
+@register_job('billing_activation_announcement')
+def billing_activation_announcement(context, campaign_id):
+    """Send a pending billing activation announcement campaign"""
+    service = BillingNotificationService()
+    campaign = EmailCampaign.objects.get(pk=campaign_id)
+    try:
+        run_campaign(
+            campaign,
+            activation_announcement_recipients(),
+            from_email=service.get_from_email(),
+            context={'billing_settings': service.billing_settings},
+            progress_callback=context.progress,
+        )
+    except JobCanceled:
+        campaign.status = 'failed'
+        campaign.error = 'Canceled'
+        campaign.finished_at = timezone.now()
+        campaign.save(update_fields=['status', 'error', 'finished_at', 'sent_count', 'failed_count', 'failures'])
+        raise
+
+    return {
+        'campaign_id': campaign.pk,
+        'status': campaign.status,
+        'sent_count': campaign.sent_count,
+        'failed_count': campaign.failed_count,
+    }
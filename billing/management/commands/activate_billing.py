@@ -1,7 +1,10 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from billing.models import BillingSettings, SubscriptionPlan, UserSubscription
-from billing.notifications import send_billing_activation_announcement
+from billing.notifications import (
+    activation_announcement_recipients, send_billing_activation_announcement, start_billing_activation_announcement
+)
+from core.jobs import NO_WORKER_MESSAGE, workers_available
 from django.utils import timezone
 
 User = get_user_model()
@@ -14,7 +17,12 @@ class Command(BaseCommand):
         parser.add_argument(
             '--send-emails',
             action='store_true',
-            help='Send activation announcement emails to all users',
+            help='Queue activation announcement emails to all users as a background job',
+        )
+        parser.add_argument(
+            '--send-now',
+            action='store_true',
+            help='With --send-emails, send the announcement here instead of in a background job',
         )
         parser.add_argument(
             '--create-free-plan',
@@ -100,16 +108,25 @@ class Command(BaseCommand):
         
         # Send emails if requested
         if options['send_emails']:
-            self.stdout.write('📧 Sending activation emails to all users...')
-            
-            all_users = User.objects.filter(is_active=True, is_email_verified=True)
+            all_users = activation_announcement_recipients()
             total_users = all_users.count()
             
             if total_users == 0:
                 self.stdout.write(self.style.WARNING('⚠️  No active verified users found'))
-            else:
+            elif options['send_now']:
+                self.stdout.write('📧 Sending activation emails to all users...')
                 sent_count = send_billing_activation_announcement(all_users)
                 self.stdout.write(self.style.SUCCESS(f'✅ Sent {sent_count}/{total_users} activation emails'))
+            else:
+                job = start_billing_activation_announcement()
+                if job is None:
+                    self.stdout.write(self.style.WARNING('⚠️  Billing emails are disabled in billing settings'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✅ Queued activation emails to {total_users} users (job {job.pk}, {job.status})'
+                    ))
+                    if job.status == 'queued' and not workers_available():
+                        self.stdout.write(self.style.WARNING(f'⚠️  {NO_WORKER_MESSAGE}'))
         
         # Display summary
         self.stdout.write('\n' + '='*50)
@@ -2,8 +2,8 @@ from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
 from django.http import JsonResponse
-from django.utils import timezone
-from .models import BillingSettings, UserSubscription
+from .usage import daily_quiz_limit, quizzes_remaining_today
+from .models import BillingSettings
 
 
 class BillingMiddleware:
@@ -71,15 +71,15 @@ class BillingMiddleware:
         
         # Check subscription status for protected URLs
         if self.requires_subscription(request.path):
-            subscription = self.get_user_subscription(request.user)
+            entitlements = get_entitlements(request.user)
             
-            if not subscription:
+            if not entitlements.has_subscription:
                 return self.redirect_to_billing(request, "Please choose a subscription plan to continue.")
             
-            if not subscription.is_active:
-                if subscription.status == 'past_due':
+            if not entitlements.is_active:
+                if entitlements.status == 'past_due':
                     return self.redirect_to_billing(request, "Your subscription payment is past due. Please update your payment method.")
-                elif subscription.status == 'canceled':
+                elif entitlements.status == 'canceled':
                     return self.redirect_to_billing(request, "Your subscription has been canceled. Please subscribe to continue.")
                 else:
                     return self.redirect_to_billing(request, "Your subscription is not active. Please check your billing status.")
@@ -96,10 +96,7 @@ class BillingMiddleware:
     
     def get_user_subscription(self, user):
         """Get user's subscription"""
-        try:
-            return user.subscription
-        except UserSubscription.DoesNotExist:
-            return None
+        return get_entitlements(user).subscription
     
     def redirect_to_login(self, request):
         """Redirect to login page"""
@@ -127,68 +124,49 @@ class BillingMiddleware:
 
 class UsageLimitMiddleware:
     """
-    Middleware to track and enforce usage limits based on subscription plan.
+    Middleware to enforce daily usage limits based on subscription plan.
+    
+    Starting or submitting a quiz is blocked while no quizzes are left. The
+    submission view itself counts the quiz, once the submission is accepted,
+    and answers with ``limit_reached`` when another request used up the last
+    one in the meantime.
     """
     
+    # Views that start or submit a quiz, blocked when the limit is reached
+    usage_checked_views = {'content:quiz', 'content:take_quiz', 'content:submit_quiz'}
+    
     def __init__(self, get_response):
         self.get_response = get_response
-        
-        # URLs that count towards usage limits
-        self.usage_tracked_patterns = [
-            '/quiz/take/',
-            '/exam/take/',
-        ]
     
     def __call__(self, request):
-        response = self.get_response(request)
-        
-        # Only track for authenticated users when billing is enabled
-        billing_settings = BillingSettings.get_settings()
-        if not billing_settings.billing_enabled or not request.user.is_authenticated:
-            return response
+        return self.get_response(request)
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        if view_name not in self.usage_checked_views:
+            return None
         
-        # Skip for superusers and staff
-        if request.user.is_superuser or request.user.is_staff:
-            return response
+        # Only enforced for non-staff users when billing is enabled
+        limit = daily_quiz_limit(request.user)
+        if not limit:
+            return None
         
-        # Track usage for specific endpoints
-        if self.should_track_usage(request.path, request.method):
-            self.track_usage(request.user, request.path)
+        if quizzes_remaining_today(request.user, limit) == 0:
+            return self.limit_reached(request, limit)
         
-        return response
+        return None
     
-    def should_track_usage(self, path, method):
-        """Check if this request should count towards usage limits"""
-        if method != 'POST':  # Only track actual quiz/exam submissions
-            return False
+    @staticmethod
+    def limit_reached(request, limit):
+        """Reject the request because today's quizzes are used up"""
+        message = f"You have reached your plan's limit of {limit} quizzes per day. Upgrade your plan or come back tomorrow."
+        if request.method == 'POST' or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({
+                'success': False,
+                'error': 'Daily quiz limit reached',
+                'message': message,
+                'billing_url': reverse('billing:plans')
+            }, status=429)
         
-        return any(path.startswith(pattern) for pattern in self.usage_tracked_patterns)
-    
-    def track_usage(self, user, path):
-        """Track usage for the user"""
-        try:
-            subscription = user.subscription
-            limits = subscription.get_usage_limits()
-            
-            # Track daily quiz usage
-            if '/quiz/take/' in path and limits['max_quizzes_per_day']:
-                from .models import BillingEvent
-                today = timezone.now().date()
-                
-                # Count today's quiz attempts
-                daily_quizzes = BillingEvent.objects.filter(
-                    user=user,
-                    event_type='quiz_attempt',
-                    created_at__date=today
-                ).count()
-                
-                # Log the attempt
-                BillingEvent.objects.create(
-                    user=user,
-                    event_type='quiz_attempt',
-                    description=f"Quiz attempt on {path}",
-                    metadata={'path': path, 'daily_count': daily_quizzes + 1}
-                )
-                
-        except UserSubscription.DoesNotExist:
-            pass  # No subscription, no limits to track
+        messages.warning(request, message)
+        return redirect('billing:plans')
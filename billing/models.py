@@ -5,6 +5,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 import uuid
 
+from core.utils.settings_snapshot import SettingsSnapshot
+
 User = get_user_model()
 
 
@@ -109,10 +111,21 @@ class BillingSettings(models.Model):
         if not self.pk and BillingSettings.objects.exists():
             raise ValueError("Only one BillingSettings instance is allowed")
         super().save(*args, **kwargs)
+        billing_settings_snapshot.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        billing_settings_snapshot.invalidate()
+        return result
 
     @classmethod
     def get_settings(cls):
-        """Get or create billing settings"""
+        """Get billing settings from the process-local snapshot"""
+        return billing_settings_snapshot.get()
+
+    @classmethod
+    def load_settings(cls):
+        """Get or create billing settings in the database"""
         settings, created = cls.objects.get_or_create(pk=1)
         return settings
 
@@ -120,6 +133,9 @@ class BillingSettings(models.Model):
         return f"Billing Settings ({'Enabled' if self.billing_enabled else 'Disabled'})"
 
 
+billing_settings_snapshot = SettingsSnapshot(BillingSettings, BillingSettings.load_settings)
+
+
 class SubscriptionPlan(models.Model):
     """Subscription plans available to users"""
 
@@ -286,26 +302,42 @@ class SubscriptionPlan(models.Model):
             return self.yearly_price
         return self.monthly_price
 
+    @property
+    def allowed_subject_ids(self):
+        """Frozenset of allowed subject ids, or None for unlimited access"""
+        from .plan_access import plan_subject_index
+        return plan_subject_index.subject_ids(self.pk)
+
     def get_allowed_subjects(self):
         """Get subjects this plan can access"""
-        if self.allowed_subjects.exists():
-            return self.allowed_subjects.all()
-        # If no specific subjects set, return all subjects (unlimited)
         from subjects.models import Subject
-        return Subject.objects.filter(is_active=True)
+        subject_ids = self.allowed_subject_ids
+        if subject_ids is None:
+            # If no specific subjects set, return all subjects (unlimited)
+            return Subject.objects.filter(is_active=True)
+        return Subject.objects.filter(id__in=subject_ids)
+
+    def filter_accessible_subjects(self, subjects):
+        """Restrict a Subject queryset to the subjects this plan can access"""
+        subject_ids = self.allowed_subject_ids
+        if subject_ids is None:
+            return subjects  # Unlimited access
+        return subjects.filter(id__in=subject_ids)
 
     def can_access_subject(self, subject):
         """Check if this plan can access a specific subject"""
-        if not self.allowed_subjects.exists():
+        subject_ids = self.allowed_subject_ids
+        if subject_ids is None:
             return True  # Unlimited access
-        return self.allowed_subjects.filter(id=subject.id).exists()
+        return subject.id in subject_ids
 
     @property
     def subject_count_display(self):
         """Display string for subject access"""
-        if not self.allowed_subjects.exists():
+        subject_ids = self.allowed_subject_ids
+        if subject_ids is None:
             return "All subjects"
-        count = self.allowed_subjects.count()
+        count = len(subject_ids)
         return f"{count} subject{'s' if count != 1 else ''}"
 
 
@@ -558,3 +590,95 @@ class BillingEvent(models.Model):
 
     def __str__(self):
         return f"{self.get_event_type_display()} - {self.user.email}"
+
+
+class DailyUsage(models.Model):
+    """Per-user daily usage counters, kept for limits and audit"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_usage')
+    date = models.DateField()
+    quiz_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'date']
+        ordering = ['-date']
+        verbose_name = "Daily Usage"
+        verbose_name_plural = "Daily Usage"
+
+    def __str__(self):
+        return f"{self.user.email} - {self.date} ({self.quiz_count} quizzes)"
+
+
+class EmailCampaign(models.Model):
+    """Progress and failures of a bulk billing email run"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    template_name = models.CharField(max_length=200, help_text="Template path without extension")
+    subject = models.CharField(max_length=200)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    failures = models.JSONField(default=list, blank=True, help_text="Failed recipients with the error message")
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Email Campaign"
+        verbose_name_plural = "Email Campaigns"
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+    @property
+    def progress_percentage(self):
+        if not self.total_recipients:
+            return 100 if self.status == 'completed' else 0
+        return round((self.sent_count + self.failed_count) / self.total_recipients * 100, 1)
+
+
+class WebhookEvent(models.Model):
+    """Ledger of payment provider events, one row per provider reference and event"""
+
+    STATUS_CHOICES = [
+        ('received', 'Received'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    provider = models.CharField(max_length=20)
+    event_type = models.CharField(max_length=50)
+    reference = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='received')
+    payload = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-received_at']
+        verbose_name = "Webhook Event"
+        verbose_name_plural = "Webhook Events"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'event_type', 'reference'], name='unique_webhook_event_reference'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type} {self.reference} ({self.status})"
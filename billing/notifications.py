@@ -2,6 +2,9 @@ from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
+from django.contrib.auth import get_user_model
+from core.jobs import submit_job
+from .bulk_mail import create_campaign, run_campaign
 from .models import BillingSettings, BillingEvent
 import logging
 
@@ -165,40 +168,40 @@ class BillingNotificationService:
             logger.error(f"Failed to send trial ending email to {subscription.user.email}: {e}")
             return False
     
+    def _billing_activation_campaign(self, users_queryset):
+        return create_campaign(
+            name='Billing activation announcement',
+            template_name='billing/emails/billing_activation',
+            subject="Important Update: Subscription Plans Now Available",
+            users=users_queryset,
+        )
+
     def send_billing_activation_announcement(self, users_queryset):
         """Send email to all users announcing billing activation"""
         if not self.should_send_email():
             return 0
-        
-        sent_count = 0
-        
-        for user in users_queryset:
-            try:
-                subject = "Important Update: Subscription Plans Now Available"
-                
-                context = {
-                    'user': user,
-                    'billing_settings': self.billing_settings,
-                }
-                
-                html_message = render_to_string('billing/emails/billing_activation.html', context)
-                text_message = render_to_string('billing/emails/billing_activation.txt', context)
-                
-                send_mail(
-                    subject=subject,
-                    message=text_message,
-                    from_email=self.get_from_email(),
-                    recipient_list=[user.email],
-                    html_message=html_message,
-                    fail_silently=False,
-                )
-                
-                sent_count += 1
-                
-            except Exception as e:
-                logger.error(f"Failed to send billing activation email to {user.email}: {e}")
-        
-        return sent_count
+
+        campaign = self._billing_activation_campaign(users_queryset)
+        run_campaign(
+            campaign,
+            users_queryset,
+            from_email=self.get_from_email(),
+            context={'billing_settings': self.billing_settings},
+        )
+        return campaign.sent_count
+
+    def start_billing_activation_announcement(self):
+        """Queue the billing activation announcement to every recipient as a background job"""
+        if not self.should_send_email():
+            return None
+
+        campaign = self._billing_activation_campaign(activation_announcement_recipients())
+        return submit_job('billing_activation_announcement', {'campaign_id': campaign.pk})
+
+
+def activation_announcement_recipients():
+    """Users the billing activation announcement goes to"""
+    return get_user_model().objects.filter(is_active=True, is_email_verified=True).order_by('pk')
 
 
 # Convenience functions
@@ -230,3 +233,9 @@ def send_billing_activation_announcement(users_queryset):
     """Send billing activation announcement to users"""
     service = BillingNotificationService()
     return service.send_billing_activation_announcement(users_queryset)
+
+
+def start_billing_activation_announcement():
+    """Queue the billing activation announcement as a background job"""
+    service = BillingNotificationService()
+    return service.start_billing_activation_announcement()
@@ -4,12 +4,23 @@ import hashlib
 import hmac
 from decimal import Decimal
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
-from .models import BillingSettings, Payment, UserSubscription
+from .models import BillingSettings, Payment, UserSubscription, WebhookEvent
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Charge events applied through the webhook ledger, by handler method
+EVENT_HANDLERS = {
+    'charge.success': 'handle_successful_payment',
+    'charge.failed': 'handle_failed_payment',
+}
+PROCESSED_EVENT_KEY = 'paystack_event_processed_{event_type}_{reference}'
+PROCESSED_EVENT_TIMEOUT = 60 * 60 * 24  # 24 hours; later retries are answered by the ledger
+
 
 class PaystackService:
     """Service class for Paystack payment integration"""
@@ -44,12 +55,8 @@ class PaystackService:
                 amount=plan.get_monthly_price_ghs() if billing_cycle == 'monthly' else plan.get_yearly_price_ghs(),
                 currency='GHS',
                 status='pending',
-                payment_method='paystack',
-                metadata={
-                    'plan_id': str(plan.id),
-                    'billing_cycle': billing_cycle,
-                    'amount_pesewas': amount,
-                }
+                provider='paystack',
+                description=f"{plan.name} ({billing_cycle})",
             )
             
             # Prepare Paystack payload
@@ -90,11 +97,7 @@ class PaystackService:
                 data = response.json()
                 if data['status']:
                     # Update payment with Paystack reference
-                    payment.provider_transaction_id = data['data']['reference']
-                    payment.metadata.update({
-                        'paystack_access_code': data['data']['access_code'],
-                        'authorization_url': data['data']['authorization_url']
-                    })
+                    payment.provider_payment_id = data['data']['reference']
                     payment.save()
                     
                     return {
@@ -153,10 +156,8 @@ class PaystackService:
             event_data = json.loads(payload)
             event_type = event_data.get('event')
             
-            if event_type == 'charge.success':
-                return self.handle_successful_payment(event_data['data'])
-            elif event_type == 'charge.failed':
-                return self.handle_failed_payment(event_data['data'])
+            if event_type in EVENT_HANDLERS:
+                return self.apply_event(event_type, event_data['data'])
             else:
                 logger.info(f"Unhandled webhook event: {event_type}")
                 return {'success': True, 'message': 'Event not handled'}
@@ -165,6 +166,60 @@ class PaystackService:
             logger.error(f"Webhook processing error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def apply_event(self, event_type, payment_data):
+        """
+        Apply a charge event at most once.
+
+        Every event is recorded in the WebhookEvent ledger, unique per event
+        type and transaction reference. The ledger row is locked while the
+        payment and subscription are updated, so retried webhooks and the
+        payment callback can arrive together without applying a charge twice.
+        Events already processed are answered from the cache.
+        """
+        reference = payment_data.get('reference')
+        if not reference:
+            return {'success': False, 'error': 'Reference not found'}
+        
+        processed_key = PROCESSED_EVENT_KEY.format(event_type=event_type, reference=reference)
+        if cache.get(processed_key):
+            return {'success': True, 'message': 'Event already processed'}
+        
+        event, created = WebhookEvent.objects.get_or_create(
+            provider='paystack',
+            event_type=event_type,
+            reference=reference,
+            defaults={'payload': payment_data}
+        )
+        
+        try:
+            with transaction.atomic():
+                event = WebhookEvent.objects.select_for_update().get(pk=event.pk)
+                if event.status == 'processed':
+                    result = {'success': True, 'message': 'Event already processed'}
+                else:
+                    result = getattr(self, EVENT_HANDLERS[event_type])(payment_data)
+                    if not result['success']:
+                        # Roll back partial writes; the event stays open for retries
+                        transaction.set_rollback(True)
+                    else:
+                        event.status = 'processed'
+                        event.attempts += 1
+                        event.error = ''
+                        event.processed_at = timezone.now()
+                        event.save(update_fields=['status', 'attempts', 'error', 'processed_at'])
+                        transaction.on_commit(
+                            lambda: cache.set(processed_key, True, PROCESSED_EVENT_TIMEOUT)
+                        )
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        
+        if not result['success']:
+            WebhookEvent.objects.filter(pk=event.pk).exclude(status='processed').update(
+                status='failed', attempts=F('attempts') + 1, error=result['error']
+            )
+        
+        return result
+    
     def verify_webhook_signature(self, payload, signature):
         """Verify Paystack webhook signature"""
         try:
@@ -178,64 +233,58 @@ class PaystackService:
             return False
     
     def handle_successful_payment(self, payment_data):
-        """Handle successful payment"""
+        """Handle successful payment; call through apply_event"""
         try:
             reference = payment_data['reference']
-            metadata = payment_data.get('metadata', {})
+            metadata = payment_data.get('metadata') or {}
             payment_id = metadata.get('payment_id')
             
             if not payment_id:
                 logger.error(f"No payment_id in metadata for reference: {reference}")
                 return {'success': False, 'error': 'Payment ID not found'}
             
+            payment = Payment.objects.select_for_update().get(id=payment_id)
+            if payment.status == 'succeeded':
+                logger.info(f"Payment {payment.id} already succeeded, skipping reference: {reference}")
+                return {'success': True, 'message': 'Payment already processed'}
+            
             # Update payment record
-            payment = Payment.objects.get(id=payment_id)
-            payment.status = 'completed'
-            payment.provider_transaction_id = reference
-            payment.completed_at = timezone.now()
-            payment.metadata.update({
-                'paystack_response': payment_data
-            })
-            payment.save()
+            payment.status = 'succeeded'
+            payment.provider = 'paystack'
+            payment.provider_payment_id = reference
+            payment.processed_at = timezone.now()
             
             # Create or update subscription
             plan_id = metadata.get('plan_id')
             billing_cycle = metadata.get('billing_cycle', 'monthly')
             
             if plan_id:
+                from dateutil.relativedelta import relativedelta
                 from .models import SubscriptionPlan
                 plan = SubscriptionPlan.objects.get(id=plan_id)
                 
                 # Calculate subscription period
+                now = timezone.now()
                 if billing_cycle == 'yearly':
-                    from dateutil.relativedelta import relativedelta
-                    end_date = timezone.now() + relativedelta(years=1)
+                    end_date = now + relativedelta(years=1)
                 else:
-                    from dateutil.relativedelta import relativedelta
-                    end_date = timezone.now() + relativedelta(months=1)
+                    end_date = now + relativedelta(months=1)
                 
-                # Create or update subscription
-                subscription, created = UserSubscription.objects.get_or_create(
-                    user=payment.user,
-                    defaults={
-                        'plan': plan,
-                        'status': 'active',
-                        'current_period_start': timezone.now(),
-                        'current_period_end': end_date,
-                        'billing_cycle': billing_cycle,
-                    }
-                )
+                subscription = UserSubscription.objects.select_for_update().filter(user_id=payment.user_id).first()
+                created = subscription is None
+                if created:
+                    subscription = UserSubscription(user_id=payment.user_id)
                 
-                if not created:
-                    # Update existing subscription
-                    subscription.plan = plan
-                    subscription.status = 'active'
-                    subscription.current_period_start = timezone.now()
-                    subscription.current_period_end = end_date
-                    subscription.billing_cycle = billing_cycle
-                    subscription.save()
+                subscription.plan = plan
+                subscription.status = 'active'
+                subscription.current_period_start = now
+                subscription.current_period_end = end_date
+                subscription.save()
                 
-                logger.info(f"Subscription {'created' if created else 'updated'} for user {payment.user.email}")
+                payment.subscription = subscription
+                logger.info(f"Subscription {'created' if created else 'updated'} for user {payment.user_id}")
+            
+            payment.save()
             
             return {'success': True, 'message': 'Payment processed successfully'}
             
@@ -244,19 +293,23 @@ class PaystackService:
             return {'success': False, 'error': str(e)}
     
     def handle_failed_payment(self, payment_data):
-        """Handle failed payment"""
+        """Handle failed payment; call through apply_event"""
         try:
             reference = payment_data['reference']
-            metadata = payment_data.get('metadata', {})
+            metadata = payment_data.get('metadata') or {}
             payment_id = metadata.get('payment_id')
             
             if payment_id:
-                payment = Payment.objects.get(id=payment_id)
+                payment = Payment.objects.select_for_update().get(id=payment_id)
+                if payment.status == 'succeeded':
+                    # A late failure must not undo a completed charge
+                    logger.info(f"Ignoring failure for succeeded payment reference: {reference}")
+                    return {'success': True, 'message': 'Payment already succeeded'}
+                
                 payment.status = 'failed'
-                payment.metadata.update({
-                    'paystack_response': payment_data,
-                    'failure_reason': payment_data.get('gateway_response', 'Payment failed')
-                })
+                payment.provider = 'paystack'
+                payment.provider_payment_id = reference
+                payment.failure_reason = payment_data.get('gateway_response', 'Payment failed')
                 payment.save()
                 
                 logger.info(f"Payment failed for reference: {reference}")
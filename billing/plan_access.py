@@ -0,0 +1,72 @@
+"""
+In-memory index of the subjects each subscription plan unlocks.
+
+All plan/subject pairs are loaded with one query into a frozenset of subject
+ids per plan. Plans without allowed subjects are unrestricted and have no
+entry. The index is rebuilt after ``allowed_subjects`` changes: the local
+copy is dropped immediately and a new version stamp is published in the
+cache once the transaction commits, so other processes reload on their next
+lookup.
+"""
+
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'plan_subject_index_version'
+
+
+class PlanSubjectIndex:
+    """Subject ids allowed per plan"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subjects = None
+        self._version = None
+        self.reloads = 0
+
+    def _load(self):
+        from .models import SubscriptionPlan
+
+        through = SubscriptionPlan.allowed_subjects.through
+        subjects = {}
+        for plan_id, subject_id in through.objects.values_list('subscriptionplan_id', 'subject_id'):
+            subjects.setdefault(plan_id, set()).add(subject_id)
+        return {plan_id: frozenset(subject_ids) for plan_id, subject_ids in subjects.items()}
+
+    def _current(self):
+        version = cache.get(VERSION_KEY)
+        subjects = self._subjects
+        if subjects is not None and version is not None and version == self._version:
+            return subjects
+
+        if version is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+
+        subjects = self._load()
+        with self._lock:
+            self._subjects = subjects
+            self._version = version
+            self.reloads += 1
+        return subjects
+
+    def subject_ids(self, plan_id):
+        """Frozenset of subject ids the plan allows, or None when unrestricted"""
+        return self._current().get(plan_id)
+
+    def invalidate(self):
+        """Drop the local index now and publish a new version after commit"""
+        with self._lock:
+            self._subjects = None
+            self._version = None
+
+        transaction.on_commit(self._publish_version)
+
+    def _publish_version(self):
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+plan_subject_index = PlanSubjectIndex()
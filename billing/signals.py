@@ -0,0 +1,41 @@
+"""
+Signal handlers for the billing app
+"""
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from subjects.models import Subject
+from .entitlements import invalidate_entitlements, invalidate_all_entitlements
+from .models import SubscriptionPlan, UserSubscription, Payment
+from .plan_access import plan_subject_index
+
+
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_user_entitlements(sender, instance, **kwargs):
+    """A user's subscription or payments changed"""
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def invalidate_plan_entitlements(sender, instance, **kwargs):
+    """Plan limits and features are part of every subscriber's entitlements"""
+    invalidate_all_entitlements()
+
+
+@receiver(m2m_changed, sender=SubscriptionPlan.allowed_subjects.through)
+def rebuild_plan_subject_index(sender, action, **kwargs):
+    """Allowed subjects changed, possibly from the Subject side of the relation"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        plan_subject_index.invalidate()
+
+
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=SubscriptionPlan)
+def drop_deleted_from_plan_subject_index(sender, instance, **kwargs):
+    """Cascaded deletes of allowed_subjects rows send no m2m_changed"""
+    plan_subject_index.invalidate()
@@ -1,3 +1,446 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import smtplib
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from subjects.models import Subject, ClassLevel, Topic
+from .bulk_mail import create_campaign, run_campaign
+from .context_processors import billing_context
+from .entitlements import get_entitlements
+from .notifications import send_billing_activation_announcement, start_billing_activation_announcement
+from .paystack import PaystackService
+from .models import (
+    BillingSettings, SubscriptionPlan, UserSubscription, DailyUsage, EmailCampaign, Payment, WebhookEvent,
+    billing_settings_snapshot
+)
+from .plan_access import plan_subject_index
+from .usage import consume_quiz, quizzes_used_today
+
+
+class EntitlementsTestCase(TestCase):
+    """Test cases for cached billing entitlements"""
+
+    def setUp(self):
+        cache.clear()
+        billing_settings_snapshot.clear()
+        settings = BillingSettings.get_settings()
+        settings.billing_enabled = True
+        settings.save()
+
+        self.user = get_user_model().objects.create_user(email='subscriber@test.com', password='testpass123')
+        self.subject = Subject.objects.create(name='Mathematics')
+        self.other_subject = Subject.objects.create(name='Science')
+        self.plan = SubscriptionPlan.objects.create(
+            name='Basic', monthly_price=Decimal('5.00'), price=Decimal('5.00'), max_quizzes_per_day=3
+        )
+        self.plan.allowed_subjects.add(self.subject)
+        self.subscription = UserSubscription.objects.create(user=self.user, plan=self.plan, status='active')
+
+    def fresh_user(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_billing_checks_are_free_once_cached(self):
+        """Middleware and context processor share cached entitlements"""
+        get_entitlements(self.fresh_user())
+        # Settings read inside a transaction are only kept once it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            BillingSettings.get_settings()
+
+        request = RequestFactory().get('/')
+        request.user = self.fresh_user()
+        with self.assertNumQueries(0):
+            entitlements = get_entitlements(request.user)
+            context = billing_context(request)
+
+        self.assertTrue(entitlements.is_active)
+        self.assertEqual(entitlements.max_quizzes_per_day, 3)
+        self.assertTrue(entitlements.can_access_subject(self.subject.id))
+        self.assertFalse(entitlements.can_access_subject(self.other_subject.id))
+        self.assertEqual(context['user_subscription'].plan.name, 'Basic')
+        self.assertTrue(context['user_subscription_active'])
+
+    def test_subscription_change_invalidates(self):
+        self.assertTrue(get_entitlements(self.fresh_user()).is_active)
+
+        self.subscription.status = 'past_due'
+        self.subscription.save()
+
+        entitlements = get_entitlements(self.fresh_user())
+        self.assertFalse(entitlements.is_active)
+        self.assertEqual(entitlements.status, 'past_due')
+
+    def test_plan_subject_change_invalidates(self):
+        self.assertFalse(get_entitlements(self.fresh_user()).can_access_subject(self.other_subject.id))
+
+        self.plan.allowed_subjects.add(self.other_subject)
+
+        self.assertTrue(get_entitlements(self.fresh_user()).can_access_subject(self.other_subject.id))
+
+    def test_user_without_subscription(self):
+        self.subscription.delete()
+
+        entitlements = get_entitlements(self.fresh_user())
+
+        self.assertFalse(entitlements.has_subscription)
+        self.assertFalse(entitlements.is_active)
+        self.assertIsNone(entitlements.max_quizzes_per_day)
+
+
+@override_settings(ANALYTICS_BUFFER_ENABLED=False)
+class PlanSubjectIndexTestCase(TestCase):
+    """Test cases for in-memory plan subject access"""
+
+    def setUp(self):
+        cache.clear()
+        plan_subject_index.invalidate()
+        self.subjects = [Subject.objects.create(name=f'Subject {number}', order=number) for number in range(12)]
+        self.plan = SubscriptionPlan.objects.create(name='Basic', monthly_price=Decimal('5.00'), price=Decimal('5.00'))
+        self.plan.allowed_subjects.set(self.subjects[:4])
+        self.unlimited_plan = SubscriptionPlan.objects.create(
+            name='Premium', monthly_price=Decimal('9.00'), price=Decimal('9.00')
+        )
+
+    def test_subject_checks_are_free_once_loaded(self):
+        self.assertEqual(self.plan.subject_count_display, '4 subjects')
+
+        with self.assertNumQueries(0):
+            allowed = [subject for subject in self.subjects if self.plan.can_access_subject(subject)]
+            self.assertTrue(all(self.unlimited_plan.can_access_subject(subject) for subject in self.subjects))
+            self.assertEqual(self.unlimited_plan.subject_count_display, 'All subjects')
+
+        self.assertEqual(allowed, self.subjects[:4])
+
+    def test_subject_grid_is_filtered_in_one_query(self):
+        self.plan.allowed_subject_ids
+
+        with self.assertNumQueries(1):
+            grid = list(self.plan.filter_accessible_subjects(Subject.objects.order_by('order')))
+
+        self.assertEqual(grid, self.subjects[:4])
+
+    def test_index_is_rebuilt_on_m2m_change(self):
+        self.assertFalse(self.plan.can_access_subject(self.subjects[5]))
+
+        self.subjects[5].subscriptionplan_set.add(self.plan)
+        self.assertTrue(self.plan.can_access_subject(self.subjects[5]))
+
+        self.plan.allowed_subjects.clear()
+        self.assertIsNone(self.plan.allowed_subject_ids)
+        self.assertEqual(self.plan.subject_count_display, 'All subjects')
+
+    def test_index_drops_deleted_subjects(self):
+        self.assertEqual(self.plan.subject_count_display, '4 subjects')
+
+        self.subjects[0].delete()
+        self.assertEqual(self.plan.subject_count_display, '3 subjects')
+
+        Subject.objects.filter(pk__in=[subject.pk for subject in self.subjects[1:4]]).delete()
+        self.assertIsNone(self.plan.allowed_subject_ids)
+        self.assertTrue(self.plan.can_access_subject(self.subjects[8]))
+
+    def test_index_drops_deleted_plans(self):
+        plan_id = self.plan.pk
+        self.assertIsNotNone(plan_subject_index.subject_ids(plan_id))
+
+        self.plan.delete()
+        self.assertIsNone(plan_subject_index.subject_ids(plan_id))
+
+
+class DailyQuizLimitTestCase(TestCase):
+    """Test cases for the daily quiz limit"""
+
+    def setUp(self):
+        cache.clear()
+        billing_settings_snapshot.clear()
+        settings = BillingSettings.get_settings()
+        settings.billing_enabled = True
+        settings.save()
+
+        self.user = get_user_model().objects.create_user(email='learner@test.com', password='testpass123')
+        plan = SubscriptionPlan.objects.create(
+            name='Basic', monthly_price=Decimal('5.00'), price=Decimal('5.00'), max_quizzes_per_day=2
+        )
+        UserSubscription.objects.create(user=self.user, plan=plan, status='active')
+
+    def create_topic(self):
+        subject = Subject.objects.create(name='Science')
+        class_level = ClassLevel.objects.create(subject=subject, name='Grade 6', level_number=6)
+        return Topic.objects.create(class_level=class_level, title='Plants', order=1)
+
+    def test_counter_stops_at_limit(self):
+        self.assertTrue(consume_quiz(self.user, 2))
+        self.assertTrue(consume_quiz(self.user, 2))
+        self.assertFalse(consume_quiz(self.user, 2))
+
+        self.assertEqual(DailyUsage.objects.get(user=self.user).quiz_count, 2)
+        self.assertEqual(quizzes_used_today(self.user), 2)
+
+    def test_exhausted_limit_is_rejected_without_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            consume_quiz(self.user, 1)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(consume_quiz(self.user, 1))
+
+    def test_database_counter_is_authoritative(self):
+        """A worker whose cache missed other workers' increments still enforces the limit"""
+        consume_quiz(self.user, 2)
+        DailyUsage.objects.filter(user=self.user).update(quiz_count=2)
+
+        self.assertFalse(consume_quiz(self.user, 2))
+
+    def test_submission_rejected_before_view_runs(self):
+        self.client.force_login(self.user)
+        url = reverse('content:submit_quiz')
+        consume_quiz(self.user, 2)
+        consume_quiz(self.user, 2)
+
+        with mock.patch('content.views.get_object_or_404') as view_lookup:
+            response = self.client.post(url, data='{}', content_type='application/json')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(response.json()['success'])
+        view_lookup.assert_not_called()
+        self.assertEqual(DailyUsage.objects.get(user=self.user).quiz_count, 2)
+
+    def test_accepted_submission_is_counted(self):
+        self.client.force_login(self.user)
+        topic = self.create_topic()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('content:submit_quiz'), data={'topic_id': str(topic.pk), 'answers': {}},
+                content_type='application/json'
+            )
+
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(DailyUsage.objects.get(user=self.user).quiz_count, 1)
+        self.assertEqual(quizzes_used_today(self.user), 1)
+
+    def test_failed_submission_is_not_counted(self):
+        self.client.force_login(self.user)
+        topic = self.create_topic()
+
+        with mock.patch('content.views.Quiz.objects.create', side_effect=DatabaseError('disk full')):
+            response = self.client.post(
+                reverse('content:submit_quiz'), data={'topic_id': str(topic.pk), 'answers': {}},
+                content_type='application/json'
+            )
+
+        self.assertFalse(response.json()['success'])
+        self.assertFalse(DailyUsage.objects.filter(user=self.user, quiz_count__gt=0).exists())
+        self.assertEqual(quizzes_used_today(self.user), 0)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class BulkMailTestCase(TestCase):
+    """Test cases for bulk billing emails"""
+
+    def setUp(self):
+        billing_settings_snapshot.clear()
+        settings = BillingSettings.get_settings()
+        settings.send_billing_emails = True
+        settings.save()
+
+        User = get_user_model()
+        for number in range(5):
+            User.objects.create_user(email=f'user{number}@test.com', password='testpass123')
+        self.users = User.objects.order_by('id')
+
+    def test_announcement_sent_over_one_connection(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as open_connection:
+            sent_count = send_billing_activation_announcement(self.users)
+
+        self.assertEqual(sent_count, 5)
+        self.assertEqual(open_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), sorted(u.email for u in self.users))
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+
+        campaign = EmailCampaign.objects.get()
+        self.assertEqual(campaign.status, 'completed')
+        self.assertEqual(campaign.total_recipients, 5)
+        self.assertEqual(campaign.progress_percentage, 100)
+
+    def test_failed_recipient_is_recorded(self):
+        backend = 'django.core.mail.backends.locmem.EmailBackend'
+        original_send = mail.get_connection(backend).__class__.send_messages
+
+        def send_messages(connection, messages):
+            if messages[0].to == ['user2@test.com']:
+                raise ConnectionError('mailbox unavailable')
+            return original_send(connection, messages)
+
+        campaign = create_campaign('Test', 'billing/emails/billing_activation', 'Hello', self.users)
+        with mock.patch(f'{backend}.send_messages', send_messages):
+            run_campaign(campaign, self.users, 'billing@test.com', context={}, batch_size=2)
+
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, 'completed')
+        self.assertEqual(campaign.sent_count, 4)
+        self.assertEqual(campaign.failed_count, 1)
+        self.assertEqual(campaign.failures, [{'email': 'user2@test.com', 'error': 'mailbox unavailable'}])
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_dropped_connection_is_reopened(self):
+        backend = 'django.core.mail.backends.locmem.EmailBackend'
+        original_send = mail.get_connection(backend).__class__.send_messages
+        state = {'connected': False, 'opens': 0}
+
+        def open_connection(connection):
+            state['connected'] = True
+            state['opens'] += 1
+
+        def send_messages(connection, messages):
+            if messages[0].to == ['user1@test.com']:
+                state['connected'] = False
+            if not state['connected']:
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+            return original_send(connection, messages)
+
+        campaign = create_campaign('Test', 'billing/emails/billing_activation', 'Hello', self.users)
+        with mock.patch(f'{backend}.open', open_connection), mock.patch(f'{backend}.send_messages', send_messages):
+            run_campaign(campaign, self.users, 'billing@test.com', context={})
+
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.sent_count, campaign.failed_count), (4, 1))
+        self.assertEqual(state['opens'], 2)
+
+    @override_settings(BACKGROUND_JOBS_EAGER=True)
+    def test_announcement_runs_as_background_job(self):
+        self.users.filter(email__in=['user0@test.com', 'user3@test.com']).update(is_email_verified=True)
+
+        job = start_billing_activation_announcement()
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.result['sent_count'], 2)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['user0@test.com', 'user3@test.com'])
+        self.assertEqual(EmailCampaign.objects.get(pk=job.result['campaign_id']).status, 'completed')
+
+    def test_missing_template_fails_campaign(self):
+        campaign = create_campaign('Test', 'billing/emails/does_not_exist', 'Hello', self.users)
+
+        run_campaign(campaign, self.users, 'billing@test.com')
+
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, 'failed')
+        self.assertIn('does_not_exist', campaign.error)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+@override_settings(ANALYTICS_BUFFER_ENABLED=False)
+class PaystackWebhookLedgerTestCase(TestCase):
+    """Test cases for idempotent Paystack webhook processing"""
+
+    def setUp(self):
+        cache.clear()
+        billing_settings_snapshot.clear()
+        settings = BillingSettings.get_settings()
+        settings.paystack_secret_key = 'sk_test_secret'
+        settings.save()
+
+        self.user = get_user_model().objects.create_user(email='payer@test.com', password='testpass123')
+        self.plan = SubscriptionPlan.objects.create(name='Basic', monthly_price=Decimal('5.00'), price=Decimal('5.00'))
+        self.payment = Payment.objects.create(user=self.user, amount=Decimal('60.00'), currency='GHS', provider='paystack')
+
+    def charge(self, event='charge.success'):
+        return {
+            'event': event,
+            'data': {
+                'reference': 'Pentora_ref_1',
+                'gateway_response': 'Declined',
+                'metadata': {
+                    'payment_id': str(self.payment.id),
+                    'plan_id': str(self.plan.id),
+                    'billing_cycle': 'monthly',
+                },
+            },
+        }
+
+    def post_webhook(self, event_data):
+        payload = json.dumps(event_data)
+        signature = hmac.new(b'sk_test_secret', payload.encode('utf-8'), hashlib.sha512).hexdigest()
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('billing:paystack_webhook'), data=payload, content_type='application/json',
+                HTTP_X_PAYSTACK_SIGNATURE=signature
+            )
+
+    def test_charge_is_applied_once(self):
+        response = self.post_webhook(self.charge())
+
+        self.assertEqual(response.status_code, 200)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'succeeded')
+        subscription = UserSubscription.objects.get(user=self.user)
+        self.assertEqual(subscription.status, 'active')
+        self.assertEqual(self.payment.subscription, subscription)
+
+        period_end = subscription.current_period_end
+        cache.clear()
+        self.assertEqual(self.post_webhook(self.charge()).status_code, 200)
+
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.current_period_end, period_end)
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, 'processed')
+        self.assertEqual(event.attempts, 1)
+
+    def test_processed_event_is_rejected_from_cache(self):
+        paystack = PaystackService()
+        with self.captureOnCommitCallbacks(execute=True):
+            paystack.apply_event('charge.success', self.charge()['data'])
+
+        with self.assertNumQueries(0):
+            result = paystack.apply_event('charge.success', self.charge()['data'])
+
+        self.assertEqual(result['message'], 'Event already processed')
+
+    def test_failed_processing_is_retried(self):
+        event_data = self.charge()
+        event_data['data']['metadata']['plan_id'] = '00000000-0000-0000-0000-000000000000'
+
+        self.assertEqual(self.post_webhook(event_data).status_code, 400)
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, 'failed')
+        self.assertEqual(event.attempts, 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+
+        self.assertEqual(self.post_webhook(self.charge()).status_code, 200)
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'processed')
+        self.assertEqual(event.attempts, 2)
+
+    def test_callback_reports_charge_that_was_not_applied(self):
+        self.client.force_login(self.user)
+        payment_data = self.charge()['data']
+        payment_data['status'] = 'success'
+        del payment_data['metadata']['payment_id']
+
+        with mock.patch.object(PaystackService, 'verify_payment', return_value={'success': True, 'data': payment_data}):
+            response = self.client.get(reverse('billing:paystack_callback'), {'reference': 'Pentora_ref_1'}, follow=True)
+
+        messages = [str(message) for message in response.context['messages']]
+        self.assertTrue(any('could not be activated yet' in message for message in messages))
+        self.assertFalse(any('has been activated' in message for message in messages))
+        self.assertFalse(UserSubscription.objects.filter(user=self.user).exists())
+
+    def test_late_failure_does_not_undo_success(self):
+        self.post_webhook(self.charge())
+        self.post_webhook(self.charge('charge.failed'))
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'succeeded')
+        self.assertEqual(WebhookEvent.objects.count(), 2)
@@ -0,0 +1,109 @@
+"""
+Daily quiz usage counters.
+
+Each user's quizzes for the day are counted in a DailyUsage row, which is
+also the audit record. Consuming a quiz is a single conditional
+``UPDATE ... SET quiz_count = quiz_count + 1 WHERE quiz_count < limit``, so
+the limit holds across worker processes without locks or counting scans.
+The quiz submission view consumes the quota inside the transaction that
+records the quiz, so a submission that fails is not counted. The count is
+mirrored in the cache with atomic increments once that transaction commits:
+reads of the remaining quota are served from there, and users already at
+their limit are turned away without touching the database.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .entitlements import get_entitlements
+from .models import BillingSettings, DailyUsage
+
+QUIZ_COUNTER_KEY = 'quiz_usage_{user_id}_{date}'
+
+
+def _counter_key(user_id, date):
+    return QUIZ_COUNTER_KEY.format(user_id=user_id, date=date.isoformat())
+
+
+def _seconds_until_tomorrow():
+    now = timezone.localtime()
+    tomorrow = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), time.min))
+    return max(int((tomorrow - now).total_seconds()), 1)
+
+
+def daily_quiz_limit(user):
+    """
+    The user's daily quiz limit, or None when no limit applies: billing is
+    off, the user is anonymous or staff, or the plan is unlimited.
+    """
+    if not BillingSettings.get_settings().billing_enabled or not user.is_authenticated:
+        return None
+    if user.is_superuser or user.is_staff:
+        return None
+    return get_entitlements(user).max_quizzes_per_day or None
+
+
+def quizzes_used_today(user):
+    """Quizzes the user has taken today"""
+    today = timezone.localdate()
+    key = _counter_key(user.pk, today)
+
+    used = cache.get(key)
+    if used is None:
+        used = DailyUsage.objects.filter(user=user, date=today).values_list('quiz_count', flat=True).first() or 0
+        cache.add(key, used, _seconds_until_tomorrow())
+    return used
+
+
+def quizzes_remaining_today(user, limit):
+    """Quizzes left today under ``limit`` (None when unlimited)"""
+    if not limit:
+        return None
+    return max(limit - quizzes_used_today(user), 0)
+
+
+def consume_quiz(user, limit):
+    """
+    Count one quiz against today's ``limit``.
+
+    Returns False, without counting, when the limit is already reached.
+    Called inside the transaction that records the quiz, the count is rolled
+    back with it and the cached count only moves once it commits.
+    """
+    today = timezone.localdate()
+    key = _counter_key(user.pk, today)
+
+    used = cache.get(key)
+    if used is not None and used >= limit:
+        return False
+
+    counted = DailyUsage.objects.filter(
+        user=user, date=today, quiz_count__lt=limit
+    ).update(quiz_count=F('quiz_count') + 1, updated_at=timezone.now())
+
+    if not counted and not DailyUsage.objects.filter(user=user, date=today).exists():
+        # First quiz of the day; a concurrent request may create the row first
+        DailyUsage.objects.bulk_create([DailyUsage(user=user, date=today)], ignore_conflicts=True)
+        counted = DailyUsage.objects.filter(
+            user=user, date=today, quiz_count__lt=limit
+        ).update(quiz_count=F('quiz_count') + 1, updated_at=timezone.now())
+
+    if not counted:
+        cache.set(key, limit, _seconds_until_tomorrow())
+        return False
+
+    transaction.on_commit(lambda: _mirror_quiz_count(user, key, today))
+    return True
+
+
+def _mirror_quiz_count(user, key, today):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Not cached in this process yet: seed from the database
+        count = DailyUsage.objects.filter(user=user, date=today).values_list('quiz_count', flat=True).first()
+        cache.set(key, count, _seconds_until_tomorrow())
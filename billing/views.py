@@ -17,6 +17,7 @@ from .models import (
 import json
 import logging
 from .paystack import PaystackService
+from .usage import quizzes_remaining_today
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +32,7 @@ class BillingPlansView(TemplateView):
 
         context.update({
             'billing_enabled': billing_settings.billing_enabled,
-            'plans': SubscriptionPlan.objects.filter(is_active=True).order_by('sort_order', 'price'),
+            'plans': SubscriptionPlan.objects.filter(is_active=True).order_by('sort_order', 'price').prefetch_related('allowed_subjects'),
             'current_subscription': self.get_current_subscription(),
             'billing_settings': billing_settings,
         })
@@ -319,6 +320,9 @@ def billing_status_api(request):
             'days_until_expiry': subscription.days_until_expiry,
             'usage_limits': subscription.get_usage_limits(),
         }
+        data['quizzes_remaining_today'] = quizzes_remaining_today(
+            request.user, data['usage_limits']['max_quizzes_per_day']
+        )
     except UserSubscription.DoesNotExist:
         data = {
             'has_subscription': False,
@@ -328,6 +332,7 @@ def billing_status_api(request):
             'current_period_end': None,
             'days_until_expiry': None,
             'usage_limits': {'max_subjects': None, 'max_quizzes_per_day': None},
+            'quizzes_remaining_today': None,
         }
 
     return JsonResponse(data)
@@ -390,8 +395,18 @@ class PaystackCallbackView(LoginRequiredMixin, View):
             payment_data = result['data']
 
             if payment_data['status'] == 'success':
-                # Payment successful
-                messages.success(request, 'Payment successful! Your subscription has been activated.')
+                # Payment successful; apply it now in case the webhook is late
+                applied = paystack.apply_event('charge.success', payment_data)
+                if applied['success']:
+                    messages.success(request, 'Payment successful! Your subscription has been activated.')
+                else:
+                    # The webhook retries the charge; the subscription is not active yet
+                    logger.error(f"Paystack callback could not apply {reference}: {applied['error']}")
+                    messages.warning(
+                        request,
+                        'Payment received, but your subscription could not be activated yet. '
+                        'It will be activated shortly; please contact support if it is not.'
+                    )
                 return redirect('billing:dashboard')
             else:
                 # Payment failed
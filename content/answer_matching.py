@@ -0,0 +1,208 @@
+"""
+Compiled text-answer matching for fill-in, short answer and true/false questions.
+
+A question's acceptable answers are normalized once into an ``AnswerMatcher``
+(cached per ``correct_answer``/``question_type`` pair), so validating a
+submission only normalizes the user's answer and runs the matching stages
+against pre-computed data.
+"""
+
+import re
+from functools import lru_cache
+
+TRAILING_PUNCTUATION = '.,!?;:'
+
+# British -> American spelling variations, applied in this order
+SPELLING_VARIANTS = (
+    ('colour', 'color'),
+    ('grey', 'gray'),
+    ('centre', 'center'),
+    ('metre', 'meter'),
+    ('litre', 'liter'),
+    ('realise', 'realize'),
+    ('organise', 'organize'),
+)
+SPELLING_VARIANTS_RE = re.compile('|'.join(re.escape(old) for old, new in SPELLING_VARIANTS))
+
+TRUE_VARIATIONS = frozenset(['true', 't', 'yes', 'y', '1', 'correct', 'right'])
+FALSE_VARIATIONS = frozenset(['false', 'f', 'no', 'n', '0', 'incorrect', 'wrong'])
+
+SIMILARITY_THRESHOLD = 0.8
+MAX_LENGTH_DIFFERENCE = 2
+MATCHER_CACHE_SIZE = 4096
+
+
+def normalize_answer(answer):
+    """
+    Normalize answer text for comparison: lowercase, collapse whitespace,
+    drop one trailing punctuation mark and unify common spelling variants.
+    """
+    if not answer:
+        return ""
+
+    normalized = ' '.join(answer.lower().split())
+
+    if normalized and normalized[-1] in TRAILING_PUNCTUATION:
+        normalized = normalized[:-1]
+
+    # One regex scan decides whether any replacement pass is needed at all
+    if SPELLING_VARIANTS_RE.search(normalized):
+        for old, new in SPELLING_VARIANTS:
+            normalized = normalized.replace(old, new)
+
+    return normalized
+
+
+def bounded_edit_distance(s1, s2, max_distance):
+    """
+    Levenshtein distance limited to ``max_distance``.
+
+    Only the diagonal band of width ``2 * max_distance + 1`` is evaluated and
+    the computation stops as soon as every cell in a row exceeds the bound.
+    Returns ``max_distance + 1`` when the real distance is larger.
+    """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+
+    len1, len2 = len(s1), len(s2)
+    if len1 - len2 > max_distance:
+        return max_distance + 1
+    if len2 == 0:
+        return len1
+
+    over = max_distance + 1
+    previous_row = [j if j <= max_distance else over for j in range(len2 + 1)]
+
+    for i in range(1, len1 + 1):
+        c1 = s1[i - 1]
+        start = max(1, i - max_distance)
+        end = min(len2, i + max_distance)
+
+        current_row = [over] * (len2 + 1)
+        current_row[0] = i if i <= max_distance else over
+        row_min = current_row[0] if start == 1 else over
+
+        for j in range(start, end + 1):
+            cost = previous_row[j - 1] + (c1 != s2[j - 1])
+            deletion = previous_row[j] + 1
+            insertion = current_row[j - 1] + 1
+            if deletion < cost:
+                cost = deletion
+            if insertion < cost:
+                cost = insertion
+            if cost > over:
+                cost = over
+            current_row[j] = cost
+            if cost < row_min:
+                row_min = cost
+
+        if row_min > max_distance:
+            return over
+        previous_row = current_row
+
+    return previous_row[len2]
+
+
+def max_edit_distance(max_len, threshold=SIMILARITY_THRESHOLD):
+    """Largest edit distance whose similarity ``1 - d / max_len`` meets the threshold"""
+    if max_len == 0:
+        return 0
+    distance = int(max_len * (1 - threshold)) + 1
+    while distance > 0 and 1 - (distance / max_len) < threshold:
+        distance -= 1
+    return distance
+
+
+def parse_number(text):
+    """Parse a numeric answer, ignoring thousands separators"""
+    try:
+        return float(text.replace(',', ''))
+    except ValueError:
+        return None
+
+
+class AnswerMatcher:
+    """
+    Pre-normalized acceptable answers for one question.
+
+    ``match(user_answer)`` returns ``(is_correct, match_type, matched_answer)``
+    using the same staged matching as before: exact, similar (typos),
+    partial, word-based and numeric.
+    """
+
+    def __init__(self, correct_answer, question_type):
+        self.question_type = question_type
+
+        if question_type == 'true_false':
+            self.correct_answer = normalize_answer(correct_answer)
+            self.correct_is_true = self.correct_answer in TRUE_VARIATIONS
+            self.correct_is_false = self.correct_answer in FALSE_VARIATIONS
+            return
+
+        self.answers = [normalize_answer(answer) for answer in correct_answer.split(',')]
+        self.answer_set = frozenset(self.answers)
+        self.answer_words = [frozenset(answer.split()) for answer in self.answers]
+        self.answer_numbers = [number for number in map(parse_number, self.answers) if number is not None]
+
+    def match(self, user_answer):
+        if not user_answer or not user_answer.strip():
+            return False, 'empty', None
+
+        user_answer = normalize_answer(user_answer)
+
+        if self.question_type == 'true_false':
+            return self._match_true_false(user_answer)
+
+        # 1. Exact match (after normalization)
+        if user_answer in self.answer_set:
+            return True, 'exact', user_answer
+
+        # 2. Fuzzy matching for typos (bounded edit distance)
+        user_length = len(user_answer)
+        for answer in self.answers:
+            if abs(user_length - len(answer)) > MAX_LENGTH_DIFFERENCE:
+                continue
+            max_len = max(user_length, len(answer))
+            limit = max_edit_distance(max_len)
+            if bounded_edit_distance(user_answer, answer, limit) <= limit:
+                return True, 'similar', answer
+
+        # 3. Partial match (user answer contains or is contained in correct answer)
+        if user_length >= 3:
+            for answer in self.answers:
+                if len(answer) >= 3 and (user_answer in answer or answer in user_answer):
+                    return True, 'partial', answer
+
+        # 4. Word-based matching (for multi-word answers)
+        user_words = set(user_answer.split())
+        if len(user_words) > 1:
+            for answer, answer_words in zip(self.answers, self.answer_words):
+                if len(answer_words) > 1:
+                    common_words = user_words.intersection(answer_words)
+                    if len(common_words) >= min(len(user_words), len(answer_words)) * 0.7:
+                        return True, 'word_match', answer
+
+        # 5. Numeric answer handling
+        user_number = parse_number(user_answer)
+        if user_number is not None:
+            for answer_number in self.answer_numbers:
+                # Allow small floating point differences
+                if abs(user_number - answer_number) < 0.001:
+                    return True, 'numeric', user_answer
+
+        return False, 'incorrect', None
+
+    def _match_true_false(self, user_answer):
+        user_is_true = user_answer in TRUE_VARIATIONS
+        user_is_false = user_answer in FALSE_VARIATIONS
+
+        if (user_is_true and self.correct_is_true) or (user_is_false and self.correct_is_false):
+            return True, 'exact', self.correct_answer
+
+        return False, 'incorrect', None
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def get_answer_matcher(correct_answer, question_type):
+    """Return the compiled matcher for an answer key, shared across requests"""
+    return AnswerMatcher(correct_answer, question_type)
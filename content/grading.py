@@ -0,0 +1,132 @@
+"""
+Batched grading for quiz and exam submissions.
+
+Submitted answers are graded against questions loaded in one batch (questions
+plus their answer choices), and the answer rows are written with a single
+``bulk_create``, so a submission costs a fixed number of queries regardless of
+how many questions it contains.
+"""
+
+import uuid
+
+from .models import Question
+
+
+class SubmissionGrader:
+    """
+    Grade a ``{question_id: user_answer}`` mapping in memory.
+
+    ``choice_match`` controls how multiple choice answers are compared:
+    ``'text'`` matches the submitted text against the correct choice text
+    (quiz page), ``'id'`` treats the submitted value as the selected choice id
+    (exam page). ``text_match`` selects ``'smart'`` matching through
+    ``Question.validate_text_answer`` or the ``'exact'`` comparison used by
+    exams.
+    """
+
+    def __init__(self, questions, choice_match='text', text_match='smart'):
+        self.questions = questions
+        self.choice_match = choice_match
+        self.text_match = text_match
+
+    def load_questions(self, question_ids):
+        """Fetch the submitted questions and their choices in two queries"""
+        valid_ids = []
+        for question_id in question_ids:
+            try:
+                valid_ids.append(uuid.UUID(str(question_id)))
+            except ValueError:
+                continue
+
+        if not valid_ids:
+            return {}
+
+        questions = self.questions.filter(id__in=valid_ids).prefetch_related('answer_choices')
+        return {str(question.id): question for question in questions}
+
+    def grade(self, answers):
+        """
+        Grade all answers and return ``(correct_count, graded_answers)``.
+
+        Answers to unknown or inactive questions are skipped, matching the
+        previous per-question lookups.
+        """
+        questions = self.load_questions(answers.keys())
+
+        correct_answers = 0
+        graded_answers = []
+
+        for question_id, user_answer in answers.items():
+            question = questions.get(str(question_id))
+            if question is None:
+                continue
+
+            is_correct = bool(self.is_correct(question, user_answer))
+            if is_correct:
+                correct_answers += 1
+
+            graded_answers.append({
+                'question': question,
+                'user_answer': user_answer,
+                'is_correct': is_correct
+            })
+
+        return correct_answers, graded_answers
+
+    def is_correct(self, question, user_answer):
+        """Check one answer against a question with prefetched choices"""
+        if question.question_type == 'multiple_choice':
+            choices = question.answer_choices.all()
+            if self.choice_match == 'id':
+                return any(str(choice.id) == str(user_answer) and choice.is_correct for choice in choices)
+            correct_choice = next((choice for choice in choices if choice.is_correct), None)
+            return correct_choice is not None and user_answer == correct_choice.choice_text
+
+        if self.text_match == 'smart':
+            is_correct, _, _ = question.validate_text_answer(user_answer)
+            return is_correct
+
+        if question.question_type in ['fill_blank', 'short_answer']:
+            correct_answers_list = [ans.strip().lower() for ans in question.correct_answer.split(',')]
+            return user_answer.strip().lower() in correct_answers_list
+        if question.question_type == 'true_false':
+            return user_answer.lower() == question.correct_answer.lower()
+        return False
+
+
+def save_graded_answers(answer_model, parent_field, parent, graded_answers):
+    """Persist graded answers for a Quiz or Test with a single bulk insert"""
+    answer_model.objects.bulk_create([
+        answer_model(**{
+            parent_field: parent,
+            'question': answer_data['question'],
+            'user_answer': answer_data['user_answer'],
+            'is_correct': answer_data['is_correct'],
+            'points_earned': 1 if answer_data['is_correct'] else 0,
+        })
+        for answer_data in graded_answers
+    ])
+
+
+def grade_quiz_submission(topic, answers):
+    """Grade quiz answers for a topic using smart text matching"""
+    grader = SubmissionGrader(
+        Question.objects.filter(topic=topic, is_active=True),
+        choice_match='text',
+        text_match='smart'
+    )
+    return grader.grade(answers)
+
+
+def grade_exam_submission(class_level, answers):
+    """Grade level exam answers, where multiple choice answers are choice ids"""
+    grader = SubmissionGrader(
+        Question.objects.filter(
+            topic__class_level=class_level,
+            topic__is_active=True,
+            is_active=True
+        ),
+        choice_match='id',
+        text_match='exact'
+    )
+    return grader.grade(answers)
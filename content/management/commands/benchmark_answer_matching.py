@@ -0,0 +1,182 @@
+import random
+import re
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from content.answer_matching import AnswerMatcher
+
+
+class LegacyAnswerMatcher:
+    """Reference copy of the previous per-call validation, kept for comparison"""
+
+    def __init__(self, correct_answer, question_type):
+        self.correct_answer = correct_answer
+        self.question_type = question_type
+
+    def match(self, user_answer):
+        if not user_answer or not user_answer.strip():
+            return False, 'empty', None
+
+        user_answer = self._normalize_answer(user_answer)
+
+        if self.question_type == 'true_false':
+            return self._validate_true_false_answer(user_answer)
+
+        acceptable_answers = [self._normalize_answer(answer) for answer in self.correct_answer.split(',')]
+
+        for answer in acceptable_answers:
+            if user_answer == answer:
+                return True, 'exact', answer
+
+        for answer in acceptable_answers:
+            if self._is_similar(user_answer, answer):
+                return True, 'similar', answer
+
+        for answer in acceptable_answers:
+            if len(user_answer) >= 3 and len(answer) >= 3:
+                if user_answer in answer or answer in user_answer:
+                    return True, 'partial', answer
+
+        user_words = set(user_answer.split())
+        for answer in acceptable_answers:
+            answer_words = set(answer.split())
+            if len(user_words) > 1 and len(answer_words) > 1:
+                common_words = user_words.intersection(answer_words)
+                if len(common_words) >= min(len(user_words), len(answer_words)) * 0.7:
+                    return True, 'word_match', answer
+
+        if self._is_numeric_answer(user_answer, acceptable_answers):
+            return True, 'numeric', user_answer
+
+        return False, 'incorrect', None
+
+    def _normalize_answer(self, answer):
+        if not answer:
+            return ""
+        normalized = answer.strip().lower()
+        normalized = ' '.join(normalized.split())
+        normalized = re.sub(r'[.,!?;:]$', '', normalized)
+        replacements = {
+            'colour': 'color',
+            'grey': 'gray',
+            'centre': 'center',
+            'metre': 'meter',
+            'litre': 'liter',
+            'realise': 'realize',
+            'organise': 'organize',
+        }
+        for old, new in replacements.items():
+            normalized = normalized.replace(old, new)
+        return normalized
+
+    def _validate_true_false_answer(self, user_answer):
+        correct_answer = self._normalize_answer(self.correct_answer)
+        true_variations = ['true', 't', 'yes', 'y', '1', 'correct', 'right']
+        false_variations = ['false', 'f', 'no', 'n', '0', 'incorrect', 'wrong']
+        if ((user_answer in true_variations and correct_answer in true_variations) or
+                (user_answer in false_variations and correct_answer in false_variations)):
+            return True, 'exact', correct_answer
+        return False, 'incorrect', None
+
+    def _is_numeric_answer(self, user_answer, acceptable_answers):
+        try:
+            user_num = float(user_answer.replace(',', ''))
+            for answer in acceptable_answers:
+                try:
+                    if abs(user_num - float(answer.replace(',', ''))) < 0.001:
+                        return True
+                except ValueError:
+                    continue
+        except ValueError:
+            pass
+        return False
+
+    def _is_similar(self, word1, word2, threshold=0.8):
+        if abs(len(word1) - len(word2)) > 2:
+            return False
+
+        def levenshtein_distance(s1, s2):
+            if len(s1) < len(s2):
+                return levenshtein_distance(s2, s1)
+            if len(s2) == 0:
+                return len(s1)
+            previous_row = list(range(len(s2) + 1))
+            for i, c1 in enumerate(s1):
+                current_row = [i + 1]
+                for j, c2 in enumerate(s2):
+                    current_row.append(min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + (c1 != c2)))
+                previous_row = current_row
+            return previous_row[-1]
+
+        distance = levenshtein_distance(word1, word2)
+        return 1 - (distance / max(len(word1), len(word2))) >= threshold
+
+
+class Command(BaseCommand):
+    help = 'Benchmark text answer validation (validations/sec) before and after matcher compilation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000, help='Validations per implementation')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the generated answers')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        answer_keys = [
+            ('photosynthesis, photo synthesis', 'fill_blank'),
+            ('smart, clever, intelligent, wise', 'short_answer'),
+            ('the colour of the sky is blue', 'short_answer'),
+            ('1,000', 'fill_blank'),
+            ('true', 'true_false'),
+            ('centre of the earth, core', 'fill_blank'),
+        ]
+        submissions = []
+        for _ in range(options['iterations']):
+            correct_answer, question_type = rng.choice(answer_keys)
+            target = rng.choice(correct_answer.split(',')).strip()
+            submissions.append((correct_answer, question_type, self.mutate(rng, target)))
+
+        legacy_results, legacy_rate = self.run(LegacyAnswerMatcher, submissions, compile_once=False)
+        compiled_results, compiled_rate = self.run(AnswerMatcher, submissions, compile_once=True)
+
+        mismatches = sum(1 for old, new in zip(legacy_results, compiled_results) if old != new)
+
+        self.stdout.write(f'Legacy matcher:   {legacy_rate:,.0f} validations/sec')
+        self.stdout.write(f'Compiled matcher: {compiled_rate:,.0f} validations/sec')
+        self.stdout.write(f'Speedup: {compiled_rate / legacy_rate:.1f}x')
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} results differ between implementations'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All results identical'))
+
+    def mutate(self, rng, text):
+        """Introduce typos, case and spacing noise into an answer"""
+        chars = list(text)
+        for _ in range(rng.randint(0, 3)):
+            operation = rng.choice(['insert', 'delete', 'replace', 'none'])
+            position = rng.randrange(len(chars) + 1)
+            if operation == 'insert':
+                chars.insert(position, rng.choice(string.ascii_lowercase))
+            elif operation == 'delete' and position < len(chars):
+                del chars[position]
+            elif operation == 'replace' and position < len(chars):
+                chars[position] = rng.choice(string.ascii_lowercase)
+        noisy = ''.join(chars)
+        return rng.choice([noisy, noisy.upper(), f'  {noisy}. ', noisy.title()])
+
+    def run(self, matcher_class, submissions, compile_once):
+        matchers = {}
+        results = []
+        start = time.perf_counter()
+        for correct_answer, question_type, user_answer in submissions:
+            key = (correct_answer, question_type)
+            if compile_once:
+                matcher = matchers.get(key)
+                if matcher is None:
+                    matcher = matchers[key] = matcher_class(correct_answer, question_type)
+            else:
+                matcher = matcher_class(correct_answer, question_type)
+            results.append(matcher.match(user_answer))
+        elapsed = time.perf_counter() - start
+        return results, len(submissions) / elapsed
@@ -148,164 +148,29 @@ class Question(models.Model):
     def __str__(self):
         return f"{self.topic.title} - {self.question_text[:50]}..."
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored text so saves can tell whether it changed
+        instance._stored_question_text = instance.__dict__.get('question_text')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'question_text' in fields:
+            self._stored_question_text = self.question_text
+
     def validate_text_answer(self, user_answer):
         """
         Enhanced validation for text-based answers with intelligent matching.
         Returns a tuple: (is_correct, match_type, matched_answer)
         """
-        if not user_answer or not user_answer.strip():
-            return False, 'empty', None
-
-        # Clean and normalize user answer
-        user_answer = self._normalize_answer(user_answer)
-
-        # Handle True/False questions specially
-        if self.question_type == 'true_false':
-            return self._validate_true_false_answer(user_answer)
-
-        # Get all acceptable answers and normalize them
-        acceptable_answers = [self._normalize_answer(answer) for answer in self.correct_answer.split(',')]
-
-        # 1. Exact match (after normalization)
-        for answer in acceptable_answers:
-            if user_answer == answer:
-                return True, 'exact', answer
-
-        # 2. Fuzzy matching for typos (using simple edit distance)
-        for answer in acceptable_answers:
-            if self._is_similar(user_answer, answer):
-                return True, 'similar', answer
-
-        # 3. Partial match (user answer contains or is contained in correct answer)
-        for answer in acceptable_answers:
-            if len(user_answer) >= 3 and len(answer) >= 3:
-                if user_answer in answer or answer in user_answer:
-                    return True, 'partial', answer
-
-        # 4. Word-based matching (for multi-word answers)
-        user_words = set(user_answer.split())
-        for answer in acceptable_answers:
-            answer_words = set(answer.split())
-            if len(user_words) > 1 and len(answer_words) > 1:
-                # If most words match, consider it correct
-                common_words = user_words.intersection(answer_words)
-                if len(common_words) >= min(len(user_words), len(answer_words)) * 0.7:
-                    return True, 'word_match', answer
-
-        # 5. Numeric answer handling
-        if self._is_numeric_answer(user_answer, acceptable_answers):
-            return True, 'numeric', user_answer
-
-        return False, 'incorrect', None
-
-    def _normalize_answer(self, answer):
-        """
-        Normalize answer text for better comparison.
-        Handles capitalization, extra spaces, and common variations.
-        """
-        if not answer:
-            return ""
-
-        # Convert to lowercase and strip whitespace
-        normalized = answer.strip().lower()
-
-        # Remove extra spaces between words
-        normalized = ' '.join(normalized.split())
-
-        # Remove common punctuation that doesn't affect meaning
-        import re
-        normalized = re.sub(r'[.,!?;:]$', '', normalized)
+        return self.get_answer_matcher().match(user_answer)
 
-        # Handle common variations
-        replacements = {
-            'colour': 'color',
-            'grey': 'gray',
-            'centre': 'center',
-            'metre': 'meter',
-            'litre': 'liter',
-            'realise': 'realize',
-            'organise': 'organize',
-        }
-
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
-
-        return normalized
-
-    def _validate_true_false_answer(self, user_answer):
-        """
-        Validate True/False answers with multiple acceptable formats.
-        """
-        # Normalize the correct answer
-        correct_answer = self._normalize_answer(self.correct_answer)
-
-        # Define true/false variations
-        true_variations = ['true', 't', 'yes', 'y', '1', 'correct', 'right']
-        false_variations = ['false', 'f', 'no', 'n', '0', 'incorrect', 'wrong']
-
-        user_is_true = user_answer in true_variations
-        user_is_false = user_answer in false_variations
-
-        correct_is_true = correct_answer in true_variations
-        correct_is_false = correct_answer in false_variations
-
-        if (user_is_true and correct_is_true) or (user_is_false and correct_is_false):
-            return True, 'exact', correct_answer
-
-        return False, 'incorrect', None
-
-    def _is_numeric_answer(self, user_answer, acceptable_answers):
-        """
-        Check if the answer is numeric and matches any acceptable numeric answer.
-        """
-        try:
-            user_num = float(user_answer.replace(',', ''))
-            for answer in acceptable_answers:
-                try:
-                    answer_num = float(answer.replace(',', ''))
-                    # Allow small floating point differences
-                    if abs(user_num - answer_num) < 0.001:
-                        return True
-                except ValueError:
-                    continue
-        except ValueError:
-            pass
-
-        return False
-
-    def _is_similar(self, word1, word2, threshold=0.8):
-        """
-        Check if two words are similar using simple edit distance.
-        Returns True if similarity is above threshold.
-        """
-        if abs(len(word1) - len(word2)) > 2:
-            return False
-
-        # Simple Levenshtein distance calculation
-        def levenshtein_distance(s1, s2):
-            if len(s1) < len(s2):
-                return levenshtein_distance(s2, s1)
-
-            if len(s2) == 0:
-                return len(s1)
-
-            previous_row = list(range(len(s2) + 1))
-            for i, c1 in enumerate(s1):
-                current_row = [i + 1]
-                for j, c2 in enumerate(s2):
-                    insertions = previous_row[j + 1] + 1
-                    deletions = current_row[j] + 1
-                    substitutions = previous_row[j] + (c1 != c2)
-                    current_row.append(min(insertions, deletions, substitutions))
-                previous_row = current_row
-
-            return previous_row[-1]
-
-        distance = levenshtein_distance(word1, word2)
-        max_len = max(len(word1), len(word2))
-        similarity = 1 - (distance / max_len)
-
-        return similarity >= threshold
+    def get_answer_matcher(self):
+        """Get the compiled matcher for this question's acceptable answers"""
+        from .answer_matching import get_answer_matcher
+        return get_answer_matcher(self.correct_answer, self.question_type)
 
     def get_acceptable_answers_list(self):
         """Return list of all acceptable answers for display."""
@@ -0,0 +1,203 @@
+"""
+Per-topic question pool cache for Pentora.
+
+Quiz and exam pages sample a handful of questions from every active question
+of a topic. Instead of querying the questions and their answer choices on each
+page load, the serialized pool of a topic is kept in the cache backend and
+sampled in memory. Pools are versioned per topic: saving or deleting a
+Question, AnswerChoice or Passage (see ``content.signals``) or importing a CSV
+bumps the topic version, so every worker stops reading the stale pool. Pools
+live in the process-local default cache; the versions live in the "shared"
+cache, so an import in the job process reaches the web process too.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache, caches
+
+from .models import Question, Passage
+
+QUESTION_POOL_TIMEOUT = 60 * 60 * 6  # 6 hours
+VERSION_KEY = 'question_pool_version_{topic_id}'
+POOL_KEY = 'question_pool_{topic_id}_v{version}'
+
+
+class QuestionPoolStats:
+    """Process-local hit/miss counters for monitoring the pool cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def record(self, hits=0, misses=0, invalidations=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.invalidations += invalidations
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            }
+
+
+pool_stats = QuestionPoolStats()
+
+
+def _serialize_question(question):
+    """Build the cached payload for a question and its ordered answer choices"""
+    choices = sorted(question.answer_choices.all(), key=lambda choice: choice.order)
+    return {
+        'id': str(question.id),
+        'question_text': question.question_text,
+        'question_type': question.question_type,
+        'difficulty': question.difficulty,
+        'correct_answer': question.correct_answer,
+        'acceptable_answers': question.get_acceptable_answers_list(),
+        'explanation': question.explanation,
+        'points': question.points,
+        'time_limit': question.time_limit,
+        'explanation_display_time': question.explanation_display_time,
+        'passage_id': str(question.passage_id) if question.passage_id else None,
+        'choices': [
+            {
+                'id': str(choice.id),
+                'text': choice.choice_text,
+                'isCorrect': choice.is_correct,
+                'order': choice.order,
+            }
+            for choice in choices
+        ],
+    }
+
+
+def _load_pools(topic_ids):
+    """Build pools for the given topics with two queries (questions + choices)"""
+    pools = {
+        topic_id: {'questions': [], 'has_passages': False}
+        for topic_id in topic_ids
+    }
+
+    questions = Question.objects.filter(
+        topic_id__in=topic_ids,
+        is_active=True
+    ).prefetch_related('answer_choices').order_by('topic_id', 'order', 'created_at')
+
+    for question in questions:
+        pools[str(question.topic_id)]['questions'].append(_serialize_question(question))
+
+    passage_topics = Passage.objects.filter(
+        topic_id__in=topic_ids,
+        is_active=True
+    ).values_list('topic_id', flat=True).distinct()
+
+    for topic_id in passage_topics:
+        pools[str(topic_id)]['has_passages'] = True
+
+    return pools
+
+
+def _get_versions(topic_ids):
+    """Return the current pool version of each topic, initializing missing ones"""
+    version_keys = {VERSION_KEY.format(topic_id=topic_id): topic_id for topic_id in topic_ids}
+    shared_cache = caches['shared']
+    cached = shared_cache.get_many(list(version_keys))
+
+    versions = {}
+    missing = {}
+    for key, topic_id in version_keys.items():
+        if key in cached:
+            versions[topic_id] = cached[key]
+        else:
+            versions[topic_id] = 1
+            missing[key] = 1
+
+    if missing:
+        shared_cache.set_many(missing, None)
+
+    return versions
+
+
+def get_question_pools(topic_ids):
+    """
+    Return the cached question pools for several topics.
+
+    Each pool is a dict with ``questions`` (serialized questions with their
+    choices) and ``has_passages``. Missing pools are loaded together and
+    written back to the cache.
+    """
+    topic_ids = [str(topic_id) for topic_id in topic_ids]
+    if not topic_ids:
+        return {}
+
+    versions = _get_versions(topic_ids)
+    pool_keys = {
+        POOL_KEY.format(topic_id=topic_id, version=versions[topic_id]): topic_id
+        for topic_id in topic_ids
+    }
+    cached = cache.get_many(list(pool_keys))
+
+    pools = {pool_keys[key]: pool for key, pool in cached.items()}
+    missing_ids = [topic_id for topic_id in topic_ids if topic_id not in pools]
+
+    if missing_ids:
+        loaded = _load_pools(missing_ids)
+        cache.set_many({
+            POOL_KEY.format(topic_id=topic_id, version=versions[topic_id]): pool
+            for topic_id, pool in loaded.items()
+        }, QUESTION_POOL_TIMEOUT)
+        pools.update(loaded)
+
+    pool_stats.record(hits=len(topic_ids) - len(missing_ids), misses=len(missing_ids))
+    return pools
+
+
+def get_question_pool(topic):
+    """Return the cached question pool for a single topic (instance or id)"""
+    topic_id = str(getattr(topic, 'pk', topic))
+    return get_question_pools([topic_id])[topic_id]
+
+
+def invalidate_question_pools(topic_ids):
+    """Bump the pool version of the given topics so every worker reloads them"""
+    topic_ids = {str(topic_id) for topic_id in topic_ids if topic_id}
+    shared_cache = caches['shared']
+    for topic_id in topic_ids:
+        key = VERSION_KEY.format(topic_id=topic_id)
+        try:
+            shared_cache.incr(key)
+        except ValueError:
+            # Version not initialized yet; any pool cached under v1 is stale
+            shared_cache.set(key, 2, None)
+
+    pool_stats.record(invalidations=len(topic_ids))
+
+
+def get_pool_statistics(pool):
+    """Compute question counts for a topic pool without touching the database"""
+    counts = defaultdict(int)
+    for question in pool['questions']:
+        counts[question['difficulty']] += 1
+        counts[question['question_type']] += 1
+
+    return {
+        'total_questions': len(pool['questions']),
+        'easy_questions': counts['easy'],
+        'medium_questions': counts['medium'],
+        'hard_questions': counts['hard'],
+        'multiple_choice': counts['multiple_choice'],
+        'fill_blank': counts['fill_blank'],
+        'true_false': counts['true_false'],
+    }
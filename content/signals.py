@@ -0,0 +1,53 @@
+"""
+Signal handlers for the content app
+"""
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Question, AnswerChoice, Passage
+from .question_pool import invalidate_question_pools
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_topic(sender, instance, **kwargs):
+    """Remember the stored topic so moving a question refreshes both pools"""
+    if instance._state.adding:
+        instance._previous_topic_id = None
+        return
+    instance._previous_topic_id = (
+        Question.objects.filter(pk=instance.pk).values_list('topic_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_pool_for_question(sender, instance, **kwargs):
+    invalidate_question_pools([instance.topic_id, getattr(instance, '_previous_topic_id', None)])
+
+
+@receiver(post_save, sender=AnswerChoice)
+def invalidate_question_pool_for_choice(sender, instance, **kwargs):
+    topic_id = Question.objects.filter(pk=instance.question_id).values_list('topic_id', flat=True).first()
+    invalidate_question_pools([topic_id])
+
+
+@receiver(post_delete, sender=AnswerChoice)
+def invalidate_question_pool_for_deleted_choice(sender, instance, origin=None, **kwargs):
+    """
+    Refresh the pool when a single choice is deleted.
+
+    Deleting questions removes their choices too, and the questions' own
+    handler refreshes those pools, so cascaded and queryset deletes are
+    skipped rather than costing a query and a version bump per choice. A
+    queryset delete that leaves the questions in place invalidates their
+    topics itself, once.
+    """
+    if isinstance(origin, AnswerChoice):
+        invalidate_question_pool_for_choice(sender, instance)
+
+
+@receiver(post_save, sender=Passage)
+@receiver(post_delete, sender=Passage)
+def invalidate_question_pool_for_passage(sender, instance, **kwargs):
+    invalidate_question_pools([instance.topic_id])
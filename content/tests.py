@@ -1,3 +1,159 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from subjects.models import Subject, ClassLevel, Topic
+from .answer_matching import bounded_edit_distance, normalize_answer
+from .models import Question, AnswerChoice, Quiz, QuizAnswer
+from .grading import grade_quiz_submission, grade_exam_submission, save_graded_answers
+from .question_pool import get_question_pool, pool_stats
+from .utils import generate_quiz_questions
+
+
+class QuestionPoolTestCase(TestCase):
+    """Test cases for the cached per-topic question pool"""
+
+    def setUp(self):
+        cache.clear()
+        pool_stats.reset()
+
+        subject = Subject.objects.create(name='Mathematics')
+        class_level = ClassLevel.objects.create(subject=subject, name='Grade 5', level_number=5)
+        self.topic = Topic.objects.create(class_level=class_level, title='Addition', order=1)
+
+        for number in range(12):
+            question = Question.objects.create(
+                topic=self.topic,
+                question_text=f'What is {number} + 1?',
+                question_type='multiple_choice',
+                correct_answer=str(number + 1),
+            )
+            AnswerChoice.objects.create(question=question, choice_text=str(number + 1), is_correct=True, order=0)
+            AnswerChoice.objects.create(question=question, choice_text=str(number + 2), order=1)
+
+    def test_quiz_generation_reads_pool_from_cache(self):
+        """A second quiz for the same topic is built without database queries"""
+        generate_quiz_questions(self.topic, max_questions=10)
+
+        with self.assertNumQueries(0):
+            quiz_data = generate_quiz_questions(self.topic, max_questions=10)
+
+        self.assertEqual(quiz_data['total_questions'], 10)
+        self.assertEqual(quiz_data['total_available'], 12)
+        self.assertEqual(len(quiz_data['questions'][0]['choices']), 2)
+        self.assertEqual(pool_stats.as_dict()['hits'], 1)
+        self.assertEqual(pool_stats.as_dict()['misses'], 1)
+
+    def test_saving_question_invalidates_pool(self):
+        """Question and answer choice changes are visible on the next lookup"""
+        self.assertEqual(len(get_question_pool(self.topic)['questions']), 12)
+
+        question = Question.objects.filter(topic=self.topic).first()
+        question.is_active = False
+        question.save()
+        self.assertEqual(len(get_question_pool(self.topic)['questions']), 11)
+
+        other = Question.objects.filter(topic=self.topic, is_active=True).first()
+        AnswerChoice.objects.create(question=other, choice_text='42', order=2)
+        pooled = next(q for q in get_question_pool(self.topic)['questions'] if q['id'] == str(other.id))
+        self.assertEqual([choice['text'] for choice in pooled['choices']][-1], '42')
+
+        other.answer_choices.get(choice_text='42').delete()
+        pooled = next(q for q in get_question_pool(self.topic)['questions'] if q['id'] == str(other.id))
+        self.assertNotIn('42', [choice['text'] for choice in pooled['choices']])
+
+    def test_deleting_question_refreshes_pool_once(self):
+        """Cascaded answer choice deletes leave the refresh to the question"""
+        question = Question.objects.filter(topic=self.topic).first()
+        with mock.patch('content.signals.invalidate_question_pools') as invalidate:
+            question.delete()
+
+        invalidate.assert_called_once_with([self.topic.pk, None])
+
+
+class SubmissionGradingTestCase(TestCase):
+    """Test cases for batched quiz and exam grading"""
+
+    def setUp(self):
+        subject = Subject.objects.create(name='Science')
+        self.class_level = ClassLevel.objects.create(subject=subject, name='Grade 6', level_number=6)
+        self.topic = Topic.objects.create(class_level=self.class_level, title='Plants', order=1)
+        self.user = get_user_model().objects.create_user(email='student@test.com', password='testpass123')
+
+        self.questions = []
+        for number in range(30):
+            question = Question.objects.create(
+                topic=self.topic,
+                question_text=f'Question {number}',
+                question_type='multiple_choice',
+                correct_answer='a',
+            )
+            AnswerChoice.objects.create(question=question, choice_text='Right', is_correct=True, order=0)
+            AnswerChoice.objects.create(question=question, choice_text='Wrong', order=1)
+            self.questions.append(question)
+
+        self.text_question = Question.objects.create(
+            topic=self.topic,
+            question_text='Green pigment in leaves?',
+            question_type='fill_blank',
+            correct_answer='chlorophyll',
+        )
+
+    def test_quiz_grading_uses_fixed_number_of_queries(self):
+        """Grading and saving a quiz does not issue per-question queries"""
+        answers = {str(question.id): 'Right' if index % 2 == 0 else 'Wrong' for index, question in enumerate(self.questions)}
+        answers[str(self.text_question.id)] = 'Chlorophyl'
+        answers['not-a-uuid'] = 'Right'
+
+        quiz = Quiz.objects.create(topic=self.topic, user=self.user)
+        with self.assertNumQueries(3):
+            correct, graded = grade_quiz_submission(self.topic, answers)
+            save_graded_answers(QuizAnswer, 'quiz', quiz, graded)
+
+        self.assertEqual(correct, 16)
+        self.assertEqual(QuizAnswer.objects.filter(quiz=quiz).count(), 31)
+
+    def test_exam_grading_matches_choice_ids(self):
+        """Exam answers are graded by the id of the selected choice"""
+        question = self.questions[0]
+        right = question.answer_choices.get(is_correct=True)
+        wrong = self.questions[1].answer_choices.get(is_correct=False)
+
+        correct, graded = grade_exam_submission(self.class_level, {
+            str(question.id): str(right.id),
+            str(self.questions[1].id): str(wrong.id),
+            str(self.questions[2].id): str(right.id),
+        })
+
+        self.assertEqual(correct, 1)
+        self.assertEqual([answer['is_correct'] for answer in graded], [True, False, False])
+
+
+class AnswerMatchingTestCase(TestCase):
+    """Test cases for compiled text answer matching"""
+
+    def test_normalize_answer(self):
+        self.assertEqual(normalize_answer('  The   Colour Grey. '), 'the color gray')
+        self.assertEqual(normalize_answer('Why?!'), 'why?')
+
+    def test_bounded_edit_distance(self):
+        self.assertEqual(bounded_edit_distance('kitten', 'sitting', 3), 3)
+        self.assertEqual(bounded_edit_distance('kitten', 'sitting', 1), 2)
+        self.assertEqual(bounded_edit_distance('abc', 'abc', 0), 0)
+
+    def test_match_types(self):
+        question = Question(correct_answer='photosynthesis, 25', question_type='fill_blank')
+
+        self.assertEqual(question.validate_text_answer('Photosynthesis.'), (True, 'exact', 'photosynthesis'))
+        self.assertEqual(question.validate_text_answer('photosynthesys'), (True, 'similar', 'photosynthesis'))
+        self.assertEqual(question.validate_text_answer('25.0'), (True, 'numeric', '25.0'))
+        self.assertEqual(question.validate_text_answer('respiration'), (False, 'incorrect', None))
+        self.assertEqual(question.validate_text_answer('   '), (False, 'empty', None))
+
+    def test_true_false_variations(self):
+        question = Question(correct_answer='True', question_type='true_false')
+
+        self.assertEqual(question.validate_text_answer('yes'), (True, 'exact', 'true'))
+        self.assertEqual(question.validate_text_answer('F'), (False, 'incorrect', None))
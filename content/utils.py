@@ -2,7 +2,8 @@ import random
 import time
 from typing import List, Dict, Any
 from django.db.models import QuerySet
-from .models import Question, AnswerChoice
+from .models import AnswerChoice
+from .question_pool import get_question_pool, get_pool_statistics
 
 
 def generate_quiz_questions(topic, max_questions: int = 10, user_id: str = None) -> Dict[str, Any]:
@@ -20,15 +21,16 @@ def generate_quiz_questions(topic, max_questions: int = 10, user_id: str = None)
     """
     from .models import Passage
 
-    # Check if topic has comprehension passages
-    passages = Passage.objects.filter(topic=topic, is_active=True).prefetch_related('questions__answer_choices')
+    pool = get_question_pool(topic)
 
-    if passages.exists():
+    # Check if topic has comprehension passages
+    if pool['has_passages']:
         # Handle comprehension quiz
+        passages = Passage.objects.filter(topic=topic, is_active=True).prefetch_related('questions__answer_choices')
         return generate_comprehension_quiz(topic, passages, max_questions, user_id)
     else:
         # Handle regular quiz
-        return generate_regular_quiz(topic, max_questions, user_id)
+        return generate_regular_quiz(topic, max_questions, user_id, pool=pool)
 
 
 def generate_comprehension_quiz(topic, passages, max_questions: int = 10, user_id: str = None) -> Dict[str, Any]:
@@ -114,18 +116,18 @@ def generate_comprehension_quiz(topic, passages, max_questions: int = 10, user_i
     }
 
 
-def generate_regular_quiz(topic, max_questions: int = 10, user_id: str = None) -> Dict[str, Any]:
+def generate_regular_quiz(topic, max_questions: int = 10, user_id: str = None, pool: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     Generate a regular quiz with mixed questions from the topic.
+    Questions are sampled from the cached topic question pool.
     """
-    # Get all active questions for the topic (excluding passage-based questions)
-    all_questions = Question.objects.filter(
-        topic=topic,
-        is_active=True,
-        passage__isnull=True  # Exclude comprehension questions
-    ).prefetch_related('answer_choices')
+    if pool is None:
+        pool = get_question_pool(topic)
 
-    total_available = all_questions.count()
+    # All active questions for the topic (excluding passage-based questions)
+    all_questions = [question for question in pool['questions'] if not question['passage_id']]
+
+    total_available = len(all_questions)
 
     if total_available == 0:
         return {
@@ -146,45 +148,32 @@ def generate_regular_quiz(topic, max_questions: int = 10, user_id: str = None) -
     seed = int(time.time()) + hash(str(user_id)) if user_id else int(time.time())
     random.seed(seed)
 
-    # Convert to list and shuffle
-    questions_list = list(all_questions)
-    random.shuffle(questions_list)
-
     # Take the required number of questions
-    selected_questions = questions_list[:actual_questions]
+    selected_questions = random.sample(all_questions, actual_questions)
 
     # Prepare shuffled questions data
     shuffled_questions = []
     question_ids = []
 
     for question in selected_questions:
-        # Get answer choices and shuffle them
-        choices = list(question.answer_choices.all())
+        # Copy the pooled payload and shuffle its answer choices
+        choices = list(question['choices'])
         random.shuffle(choices)
 
-        # Create question data with shuffled choices
         question_data = {
-            'id': str(question.id),
-            'question_text': question.question_text,
-            'question_type': question.question_type,
-            'correct_answer': question.correct_answer,
-            'acceptable_answers': question.get_acceptable_answers_list(),
-            'explanation': question.explanation,
-            'time_limit': question.time_limit,
-            'explanation_display_time': question.explanation_display_time,
-            'choices': [
-                {
-                    'id': str(choice.id),
-                    'text': choice.choice_text,
-                    'isCorrect': choice.is_correct,
-                    'order': choice.order
-                }
-                for choice in choices
-            ]
+            'id': question['id'],
+            'question_text': question['question_text'],
+            'question_type': question['question_type'],
+            'correct_answer': question['correct_answer'],
+            'acceptable_answers': question['acceptable_answers'],
+            'explanation': question['explanation'],
+            'time_limit': question['time_limit'],
+            'explanation_display_time': question['explanation_display_time'],
+            'choices': choices
         }
 
         shuffled_questions.append(question_data)
-        question_ids.append(str(question.id))
+        question_ids.append(question['id'])
 
     return {
         'questions': shuffled_questions,
@@ -208,17 +197,7 @@ def get_quiz_statistics(topic) -> Dict[str, int]:
     Returns:
         Dict with question statistics
     """
-    questions = Question.objects.filter(topic=topic, is_active=True)
-
-    return {
-        'total_questions': questions.count(),
-        'easy_questions': questions.filter(difficulty='easy').count(),
-        'medium_questions': questions.filter(difficulty='medium').count(),
-        'hard_questions': questions.filter(difficulty='hard').count(),
-        'multiple_choice': questions.filter(question_type='multiple_choice').count(),
-        'fill_blank': questions.filter(question_type='fill_blank').count(),
-        'true_false': questions.filter(question_type='true_false').count(),
-    }
+    return get_pool_statistics(get_question_pool(topic))
 
 
 def get_user_quiz_attempts(user, topic) -> int:
@@ -5,10 +5,15 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from django.db import transaction
 import json
 from subjects.models import Topic
-from .models import Question, Quiz, QuizAnswer, Test, TestAnswer, AnswerChoice
+from billing.middleware import UsageLimitMiddleware
+from billing.usage import consume_quiz, daily_quiz_limit
+from .models import Question, Quiz, QuizAnswer, Test, TestAnswer
 from .utils import generate_quiz_questions, get_quiz_statistics, get_user_quiz_attempts, calculate_recommended_questions
+from .question_pool import get_question_pools
+from .grading import grade_quiz_submission, grade_exam_submission, save_graded_answers
 from admin_panel.utils import get_quiz_settings
 
 
@@ -363,10 +368,8 @@ class ExamView(TemplateView):
             exam_time_limit = exam_questions_per_level * 45
 
         # Count total available questions across all topics
-        total_available_questions = Question.objects.filter(
-            topic__in=topics,
-            is_active=True
-        ).count()
+        pools = get_question_pools(topics.values_list('id', flat=True))
+        total_available_questions = sum(len(pool['questions']) for pool in pools.values())
 
         # Determine actual number of questions for exam
         if total_available_questions < exam_questions_per_level:
@@ -418,14 +421,12 @@ class TakeExamView(TemplateView):
             # Fallback: 45 seconds per question
             exam_time_limit = exam_questions_per_level * 45
 
-        # Get all questions from all topics in this level
-        all_questions = Question.objects.filter(
-            topic__in=topics,
-            is_active=True
-        )
+        # Get all questions from all topics in this level from the cached pools
+        pools = get_question_pools(topics.values_list('id', flat=True))
+        all_questions = [question for pool in pools.values() for question in pool['questions']]
 
         # Determine number of questions to use
-        total_available = all_questions.count()
+        total_available = len(all_questions)
         if total_available < exam_questions_per_level:
             questions_to_use = total_available
         else:
@@ -437,15 +438,14 @@ class TakeExamView(TemplateView):
         random.seed(seed)
 
         # Get random questions and shuffle them
-        all_questions_list = list(all_questions)
-        random.shuffle(all_questions_list)
-        exam_questions = all_questions_list[:questions_to_use]
+        random.shuffle(all_questions)
+        exam_questions = all_questions[:questions_to_use]
 
         # Shuffle the selected questions again for good measure
         random.shuffle(exam_questions)
 
         # Store question IDs in order for this exam
-        question_ids = [str(q.id) for q in exam_questions]
+        question_ids = [q['id'] for q in exam_questions]
 
         # Create exam record
         exam = Test.objects.create(
@@ -463,24 +463,23 @@ class TakeExamView(TemplateView):
         questions_data = []
         for i, question in enumerate(exam_questions):
             question_data = {
-                'id': str(question.id),
-                'question_text': question.question_text,
-                'question_type': question.question_type,
+                'id': question['id'],
+                'question_text': question['question_text'],
+                'question_type': question['question_type'],
                 'order': i + 1,
-                'points': question.points,
-                'time_limit': question.time_limit,
+                'points': question['points'],
+                'time_limit': question['time_limit'],
             }
 
-            # Add choices for multiple choice questions
-            if question.question_type == 'multiple_choice':
-                choices = question.answer_choices.all().order_by('order')
+            # Add choices for multiple choice questions (pooled choices are already ordered)
+            if question['question_type'] == 'multiple_choice':
                 question_data['choices'] = [
                     {
-                        'id': str(choice.id),
-                        'text': choice.choice_text,
-                        'order': choice.order
+                        'id': choice['id'],
+                        'text': choice['text'],
+                        'order': choice['order']
                     }
-                    for choice in choices
+                    for choice in question['choices']
                 ]
 
             questions_data.append(question_data)
@@ -649,37 +648,9 @@ def submit_quiz(request):
         # Get topic
         topic = get_object_or_404(Topic, id=topic_id, is_active=True)
 
-        # Get questions for this topic
-        questions = Question.objects.filter(topic=topic, is_active=True)
-
-        # Calculate score
-        correct_answers = 0
+        # Grade all answers against one batched fetch of the submitted questions
         total_questions = len(answers)
-        quiz_answers_data = []
-
-        for question_id, user_answer in answers.items():
-            try:
-                question = questions.get(id=question_id)
-
-                # Check if answer is correct
-                if question.question_type == 'multiple_choice':
-                    correct_choice = question.answer_choices.filter(is_correct=True).first()
-                    is_correct = correct_choice and user_answer == correct_choice.choice_text
-                else:
-                    # For text-based questions
-                    is_correct, _, _ = question.validate_text_answer(user_answer)
-
-                if is_correct:
-                    correct_answers += 1
-
-                quiz_answers_data.append({
-                    'question': question,
-                    'user_answer': user_answer,
-                    'is_correct': is_correct
-                })
-
-            except Question.DoesNotExist:
-                continue
+        correct_answers, quiz_answers_data = grade_quiz_submission(topic, answers)
 
         # Calculate percentage
         percentage = (correct_answers / total_questions * 100) if total_questions > 0 else 0
@@ -687,30 +658,30 @@ def submit_quiz(request):
         # Get current attempt number
         attempt_number = Quiz.objects.filter(user=request.user, topic=topic).count() + 1
 
-        # Create quiz record
-        quiz = Quiz.objects.create(
-            topic=topic,
-            user=request.user,
-            total_questions=total_questions,
-            score=correct_answers,
-            total_points=total_questions,
-            percentage=percentage,
-            time_taken=time_taken,
-            attempt_number=attempt_number,
-            is_completed=True,
-            completed_at=timezone.now()
-        )
+        with transaction.atomic():
+            # Count the quiz against the daily limit only with the accepted
+            # submission, so a failed one is rolled back with it
+            quiz_limit = daily_quiz_limit(request.user)
+            if quiz_limit and not consume_quiz(request.user, quiz_limit):
+                return UsageLimitMiddleware.limit_reached(request, quiz_limit)
 
-        # Create quiz answers
-        for answer_data in quiz_answers_data:
-            QuizAnswer.objects.create(
-                quiz=quiz,
-                question=answer_data['question'],
-                user_answer=answer_data['user_answer'],
-                is_correct=answer_data['is_correct'],
-                points_earned=1 if answer_data['is_correct'] else 0
+            # Create quiz record
+            quiz = Quiz.objects.create(
+                topic=topic,
+                user=request.user,
+                total_questions=total_questions,
+                score=correct_answers,
+                total_points=total_questions,
+                percentage=percentage,
+                time_taken=time_taken,
+                attempt_number=attempt_number,
+                is_completed=True,
+                completed_at=timezone.now()
             )
 
+            # Create quiz answers
+            save_graded_answers(QuizAnswer, 'quiz', quiz, quiz_answers_data)
+
         # Update topic progress
         from progress.models import TopicProgress, UserProgress
 
@@ -730,22 +701,18 @@ def submit_quiz(request):
         quiz_settings = get_quiz_settings()
         passing_score = quiz_settings['minimum_pass_percentage']
 
-        # Update class level progress
-        try:
-            class_progress = UserProgress.objects.get(
-                user=request.user,
-                class_level=topic.class_level
-            )
-            class_progress.update_progress()
-        except UserProgress.DoesNotExist:
-            # Create class progress if it doesn't exist
-            class_progress = UserProgress.objects.create(
-                user=request.user,
-                class_level=topic.class_level,
-                is_started=True,
-                started_at=timezone.now()
-            )
-            class_progress.update_progress()
+        # Class level counters are updated incrementally when the topic completes;
+        # only a missing progress record needs a full recompute
+        class_progress, created = UserProgress.objects.get_or_create(
+            user=request.user,
+            class_level=topic.class_level,
+            defaults={
+                'is_started': True,
+                'started_at': timezone.now()
+            }
+        )
+        if created:
+            class_progress.recompute()
 
         # Check for grade promotion
         check_grade_promotion(request.user)
@@ -1079,48 +1046,10 @@ def submit_exam(request):
         # Get the actual total number of questions in the exam (stored when exam was created)
         total_exam_questions = exam.total_questions
 
-        # Get all questions for validation (we still need this to validate answers)
         level = exam.class_level
-        topics = level.topics.filter(is_active=True)
-        all_questions = Question.objects.filter(topic__in=topics, is_active=True)
 
-        # Process answers
-        correct_answers = 0
-        total_questions = len(answers)  # Number of questions answered
-        exam_answers_data = []
-
-        for question_id, user_answer in answers.items():
-            try:
-                question = all_questions.get(id=question_id)
-
-                # Validate answer
-                is_correct = False
-                if question.question_type == 'multiple_choice':
-                    # For multiple choice, check if selected choice is correct
-                    try:
-                        selected_choice = AnswerChoice.objects.get(id=user_answer, question=question)
-                        is_correct = selected_choice.is_correct
-                    except AnswerChoice.DoesNotExist:
-                        is_correct = False
-                elif question.question_type in ['fill_blank', 'short_answer']:
-                    # For text answers, use intelligent matching
-                    correct_answers_list = [ans.strip().lower() for ans in question.correct_answer.split(',')]
-                    user_answer_clean = user_answer.strip().lower()
-                    is_correct = user_answer_clean in correct_answers_list
-                elif question.question_type == 'true_false':
-                    is_correct = user_answer.lower() == question.correct_answer.lower()
-
-                if is_correct:
-                    correct_answers += 1
-
-                exam_answers_data.append({
-                    'question': question,
-                    'user_answer': user_answer,
-                    'is_correct': is_correct
-                })
-
-            except Question.DoesNotExist:
-                continue
+        # Grade all answers against one batched fetch of the submitted questions
+        correct_answers, exam_answers_data = grade_exam_submission(level, answers)
 
         # Calculate percentage based on total exam questions, not just answered ones
         percentage = (correct_answers / total_exam_questions * 100) if total_exam_questions > 0 else 0
@@ -1132,17 +1061,12 @@ def submit_exam(request):
         exam.passed = percentage >= exam.pass_percentage
         exam.is_completed = True
         exam.completed_at = timezone.now()
-        exam.save()
-
-        # Create exam answers
-        for answer_data in exam_answers_data:
-            TestAnswer.objects.create(
-                test=exam,
-                question=answer_data['question'],
-                user_answer=answer_data['user_answer'],
-                is_correct=answer_data['is_correct'],
-                points_earned=1 if answer_data['is_correct'] else 0
-            )
+
+        with transaction.atomic():
+            exam.save()
+
+            # Create exam answers
+            save_graded_answers(TestAnswer, 'test', exam, exam_answers_data)
 
         # Update user progress if exam passed
         if exam.passed:
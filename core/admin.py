@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SystemSettings, Notification, CSVImportLog, HeroSection, SiteStatistic, UserFeedback
+from .models import SystemSettings, Notification, CSVImportLog, HeroSection, SiteStatistic, UserFeedback, BackgroundJob, JobWorker
 
 
 @admin.register(HeroSection)
@@ -53,12 +53,26 @@ class NotificationAdmin(admin.ModelAdmin):
 
 @admin.register(CSVImportLog)
 class CSVImportLogAdmin(admin.ModelAdmin):
-    list_display = ['import_type', 'file_name', 'status', 'total_rows', 'successful_rows', 'started_at']
+    list_display = ['import_type', 'file_name', 'status', 'total_rows', 'successful_rows', 'error_count', 'warning_count', 'started_at']
     list_filter = ['import_type', 'status', 'started_at']
     search_fields = ['file_name', 'imported_by__username']
     readonly_fields = ['started_at', 'completed_at', 'success_rate']
 
 
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['job_type', 'status', 'progress', 'message', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['job_type', 'status', 'created_at']
+    search_fields = ['id', 'created_by__email']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'heartbeat_at', 'worker']
+
+
+@admin.register(JobWorker)
+class JobWorkerAdmin(admin.ModelAdmin):
+    list_display = ['name', 'started_at', 'heartbeat_at']
+    readonly_fields = ['name', 'started_at', 'heartbeat_at']
+
+
 @admin.register(UserFeedback)
 class UserFeedbackAdmin(admin.ModelAdmin):
     list_display = ['user_display', 'feedback_type', 'rating', 'star_rating', 'is_resolved', 'created_at']
@@ -0,0 +1,155 @@
+"""
+Dashboard data service.
+
+Builds the learner dashboard for one grade in a fixed number of queries
+(class levels with subjects, topics, the user's topic progress, the user's
+level progress and recent activity) and computes next topics and completion
+in memory. The result is cached per user and grade, keyed by two version
+stamps: one bumped whenever the user's progress changes and one bumped when
+the curriculum (subjects, class levels, topics) changes. The stamps live in
+the "shared" cache, since CSV imports bump them from the job process.
+"""
+
+from django.core.cache import cache, caches
+from django.urls import reverse
+from django.utils import timezone
+
+from progress.models import UserProgress, TopicProgress
+from subjects.models import ClassLevel, Topic
+
+DASHBOARD_TIMEOUT = 60 * 30  # 30 minutes
+USER_VERSION_KEY = 'dashboard_version_{user_id}'
+CONTENT_VERSION_KEY = 'dashboard_content_version'
+SNAPSHOT_KEY = 'dashboard_snapshot_{user_id}_{level}_v{user_version}_{content_version}'
+
+RECENT_ACTIVITY_LIMIT = 5
+
+
+def build_dashboard_data(user, level_number):
+    """
+    Collect per-subject progress for a grade.
+
+    Missing UserProgress records are created in one bulk insert with
+    counters computed from the data already loaded.
+    """
+    class_levels = list(
+        ClassLevel.objects.filter(
+            level_number=level_number,
+            subject__is_active=True
+        ).select_related('subject').order_by('subject__order', 'subject__name')
+    )
+    level_ids = [class_level.id for class_level in class_levels]
+
+    topics_by_level = {level_id: [] for level_id in level_ids}
+    for topic in Topic.objects.filter(class_level_id__in=level_ids, is_active=True).order_by('order'):
+        topics_by_level[topic.class_level_id].append(topic)
+
+    topic_completion = dict(
+        TopicProgress.objects.filter(
+            user=user,
+            topic__class_level_id__in=level_ids
+        ).values_list('topic_id', 'is_completed')
+    )
+
+    progress_by_level = {
+        progress.class_level_id: progress
+        for progress in UserProgress.objects.filter(user=user, class_level_id__in=level_ids)
+    }
+
+    now = timezone.now()
+    missing_progress = []
+    current_grade_subjects = []
+
+    for class_level in class_levels:
+        subject = class_level.subject
+        topics = topics_by_level[class_level.id]
+        topics_count = len(topics)
+        completed_topics = sum(1 for topic in topics if topic_completion.get(topic.id))
+
+        # First topic without a completed TopicProgress record
+        next_topic = next((topic for topic in topics if not topic_completion.get(topic.id)), None)
+
+        progress = progress_by_level.get(class_level.id)
+        if progress is None:
+            is_completed = topics_count > 0 and completed_topics == topics_count
+            progress = UserProgress(
+                user=user,
+                class_level=class_level,
+                is_started=False,
+                total_topics=topics_count,
+                topics_completed=completed_topics,
+                is_completed=is_completed,
+                completed_at=now if is_completed else None
+            )
+            missing_progress.append(progress)
+
+        current_grade_subjects.append({
+            'subject': subject,
+            'class_level': class_level,
+            'progress': progress,
+            'topics_count': topics_count,
+            'completed_topics': completed_topics,
+            'completion_percentage': (completed_topics / topics_count * 100) if topics_count > 0 else 0,
+            'next_topic': next_topic,
+            'next_topic_url': reverse('subjects:topic_detail', args=[
+                subject.id, class_level.id, next_topic.id
+            ]) if next_topic else None,
+            'is_completed': progress.is_completed
+        })
+
+    if missing_progress:
+        UserProgress.objects.bulk_create(missing_progress, ignore_conflicts=True)
+
+    # Last topics worked on in this grade
+    recent_activity = list(
+        TopicProgress.objects.filter(
+            user=user,
+            is_started=True,
+            topic__class_level__level_number=level_number
+        ).select_related(
+            'topic__class_level__subject'
+        ).order_by('-updated_at')[:RECENT_ACTIVITY_LIMIT]
+    )
+
+    return {
+        'current_grade_subjects': current_grade_subjects,
+        'recent_activity': recent_activity,
+    }
+
+
+def get_dashboard_data(user, level_number):
+    """Return the dashboard data for a user's grade, from cache when current"""
+    user_version_key = USER_VERSION_KEY.format(user_id=user.id)
+    versions = caches['shared'].get_many([user_version_key, CONTENT_VERSION_KEY])
+
+    key = SNAPSHOT_KEY.format(
+        user_id=user.id,
+        level=level_number,
+        user_version=versions.get(user_version_key, 0),
+        content_version=versions.get(CONTENT_VERSION_KEY, 0)
+    )
+
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard_data(user, level_number)
+        cache.set(key, data, DASHBOARD_TIMEOUT)
+    return data
+
+
+def _bump(key):
+    shared_cache = caches['shared']
+    try:
+        shared_cache.incr(key)
+    except ValueError:
+        # Missing key: start after the implicit version 0
+        shared_cache.set(key, 1, None)
+
+
+def invalidate_dashboard(user_id):
+    """Invalidate every cached dashboard snapshot of one user"""
+    _bump(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def invalidate_all_dashboards():
+    """Invalidate all cached dashboards after a curriculum change"""
+    _bump(CONTENT_VERSION_KEY)
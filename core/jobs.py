@@ -0,0 +1,207 @@
+"""
+Database-backed background jobs.
+
+Admin views submit work with ``submit_job`` and return at once; the
+``run_jobs`` management command claims queued jobs and runs them in a pool of
+worker processes. Job functions are registered by name with ``register_job``
+and receive a JobContext for reporting progress, which also raises
+JobCanceled once cancellation has been requested. A job type may register a
+cleanup function too, called with the job's params however the job ends:
+completed, failed, canceled while queued or abandoned by a dead worker. Clients poll the job's
+status, progress and result through the admin job API.
+
+With ``BACKGROUND_JOBS_EAGER`` enabled (tests, or a deployment without a
+worker) jobs run inline when submitted. Otherwise each worker records a
+heartbeat, and ``workers_available`` tells submitters whether queued jobs
+will be picked up at all.
+"""
+
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import BackgroundJob, JobWorker
+
+logger = logging.getLogger('Pentora')
+
+PROGRESS_SAVE_INTERVAL = 1.0  # seconds between progress writes
+WORKER_HEARTBEAT_INTERVAL = 10  # seconds between a worker's heartbeat writes
+NO_WORKER_MESSAGE = 'No job worker is running, so this job will wait until one starts (manage.py run_jobs)'
+
+_registry = {}
+_cleanups = {}
+
+
+class JobCanceled(BaseException):
+    """
+    Raised inside a job when cancellation has been requested.
+
+    Derives from BaseException so the broad ``except Exception`` blocks in
+    job code (CSV import, for one) do not swallow it.
+    """
+
+
+def register_job(name, cleanup=None):
+    """Register a job function under ``name``, with an optional ``cleanup(**params)``"""
+    def decorator(func):
+        _registry[name] = func
+        if cleanup is not None:
+            _cleanups[name] = cleanup
+        return func
+    return decorator
+
+
+def cleanup_job(job):
+    """Run the job type's cleanup; called once the job can no longer run"""
+    cleanup = _cleanups.get(job.job_type)
+    if cleanup is None:
+        return
+    try:
+        cleanup(**job.params)
+    except Exception as e:
+        logger.error(f"Cleanup for background job {job.job_type} {job.pk} failed: {e}")
+
+
+def get_job_function(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError(f"Unknown job type: {name}")
+
+
+class JobContext:
+    """Handed to a job function to report progress and observe cancellation"""
+
+    def __init__(self, job):
+        self.job = job
+        self._last_save = 0
+
+    def progress(self, message, percentage=None, force=False):
+        """Record progress; raises JobCanceled if the job was canceled"""
+        self.job.message = message[:255]
+        if percentage is not None:
+            self.job.progress = min(max(percentage, 0), 100)
+
+        now = time.monotonic()
+        if not force and now - self._last_save < PROGRESS_SAVE_INTERVAL:
+            return
+        self._last_save = now
+
+        BackgroundJob.objects.filter(pk=self.job.pk).update(
+            message=self.job.message, progress=self.job.progress, heartbeat_at=timezone.now()
+        )
+        self.check_canceled()
+
+    def check_canceled(self):
+        if BackgroundJob.objects.filter(pk=self.job.pk, cancel_requested=True).exists():
+            raise JobCanceled()
+
+
+def submit_job(job_type, params=None, user=None):
+    """Queue a job, or run it inline when BACKGROUND_JOBS_EAGER is set"""
+    get_job_function(job_type)
+    job = BackgroundJob.objects.create(job_type=job_type, params=params or {}, created_by=user)
+    if getattr(settings, 'BACKGROUND_JOBS_EAGER', False):
+        if claim_job(job, worker='eager'):
+            run_job(job.pk)
+        job.refresh_from_db()
+    return job
+
+
+def claim_job(job, worker):
+    """Mark a queued job as running; False if another worker got it first"""
+    now = timezone.now()
+    return BackgroundJob.objects.filter(pk=job.pk, status='queued').update(
+        status='running', started_at=now, heartbeat_at=now, worker=worker
+    ) == 1
+
+
+def claim_next_job(worker):
+    """Claim the oldest queued job, or return None"""
+    for job in BackgroundJob.objects.filter(status='queued').order_by('created_at')[:10]:
+        if claim_job(job, worker):
+            return job
+    return None
+
+
+def run_job(job_id):
+    """Run a claimed job to completion; executed in a worker process"""
+    close_old_connections()
+    job = BackgroundJob.objects.get(pk=job_id)
+    context = JobContext(job)
+
+    try:
+        context.check_canceled()
+        job.result = get_job_function(job.job_type)(context, **job.params)
+        job.status = 'completed'
+        job.progress = 100
+    except JobCanceled:
+        job.status = 'canceled'
+        job.message = 'Canceled'
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e) or e.__class__.__name__
+        logger.error(f"Background job {job.job_type} {job.pk} failed: {e}\n{traceback.format_exc()}")
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['params', 'status', 'progress', 'message', 'result', 'error', 'finished_at'])
+    cleanup_job(job)
+    close_old_connections()
+    return job.status
+
+
+def cancel_job(job):
+    """Cancel a queued job now, or ask a running job to stop at its next progress report"""
+    now = timezone.now()
+    if BackgroundJob.objects.filter(pk=job.pk, status='queued').update(
+        status='canceled', cancel_requested=True, finished_at=now, message='Canceled'
+    ):
+        cleanup_job(job)
+        return True
+    return BackgroundJob.objects.filter(pk=job.pk, status='running').update(cancel_requested=True) == 1
+
+
+def fail_stale_jobs(stale_after=None):
+    """Fail running jobs whose worker stopped reporting, e.g. after a crash"""
+    stale_after = stale_after or getattr(settings, 'BACKGROUND_JOBS_STALE_SECONDS', 600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    failed = 0
+    for job in BackgroundJob.objects.filter(status='running', heartbeat_at__lt=cutoff):
+        # Re-checked per job, in case it finished since it was read
+        if BackgroundJob.objects.filter(pk=job.pk, status='running', heartbeat_at__lt=cutoff).update(
+            status='failed', error='Worker stopped responding', finished_at=timezone.now()
+        ):
+            cleanup_job(job)
+            failed += 1
+    return failed
+
+
+def record_worker_heartbeat(name):
+    """Mark the run_jobs worker ``name`` as alive"""
+    now = timezone.now()
+    if not JobWorker.objects.filter(name=name).update(heartbeat_at=now):
+        JobWorker.objects.create(name=name, started_at=now, heartbeat_at=now)
+
+
+def remove_worker(name):
+    JobWorker.objects.filter(name=name).delete()
+
+
+def workers_available():
+    """Whether a worker has sent a heartbeat recently, so queued jobs will run"""
+    if getattr(settings, 'BACKGROUND_JOBS_EAGER', False):
+        return True
+    timeout = getattr(settings, 'BACKGROUND_JOBS_WORKER_TIMEOUT', 60)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return JobWorker.objects.filter(heartbeat_at__gte=cutoff).exists()
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
@@ -0,0 +1,105 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+# Spawned workers import this module before Django is set up, so models and
+# the job registry are imported inside functions
+
+
+def _init_worker():
+    # Worker processes are spawned, so they load Django (and the job registry) themselves
+    django.setup()
+
+
+def _run_job(job_id):
+    from core.jobs import run_job
+    return run_job(job_id)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.BACKGROUND_JOBS_WORKERS,
+            help='Jobs run in parallel, one process each',
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between queue checks')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        from core.jobs import (
+            WORKER_HEARTBEAT_INTERVAL, claim_next_job, fail_stale_jobs, record_worker_heartbeat, remove_worker,
+            worker_name,
+        )
+        from core.models import BackgroundJob
+
+        workers = max(options['workers'], 1)
+        name = worker_name()
+        running = {}
+        last_heartbeat = None
+
+        # Spawned children never share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        self.stdout.write(self.style.SUCCESS(f'🚀 Job worker {name} started with {workers} processes'))
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+            try:
+                while True:
+                    if last_heartbeat is None or time.monotonic() - last_heartbeat >= WORKER_HEARTBEAT_INTERVAL:
+                        record_worker_heartbeat(name)
+                        last_heartbeat = time.monotonic()
+                    for job_id, future in list(running.items()):
+                        if future.done():
+                            del running[job_id]
+                            self.report(job_id, future)
+
+                    if running:
+                        # Keep long jobs that report little progress from looking stale
+                        BackgroundJob.objects.filter(pk__in=running, status='running').update(
+                            heartbeat_at=timezone.now()
+                        )
+                    fail_stale_jobs()
+
+                    while len(running) < workers:
+                        job = claim_next_job(name)
+                        if job is None:
+                            break
+                        self.stdout.write(f'▶️  {job.job_type} {job.pk}')
+                        running[job.pk] = pool.submit(_run_job, job.pk)
+
+                    if options['once'] and not running:
+                        break
+                    time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING('⚠️  Stopping; waiting for running jobs to finish'))
+
+        for job_id, future in running.items():
+            self.report(job_id, future)
+        remove_worker(name)
+
+    def report(self, job_id, future):
+        from core.jobs import cleanup_job
+        from core.models import BackgroundJob
+
+        try:
+            status = future.result()
+        except Exception as e:
+            # The worker process died before the job could record its outcome
+            if BackgroundJob.objects.filter(pk=job_id, status='running').update(
+                status='failed', error=str(e) or e.__class__.__name__, finished_at=timezone.now()
+            ):
+                cleanup_job(BackgroundJob.objects.get(pk=job_id))
+            status = 'failed'
+
+        style = self.style.SUCCESS if status == 'completed' else self.style.WARNING
+        self.stdout.write(style(f'   {job_id}: {status}'))
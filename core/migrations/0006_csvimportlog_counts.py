@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csvimportlog',
+            name='error_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='csvimportlog',
+            name='info_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='csvimportlog',
+            name='warning_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
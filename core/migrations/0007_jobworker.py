@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_csvimportlog_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobWorker',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('heartbeat_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Job Worker',
+                'verbose_name_plural': 'Job Workers',
+                'db_table': 'job_workers',
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import FileExtensionValidator
+import time
 import uuid
 
 
@@ -103,7 +105,15 @@ class Notification(models.Model):
 class CSVImportLog(models.Model):
     """
     Model to track CSV import operations
+
+    Log messages are buffered in memory and written together, at most every
+    LOG_FLUSH_INTERVAL seconds and on every save. Every message is counted
+    by severity, but only the first LOG_SAMPLE_LIMIT of each severity are
+    kept in ``error_log``.
     """
+    LOG_SAMPLE_LIMIT = 200  # messages kept per severity
+    LOG_FLUSH_INTERVAL = 2.0  # seconds between buffered log writes
+
     IMPORT_TYPES = [
         ('questions', 'Questions'),
         ('study_notes', 'Study Notes'),
@@ -133,6 +143,9 @@ class CSVImportLog(models.Model):
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     error_log = models.TextField(blank=True)
+    error_count = models.PositiveIntegerField(default=0)
+    warning_count = models.PositiveIntegerField(default=0)
+    info_count = models.PositiveIntegerField(default=0)
 
     # Metadata
     started_at = models.DateTimeField(default=timezone.now)
@@ -161,29 +174,42 @@ class CSVImportLog(models.Model):
         self.completed_at = timezone.now()
         self.save()
 
+    @property
+    def log_truncated(self):
+        """Whether some messages were counted but not kept in error_log"""
+        return max(self.error_count, self.warning_count, self.info_count) > self.LOG_SAMPLE_LIMIT
+
     def add_error(self, error_message):
         """Add error to the error log"""
-        if self.error_log:
-            self.error_log += f"\n{error_message}"
-        else:
-            self.error_log = error_message
-        self.save()
+        self._add_log_message('error_count', error_message)
 
     def add_info(self, info_message):
         """Add info message to the error log (used for general logging)"""
-        if self.error_log:
-            self.error_log += f"\nINFO: {info_message}"
-        else:
-            self.error_log = f"INFO: {info_message}"
-        self.save()
+        self._add_log_message('info_count', f"INFO: {info_message}")
 
     def add_warning(self, warning_message):
         """Add warning message to the error log"""
-        if self.error_log:
-            self.error_log += f"\nWARNING: {warning_message}"
-        else:
-            self.error_log = f"WARNING: {warning_message}"
-        self.save()
+        self._add_log_message('warning_count', f"WARNING: {warning_message}")
+
+    def _add_log_message(self, count_field, line):
+        count = getattr(self, count_field) + 1
+        setattr(self, count_field, count)
+        if count <= self.LOG_SAMPLE_LIMIT:
+            self.__dict__.setdefault('_pending_log', []).append(line)
+
+        if time.monotonic() - self.__dict__.get('_log_flushed_at', 0) >= self.LOG_FLUSH_INTERVAL:
+            self.flush_log()
+
+    def flush_log(self):
+        """Write buffered log messages and counts in one update"""
+        self.save(update_fields=['error_log', 'error_count', 'warning_count', 'info_count'])
+
+    def save(self, *args, **kwargs):
+        pending = self.__dict__.pop('_pending_log', None)
+        if pending:
+            self.error_log = '\n'.join([self.error_log, *pending] if self.error_log else pending)
+        self._log_flushed_at = time.monotonic()
+        super().save(*args, **kwargs)
 
 
 class HeroSection(models.Model):
@@ -310,3 +336,91 @@ class UserFeedback(models.Model):
         if self.rating:
             return '★' * self.rating + '☆' * (5 - self.rating)
         return 'No rating'
+
+
+class BackgroundJob(models.Model):
+    """
+    Work queued by admin views and executed by the run_jobs worker
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('canceled', 'Canceled'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    job_type = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    # Progress
+    progress = models.FloatField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+
+    # Outcome
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    # Metadata
+    created_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        db_table = 'background_jobs'
+        verbose_name = 'Background Job'
+        verbose_name_plural = 'Background Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.job_type} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed', 'canceled')
+
+    def to_dict(self, include_result=True):
+        """Status payload for the job status API"""
+        data = {
+            'id': str(self.id),
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': round(self.progress, 1),
+            'message': self.message,
+            'cancel_requested': self.cancel_requested,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
+
+
+class JobWorker(models.Model):
+    """
+    A running run_jobs process, kept alive by its heartbeat
+
+    Lets the admin warn when jobs are queued but no worker is picking them up.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'job_workers'
+        verbose_name = 'Job Worker'
+        verbose_name_plural = 'Job Workers'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,30 @@
+"""
+Signal handlers for the core app
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from progress.models import UserProgress, TopicProgress
+from subjects.models import Subject, ClassLevel, Topic
+from .dashboard import invalidate_dashboard, invalidate_all_dashboards
+
+
+@receiver(post_save, sender=TopicProgress)
+@receiver(post_delete, sender=TopicProgress)
+@receiver(post_save, sender=UserProgress)
+@receiver(post_delete, sender=UserProgress)
+def invalidate_user_dashboard(sender, instance, **kwargs):
+    """A learner's progress changed, so their dashboard snapshot is stale"""
+    invalidate_dashboard(instance.user_id)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=ClassLevel)
+@receiver(post_delete, sender=ClassLevel)
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def invalidate_dashboards_for_curriculum(sender, instance, **kwargs):
+    """Curriculum changes affect every learner's dashboard"""
+    invalidate_all_dashboards()
@@ -1,3 +1,462 @@
-from django.test import TestCase
+import csv
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from admin_panel.context_processors import admin_settings
+from admin_panel.models import SiteSettings, site_settings_snapshot
+from billing.models import BillingSettings, billing_settings_snapshot
+from progress.models import UserProgress, TopicProgress
+from content.models import Question
+from subjects.models import Subject, ClassLevel, Topic
+from .dashboard import get_dashboard_data
+from .jobs import (
+    cancel_job, claim_job, fail_stale_jobs, record_worker_heartbeat, register_job, run_job, submit_job,
+    workers_available,
+)
+from .models import BackgroundJob, CSVImportLog, JobWorker
+from .utils.csv_import import CSVImporter, detect_encoding
+
+
+cleaned_up = []
+
+
+@register_job('test_count', cleanup=lambda **params: cleaned_up.append(params))
+def count_job(context, steps=3, fail=False, cancel_at=None):
+    for step in range(steps):
+        if step == cancel_at:
+            cancel_job(context.job)
+        context.progress(f'Step {step + 1}/{steps}', step / steps * 100, force=True)
+    if fail:
+        raise ValueError('Counting failed')
+    return {'steps': steps}
+
+
+class SettingsSnapshotTestCase(TestCase):
+    """Test cases for the process-local settings snapshots"""
+
+    def setUp(self):
+        cache.clear()
+        site_settings_snapshot.clear()
+        billing_settings_snapshot.clear()
+
+    def test_settings_reads_are_free_after_first_load(self):
+        """Context processor and billing checks issue no queries once loaded"""
+        request = RequestFactory().get('/')
+        # Settings read inside a transaction are only kept once it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_settings(request)
+            BillingSettings.get_settings()
+
+        with self.assertNumQueries(0):
+            context = admin_settings(request)
+            self.assertFalse(BillingSettings.get_settings().billing_enabled)
+
+        self.assertFalse(context['admin_settings']['maintenance_mode'])
+
+    def test_save_invalidates_snapshot(self):
+        """Saved changes are visible to the next read"""
+        billing_settings = BillingSettings.get_settings()
+        billing_settings.billing_enabled = True
+        billing_settings.save()
+
+        self.assertTrue(BillingSettings.get_settings().billing_enabled)
+
+        site_settings = SiteSettings.get_settings()
+        site_settings.maintenance_mode = True
+        site_settings.save()
+
+        self.assertTrue(SiteSettings.get_settings().maintenance_mode)
+
+    def test_instances_are_independent(self):
+        """Modifying a returned instance does not leak into the snapshot"""
+        first = BillingSettings.get_settings()
+        first.billing_enabled = True
+
+        self.assertFalse(BillingSettings.get_settings().billing_enabled)
+
+    @override_settings(SETTINGS_SNAPSHOT_TTL=0)
+    def test_version_change_from_another_worker_reloads(self):
+        """A new version stamp in the shared cache forces a reload"""
+        BillingSettings.load_settings()
+        with self.captureOnCommitCallbacks(execute=True):
+            BillingSettings.get_settings()
+        BillingSettings.objects.filter(pk=1).update(billing_enabled=True)
+
+        # Same version: the snapshot is still trusted
+        with self.assertNumQueries(0):
+            self.assertFalse(BillingSettings.get_settings().billing_enabled)
+
+        # Another worker saved the row and published a new version
+        billing_settings_snapshot._publish_version()
+        self.assertTrue(BillingSettings.get_settings().billing_enabled)
+
+    def test_reload_in_rolled_back_transaction_is_not_kept(self):
+        """Values read inside a transaction that rolls back are not cached"""
+        with self.captureOnCommitCallbacks(execute=True):
+            BillingSettings.get_settings()
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                BillingSettings.objects.filter(pk=1).update(billing_enabled=True)
+                billing_settings_snapshot.clear()
+                self.assertTrue(BillingSettings.get_settings().billing_enabled)
+                raise RuntimeError('rolled back')
+
+        self.assertFalse(BillingSettings.get_settings().billing_enabled)
+
+
+class DashboardDataTestCase(TestCase):
+    """Test cases for the cached dashboard data service"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='learner@test.com', password='testpass123')
+
+        self.topics = {}
+        for order, name in enumerate(['Mathematics', 'Science', 'English']):
+            subject = Subject.objects.create(name=name, order=order)
+            class_level = ClassLevel.objects.create(subject=subject, name='Grade 4', level_number=4)
+            ClassLevel.objects.create(subject=subject, name='Grade 5', level_number=5)
+            self.topics[name] = [
+                Topic.objects.create(class_level=class_level, title=f'{name} {number}', order=number)
+                for number in range(4)
+            ]
+
+        for topic in self.topics['Mathematics'][:2]:
+            TopicProgress.objects.create(user=self.user, topic=topic, is_started=True, is_completed=True)
+
+    def test_dashboard_uses_fixed_number_of_queries(self):
+        """Building the dashboard does not depend on the number of subjects or topics"""
+        # class levels, topics, topic progress, user progress, bulk insert, recent activity
+        with self.assertNumQueries(6):
+            data = get_dashboard_data(self.user, 4)
+
+        subjects = data['current_grade_subjects']
+        self.assertEqual([item['subject'].name for item in subjects], ['Mathematics', 'Science', 'English'])
+
+        math = subjects[0]
+        self.assertEqual(math['topics_count'], 4)
+        self.assertEqual(math['completed_topics'], 2)
+        self.assertEqual(math['completion_percentage'], 50)
+        self.assertEqual(math['next_topic'], self.topics['Mathematics'][2])
+        self.assertEqual(subjects[1]['next_topic'], self.topics['Science'][0])
+        self.assertEqual(len(data['recent_activity']), 2)
+
+        self.assertEqual(UserProgress.objects.filter(user=self.user).count(), 3)
+
+    def test_snapshot_is_cached_until_progress_changes(self):
+        get_dashboard_data(self.user, 4)
+
+        with self.assertNumQueries(0):
+            get_dashboard_data(self.user, 4)
+
+        progress = TopicProgress.objects.create(user=self.user, topic=self.topics['Science'][0], is_started=True)
+        progress.is_completed = True
+        progress.save()
+
+        data = get_dashboard_data(self.user, 4)
+        self.assertEqual(data['current_grade_subjects'][1]['completed_topics'], 1)
+        self.assertEqual(data['current_grade_subjects'][1]['next_topic'], self.topics['Science'][1])
+
+    def test_curriculum_change_invalidates_snapshot(self):
+        get_dashboard_data(self.user, 4)
+
+        Topic.objects.create(class_level=self.topics['English'][0].class_level, title='English 4', order=4)
+
+        data = get_dashboard_data(self.user, 4)
+        self.assertEqual(data['current_grade_subjects'][2]['topics_count'], 5)
+
+
+class BackgroundJobTestCase(TestCase):
+    """Test cases for the database-backed job runner"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='admin@test.com', password='testpass123')
+
+    def test_submit_queues_job(self):
+        job = submit_job('test_count', {'steps': 2}, user=self.user)
+
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.created_by, self.user)
+
+    def test_unknown_job_type_is_rejected(self):
+        with self.assertRaises(ValueError):
+            submit_job('missing')
+        self.assertFalse(BackgroundJob.objects.exists())
+
+    @override_settings(BACKGROUND_JOBS_EAGER=True)
+    def test_eager_job_records_result(self):
+        job = submit_job('test_count', {'steps': 4})
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(job.result, {'steps': 4})
+        self.assertEqual(job.message, 'Step 4/4')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_job_is_claimed_once(self):
+        job = submit_job('test_count')
+
+        self.assertTrue(claim_job(job, 'worker-1'))
+        self.assertFalse(claim_job(job, 'worker-2'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), ('running', 'worker-1'))
+
+    def test_failed_job_records_error(self):
+        job = submit_job('test_count', {'fail': True})
+        claim_job(job, 'worker')
+
+        self.assertEqual(run_job(job.pk), 'failed')
+        job.refresh_from_db()
+        self.assertEqual(job.error, 'Counting failed')
+
+    def test_cancel_queued_job(self):
+        job = submit_job('test_count')
+
+        self.assertTrue(cancel_job(job))
+        self.assertFalse(claim_job(job, 'worker'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'canceled')
+        self.assertFalse(cancel_job(job))
+
+    def test_running_job_stops_at_next_progress_report(self):
+        job = submit_job('test_count', {'steps': 5, 'cancel_at': 2})
+        claim_job(job, 'worker')
+
+        self.assertEqual(run_job(job.pk), 'canceled')
+        job.refresh_from_db()
+        self.assertIsNone(job.result)
+        self.assertAlmostEqual(job.progress, 40)
+
+    def test_stale_running_jobs_fail(self):
+        stale = submit_job('test_count')
+        fresh = submit_job('test_count')
+        claim_job(stale, 'worker')
+        claim_job(fresh, 'worker')
+        BackgroundJob.objects.filter(pk=stale.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=30))
+
+        self.assertEqual(fail_stale_jobs(stale_after=600), 1)
+        self.assertEqual(BackgroundJob.objects.get(pk=stale.pk).status, 'failed')
+        self.assertEqual(BackgroundJob.objects.get(pk=fresh.pk).status, 'running')
+
+    def test_cleanup_runs_however_the_job_ends(self):
+        cleaned_up.clear()
+        finished = submit_job('test_count', {'steps': 1})
+        canceled = submit_job('test_count', {'steps': 2})
+        stale = submit_job('test_count', {'steps': 3})
+
+        claim_job(finished, 'worker')
+        run_job(finished.pk)
+        cancel_job(canceled)
+        claim_job(stale, 'worker')
+        BackgroundJob.objects.filter(pk=stale.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=30))
+        fail_stale_jobs(stale_after=600)
+
+        self.assertEqual(cleaned_up, [{'steps': 1}, {'steps': 2}, {'steps': 3}])
+
+    @override_settings(BACKGROUND_JOBS_WORKER_TIMEOUT=60)
+    def test_workers_available_follows_heartbeats(self):
+        self.assertFalse(workers_available())
+
+        record_worker_heartbeat('host:1')
+        self.assertTrue(workers_available())
+
+        JobWorker.objects.filter(name='host:1').update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        self.assertFalse(workers_available())
+
+
+class StreamingCSVImportTestCase(TestCase):
+    """Test cases for the streaming question CSV import"""
+
+    HEADER = ['subject_name', 'class_level_name', 'topic_title', 'question_text', 'question_type', 'correct_answer']
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='admin@test.com', password='testpass123')
+
+    def csv_bytes(self, rows, encoding='utf-8'):
+        content = io.StringIO()
+        writer = csv.writer(content)
+        writer.writerow(self.HEADER)
+        writer.writerows(rows)
+        return content.getvalue().encode(encoding)
+
+    def test_detect_encoding(self):
+        self.assertEqual(detect_encoding(io.BytesIO('Théorème'.encode('utf-8'))), 'utf-8-sig')
+        self.assertEqual(detect_encoding(io.BytesIO('“Quoted”'.encode('cp1252'))), 'cp1252')
+        # 0x81 is undefined in cp1252
+        self.assertEqual(detect_encoding(io.BytesIO(b'caf\xe9 \x81')), 'latin1')
+
+    def test_detect_encoding_across_chunks(self):
+        stream = io.BytesIO(('a' * 3 + 'é' * 10).encode('utf-8'))
+
+        # Two-byte characters are split between 4-byte chunks
+        self.assertEqual(detect_encoding(stream, chunk_size=4), 'utf-8-sig')
+        self.assertEqual(stream.tell(), 0)
+
+    def test_file_is_imported_in_batches(self):
+        rows = [['Science', 'Grade 6', 'Plants', f'Question {i}?', 'short_answer', 'answer'] for i in range(5)]
+        rows.insert(2, ['Science', 'Grade 6', 'Plants', 'Broken?', 'essay', 'answer'])
+        rows.append(['Science', 'Grade 6', 'Animals', 'Résumé of a cell?', 'short_answer', 'answer'])
+        upload = io.BytesIO(self.csv_bytes(rows, 'cp1252'))
+
+        with mock.patch('core.utils.csv_import.IMPORT_BATCH_SIZE', 2):
+            result = CSVImporter('questions', upload, self.user).import_data()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['total_rows'], 7)
+        self.assertEqual(result['successful_rows'], 6)
+        self.assertEqual(result['failed_rows'], 1)
+        self.assertEqual(Topic.objects.filter(class_level__subject__name='Science').count(), 2)
+        self.assertTrue(Question.objects.filter(question_text='Résumé of a cell?').exists())
+        # The caller's file is left open
+        self.assertFalse(upload.closed)
+
+    def test_reported_rows_are_capped(self):
+        rows = [['Science', 'Grade 6', 'Plants', f'Question {i}?', 'essay', 'answer'] for i in range(5)]
+
+        with mock.patch('core.utils.csv_import.MAX_REPORTED_ROWS', 2):
+            importer = CSVImporter('questions', self.csv_bytes(rows), self.user, import_mode='partial')
+            result = importer.import_data()
+
+        self.assertEqual(result['failed_rows'], 5)
+        self.assertEqual(importer.skipped_count, 5)
+        self.assertEqual(len(importer.skipped_rows), 2)
+
+
+class CSVImportLogTestCase(TestCase):
+    """Test cases for the buffered CSV import log"""
+
+    def setUp(self):
+        cache.clear()
+        self.log = CSVImportLog.objects.create(import_type='questions', file_name='questions.csv', status='processing')
+
+    def test_messages_are_buffered(self):
+        self.log.add_error('Row 1: first')
+        with self.assertNumQueries(0):
+            for row in range(2, 1000):
+                self.log.add_error(f'Row {row}: broken')
+            self.log.add_warning('Row 1000: skipped')
+
+        self.log.mark_completed('failed')
+
+        log = CSVImportLog.objects.get(pk=self.log.pk)
+        self.assertEqual((log.error_count, log.warning_count), (999, 1))
+        self.assertTrue(log.log_truncated)
+        lines = log.error_log.split('\n')
+        self.assertEqual(len(lines), CSVImportLog.LOG_SAMPLE_LIMIT + 1)
+        self.assertEqual(lines[0], 'Row 1: first')
+        self.assertEqual(lines[-1], 'WARNING: Row 1000: skipped')
+
+    def test_buffer_is_flushed_periodically(self):
+        self.log.add_info('Started')
+        with mock.patch.object(CSVImportLog, 'LOG_FLUSH_INTERVAL', 0):
+            self.log.add_error('Row 1: broken')
+
+        log = CSVImportLog.objects.get(pk=self.log.pk)
+        self.assertEqual(log.error_log, 'INFO: Started\nRow 1: broken')
+        self.assertEqual((log.error_count, log.info_count), (1, 1))
+
+    def test_import_status_reflects_failures(self):
+        user = get_user_model().objects.create_user(email='admin@test.com', password='testpass123')
+        content = 'subject_name,class_level_name,topic_title,question_text,question_type,correct_answer\n'
+        content += 'Science,Grade 6,Plants,What do roots absorb?,short_answer,water\n'
+        content += 'Science,Grade 6,Plants,Broken?,essay,water\n'
+
+        importer = CSVImporter('questions', content, user)
+        importer.import_data()
+
+        log = CSVImportLog.objects.get(pk=importer.log.pk)
+        self.assertEqual(log.status, 'partial')
+        self.assertEqual(log.error_count, 1)
+        self.assertIn("Row 2: Invalid question type: 'essay'", log.error_log)
+
+
+class HierarchyResolutionTestCase(TestCase):
+    """Test cases for resolving the subject hierarchy named in question imports"""
+
+    HEADER = 'subject_name,class_level_name,topic_title,question_text,question_type,correct_answer\n'
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='admin@test.com', password='testpass123')
+        self.subject = Subject.objects.create(name='Science')
+        self.class_level = ClassLevel.objects.create(subject=self.subject, name='Grade 6', level_number=6)
+        self.topic = Topic.objects.create(class_level=self.class_level, title='Plants', order=5)
+
+    def import_rows(self, *rows):
+        content = self.HEADER + ''.join(f'{row},short_answer,answer\n' for row in rows)
+        with self.captureOnCommitCallbacks(execute=True):
+            return CSVImporter('questions', content, self.user).import_data()
+
+    def test_names_match_case_insensitively(self):
+        result = self.import_rows('SCIENCE,grade 6,plants,What do roots absorb?')
+
+        self.assertEqual(result['successful_rows'], 1)
+        self.assertEqual(Question.objects.get().topic, self.topic)
+        self.assertEqual(Topic.objects.count(), 1)
+
+    def test_non_ascii_names_match_case_insensitively(self):
+        subject = Subject.objects.create(name='Français')
+        class_level = ClassLevel.objects.create(subject=subject, name='Élémentaire 6', level_number=6)
+        topic = Topic.objects.create(class_level=class_level, title='Économie', order=1)
+
+        result = self.import_rows('FRANÇAIS,ÉLÉMENTAIRE 6,économie,Qu’est-ce qu’un marché?')
+
+        self.assertEqual(result['successful_rows'], 1)
+        self.assertEqual(Question.objects.get().topic, topic)
+        self.assertEqual(Subject.objects.count(), 2)
+        self.assertEqual(Topic.objects.count(), 2)
+
+    def test_new_topics_are_ordered_after_existing_ones(self):
+        result = self.import_rows(
+            'Science,Grade 6,Animals,How many legs does a spider have?',
+            'Science,Grade 6,Rocks,What is granite?',
+            'Science,Class Seven,Light,What is a shadow?',
+        )
+
+        self.assertEqual(result['successful_rows'], 3)
+        orders = dict(Topic.objects.filter(class_level=self.class_level).values_list('title', 'order'))
+        self.assertEqual(orders, {'Plants': 5, 'Animals': 6, 'Rocks': 7})
+        self.assertEqual(ClassLevel.objects.get(name='Class Seven').level_number, 7)
+
+    def test_import_resolves_each_name_once(self):
+        resolve = CSVImporter._bulk_create_hierarchy
+        with mock.patch('core.utils.csv_import.IMPORT_BATCH_SIZE', 1), \
+                mock.patch.object(CSVImporter, '_bulk_create_hierarchy', autospec=True, side_effect=resolve) as resolve_hierarchy:
+            result = self.import_rows(
+                'Science,Grade 6,Plants,What do roots absorb?',
+                'Science,Grade 6,Plants,What do leaves make?',
+            )
+
+        self.assertEqual(result['successful_rows'], 2)
+        self.assertEqual(resolve_hierarchy.call_count, 1)
+
+    def test_rows_changed_without_signals_are_read_again(self):
+        # Renames made by another process reach the job only through the database
+        self.import_rows('Science,Grade 6,Plants,What do roots absorb?')
+        Topic.objects.filter(pk=self.topic.pk).update(title='Plant Life')
+
+        self.import_rows('Science,Grade 6,Plants,What do leaves make?')
+
+        self.assertEqual(Topic.objects.filter(class_level=self.class_level).count(), 2)
+        self.assertEqual(Question.objects.filter(topic=self.topic).count(), 1)
+
+    def test_renamed_topic_is_resolved_again(self):
+        self.import_rows('Science,Grade 6,Plants,What do roots absorb?')
+        self.topic.title = 'Plant Life'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic.save()
+
+        self.import_rows('Science,Grade 6,Plants,What do leaves make?')
+
+        self.assertEqual(Topic.objects.filter(class_level=self.class_level).count(), 2)
+        self.assertEqual(Question.objects.filter(topic=self.topic).count(), 1)
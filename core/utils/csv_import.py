@@ -1,27 +1,97 @@
+import codecs
 import csv
 import io
+import logging
+import os
+import re
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import transaction
+from django.db.models import Max
 from django.core.exceptions import ValidationError
+from subjects.hierarchy import ImportHierarchy, name_key
 from subjects.models import Subject, ClassLevel, Topic
 from content.models import Question, AnswerChoice, StudyNote
+from content.question_pool import invalidate_question_pools
+from admin_panel.minhash import index_questions
+from progress.utils import reconcile_user_progress
+from subjects.topic_listing import invalidate_topic_listings
+from core.dashboard import invalidate_all_dashboards
 from core.models import CSVImportLog
 
+logger = logging.getLogger('Pentora')
+
+IMPORT_BATCH_SIZE = 500  # rows validated, resolved and inserted together
+READ_CHUNK_SIZE = 64 * 1024  # bytes read at a time while detecting the encoding
+# Tried in order; latin1 decodes any byte sequence, so it is the last resort
+CSV_ENCODINGS = ('utf-8-sig', 'cp1252', 'latin1')
+MAX_REPORTED_ROWS = 100  # errors and skipped rows kept for the result; the rest are only counted
+PREVIEW_SAMPLE_ROWS = 100  # rows returned for the import preview
+
+
+def detect_encoding(stream, encodings=CSV_ENCODINGS, chunk_size=READ_CHUNK_SIZE):
+    """
+    First of ``encodings`` that decodes the whole binary ``stream``.
+
+    The stream is read in chunks through one incremental decoder per
+    candidate, so memory does not grow with the file, and rewound afterwards.
+    """
+    decoders = {encoding: codecs.getincrementaldecoder(encoding)() for encoding in encodings}
+    while len(decoders) > 1:
+        chunk = stream.read(chunk_size)
+        for encoding, decoder in list(decoders.items()):
+            try:
+                decoder.decode(chunk, final=not chunk)
+            except UnicodeDecodeError:
+                del decoders[encoding]
+        if not chunk:
+            break
+    stream.seek(0)
+
+    for encoding in encodings:
+        if encoding in decoders:
+            return encoding
+    raise ValueError("Unable to read file. Please save your CSV file as UTF-8.")
+
+
+def store_upload(uploaded_file):
+    """
+    Save an upload to default storage for a background import; returns its name.
+
+    Default storage is the web machine's media directory, so the job must run
+    on the same machine (run_jobs starts next to gunicorn); the job streams the
+    copy back with ``default_storage.open``.
+    """
+    name = f"{settings.CSV_IMPORT_UPLOAD_DIR.strip('/')}/{uuid.uuid4().hex}.csv"
+    return default_storage.save(name, uploaded_file)
+
 
 class CSVImporter:
     """
     Utility class for importing educational content from CSV files
+
+    ``file_content`` is CSV text, bytes, or a binary file object such as an
+    upload; file objects are streamed row by row.
     """
 
-    def __init__(self, import_type, file_content, user=None, import_mode='strict'):
+    def __init__(self, import_type, file_content, user=None, import_mode='strict', progress_callback=None):
         self.import_type = import_type
         self.file_content = file_content
         self.user = user
         self.import_mode = import_mode  # 'strict' or 'partial'
+        self.progress_callback = progress_callback  # called as (message, percentage)
         self.log = None
-        self.errors = []
+        self.encoding = None
+        self.errors = []  # first MAX_REPORTED_ROWS errors
         self.successful_rows = 0
         self.failed_rows = 0
-        self.skipped_rows = []  # For partial import mode
+        self.total_rows = 0
+        self.skipped_rows = []  # For partial import mode; first MAX_REPORTED_ROWS skipped rows
+        self.skipped_count = 0
+        self._stream = None
+        self._stream_size = None
 
     def import_data(self):
         """Main import method"""
@@ -34,22 +104,22 @@ class CSVImporter:
                 status='processing'
             )
 
-            # Parse CSV
-            csv_data = self.parse_csv()
-            self.log.total_rows = len(csv_data)
-            self.log.save()
+            # Import questions only
+            if self.import_type != 'questions':
+                raise ValueError(f"Unsupported import type: {self.import_type}")
 
             # Add diagnostic information for questions import
-            if self.import_type == 'questions':
-                self._add_diagnostic_info()
+            self._add_diagnostic_info()
 
-            # Import questions only
-            if self.import_type == 'questions':
-                self.import_questions(csv_data)
-            else:
-                raise ValueError(f"Unsupported import type: {self.import_type}")
+            # Rows are streamed through validation and insertion in batches
+            rows = self.iter_rows()
+            try:
+                self.import_questions(rows)
+            finally:
+                rows.close()
 
             # Update log
+            self.log.total_rows = self.total_rows
             self.log.successful_rows = self.successful_rows
             self.log.failed_rows = self.failed_rows
 
@@ -60,10 +130,8 @@ class CSVImporter:
             else:
                 self.log.status = 'failed'
 
-            if self.errors:
-                self.log.error_log = '\n'.join(self.errors)
-
-            self.log.mark_completed()
+            # Row errors were logged as they happened; this writes any still buffered
+            self.log.mark_completed(self.log.status)
 
             return {
                 'success': True,
@@ -75,9 +143,8 @@ class CSVImporter:
 
         except Exception as e:
             if self.log:
-                self.log.status = 'failed'
                 self.log.add_error(str(e))
-                self.log.mark_completed()
+                self.log.mark_completed('failed')
 
             return {
                 'success': False,
@@ -90,44 +157,81 @@ class CSVImporter:
         # Get available subjects, levels, and topics
         subjects = list(Subject.objects.filter(is_active=True).values_list('name', flat=True))
         levels = list(ClassLevel.objects.filter(is_active=True).select_related('subject').values_list('name', 'subject__name'))
-        topics = list(Topic.objects.filter(is_active=True).select_related('class_level__subject').values_list('title', 'class_level__name', 'class_level__subject__name'))
+        # Only the first 10 topics are listed, so only those are loaded
+        active_topics = Topic.objects.filter(is_active=True)
+        topics = list(active_topics.values_list('title', 'class_level__name', 'class_level__subject__name')[:10])
+        topics_count = active_topics.count() if len(topics) == 10 else len(topics)
 
         diagnostic_info = f"""
 DIAGNOSTIC INFORMATION:
 Available Subjects: {', '.join(subjects) if subjects else 'None'}
 Available Class Levels: {', '.join([f'{level[0]} ({level[1]})' for level in levels]) if levels else 'None'}
-Available Topics: {', '.join([f'{topic[0]} ({topic[1]} - {topic[2]})' for topic in topics[:10]]) if topics else 'None'}
-{f'... and {len(topics) - 10} more topics' if len(topics) > 10 else ''}
+Available Topics: {', '.join([f'{topic[0]} ({topic[1]} - {topic[2]})' for topic in topics]) if topics else 'None'}
+{f'... and {topics_count - 10} more topics' if topics_count > 10 else ''}
 """
 
         if self.log:
-            self.log.add_error(diagnostic_info)
+            self.log.add_info(diagnostic_info.strip())
+
+    def iter_rows(self):
+        """Yield CSV rows as dicts, reading the file incrementally"""
+        content = self.file_content
+        if isinstance(content, str):
+            text = io.StringIO(content, newline='')
+        else:
+            if isinstance(content, bytes):
+                stream, size = io.BytesIO(content), len(content)
+            else:
+                stream, size = content, getattr(content, 'size', None)
+                if size is None:
+                    try:
+                        size = os.fstat(stream.fileno()).st_size
+                    except (AttributeError, OSError):
+                        pass  # Not backed by a file; progress is reported without a percentage
+            self.encoding = detect_encoding(stream)
+            self._stream, self._stream_size = stream, size
+            text = io.TextIOWrapper(stream, encoding=self.encoding, newline='')
+
+        try:
+            yield from csv.DictReader(text)
+        except csv.Error as e:
+            raise ValueError(f"Failed to parse CSV: {str(e)}")
+        finally:
+            if isinstance(text, io.TextIOWrapper) and not text.closed:
+                # Leave the caller's file open
+                text.detach()
 
     def parse_csv(self):
         """Parse CSV content"""
         try:
-            # Handle both string and bytes
-            if isinstance(self.file_content, bytes):
-                content = self.file_content.decode('utf-8')
-            else:
-                content = self.file_content
-
-            # Parse CSV
-            csv_reader = csv.DictReader(io.StringIO(content))
-            return list(csv_reader)
-
+            return list(self.iter_rows())
         except Exception as e:
             raise ValueError(f"Failed to parse CSV: {str(e)}")
 
+    def _read_fraction(self):
+        """Share of the file read so far, when it is known"""
+        if self._stream is None or not self._stream_size:
+            return None
+        try:
+            return min(self._stream.tell() / self._stream_size, 1)
+        except (OSError, ValueError):
+            return None
+
     def get_preview_data(self):
         """Get preview data for CSV import with graceful handling"""
         try:
-            csv_data = self.parse_csv()
+            # Count every row but keep only a sample, so large files preview in bounded memory
+            csv_data = []
+            total_rows = 0
+            for row in self.iter_rows():
+                if total_rows < PREVIEW_SAMPLE_ROWS:
+                    csv_data.append(row)
+                total_rows += 1
 
             preview_data = {
-                'total_rows': len(csv_data),
+                'total_rows': total_rows,
                 'headers': list(csv_data[0].keys()) if csv_data else [],
-                'sample_rows': csv_data,  # Show all rows for preview
+                'sample_rows': csv_data,
                 'validation_results': [],
                 'warnings': [],
                 'errors': []
@@ -231,14 +335,14 @@ Available Topics: {', '.join([f'{topic[0]} ({topic[1]} - {topic[2]})' for topic
             # Summary statistics
             error_count = sum(1 for result in preview_data['validation_results'] if result['status'] == 'error')
             warning_count = sum(1 for result in preview_data['validation_results'] if result['warnings'])
-            valid_rows = len(csv_data) - error_count
+            valid_rows = total_rows - error_count
 
             preview_data['summary'] = {
-                'total_rows': len(csv_data),
+                'total_rows': total_rows,
                 'rows_with_errors': error_count,
                 'rows_with_warnings': warning_count,
                 'valid_rows': valid_rows,
-                'estimated_success_rate': max(0, valid_rows / len(csv_data) * 100) if csv_data else 0
+                'estimated_success_rate': max(0, valid_rows / total_rows * 100) if total_rows else 0
             }
 
             return preview_data
@@ -246,216 +350,350 @@ Available Topics: {', '.join([f'{topic[0]} ({topic[1]} - {topic[2]})' for topic
         except Exception as e:
             raise ValueError(f"Failed to generate preview: {str(e)}")
 
-    def import_questions(self, csv_data):
-        """Optimized bulk import of questions from CSV with proper hierarchy validation"""
-        required_fields = ['subject_name', 'class_level_name', 'topic_title', 'question_text', 'question_type']
+    def import_questions(self, csv_rows):
+        """
+        Streaming bulk import of questions from CSV rows with proper hierarchy validation
 
-        print(f"🚀 Starting optimized bulk import of {len(csv_data)} questions...")
+        Rows are validated, their hierarchy resolved and their questions created
+        IMPORT_BATCH_SIZE at a time, so memory does not grow with the file.
+        """
+        logger.info("Starting streaming bulk import of questions")
 
-        # Pre-process and validate all data first
-        validated_data = []
-        subjects_cache = {}
-        class_levels_cache = {}
-        topics_cache = {}
+        hierarchy = ImportHierarchy()
+        touched_topic_ids = set()
+        batch = []
 
-        # Phase 1: Validate and prepare all data
-        for row_num, row in enumerate(csv_data, 1):
+        for row_num, row in enumerate(csv_rows, 1):
+            self.total_rows = row_num
             try:
-                # Validate required fields
-                missing_fields = [field for field in required_fields if not row.get(field, '').strip()]
-                if missing_fields:
-                    available_fields = list(row.keys())
-                    raise ValueError(f"Missing required fields: {', '.join(missing_fields)}. Available fields: {', '.join(available_fields)}")
+                batch.append(self._validate_question_row(row_num, row))
+            except Exception as e:
+                self._record_row_failure(row_num, e, dict(row))
 
-                # Validate question type and required fields
-                question_type = row.get('question_type', '').strip().lower()
-                valid_question_types = ['multiple_choice', 'fill_blank', 'true_false', 'short_answer']
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                self._import_batch(batch, hierarchy, touched_topic_ids)
+                batch = []
 
-                if not question_type:
-                    raise ValueError("Missing question type field")
-                elif question_type not in valid_question_types:
-                    # Handle common variations and provide helpful suggestions
-                    suggestions = {
-                        'mc': 'multiple_choice',
-                        'multiple': 'multiple_choice',
-                        'choice': 'multiple_choice',
-                        'mcq': 'multiple_choice',
-                        'fill': 'fill_blank',
-                        'blank': 'fill_blank',
-                        'tf': 'true_false',
-                        'boolean': 'true_false',
-                        'short': 'short_answer',
-                        'essay': 'short_answer',
-                        'text': 'short_answer'
-                    }
+        if batch:
+            self._import_batch(batch, hierarchy, touched_topic_ids)
 
-                    suggestion = suggestions.get(question_type, None)
-                    if suggestion:
-                        raise ValueError(f"Invalid question type: '{question_type}'. Did you mean '{suggestion}'? Valid types: {', '.join(valid_question_types)}")
-                    else:
-                        raise ValueError(f"Invalid question type: '{question_type}'. Must be one of: {', '.join(valid_question_types)}")
-
-                # Store validated row data
-                validated_data.append({
-                    'row_num': row_num,
-                    'subject_name': row['subject_name'].strip(),
-                    'class_level_name': row['class_level_name'].strip(),
-                    'topic_title': row['topic_title'].strip(),
-                    'question_text': row['question_text'].strip(),
-                    'question_type': question_type,
-                    'correct_answer': row.get('correct_answer', '').strip(),
-                    'explanation': row.get('explanation', '').strip(),
-                    'difficulty': row.get('difficulty', 'medium').lower(),
-                    'points': int(row.get('points', 1)),
-                    'time_limit': int(row.get('time_limit', 45)),
-                    'choice_a': row.get('choice_a', '').strip(),
-                    'choice_b': row.get('choice_b', '').strip(),
-                    'choice_c': row.get('choice_c', '').strip(),
-                    'choice_d': row.get('choice_d', '').strip(),
-                })
+        # bulk_create skips model signals, so refresh the quiz pools of touched topics
+        invalidate_question_pools(touched_topic_ids)
+        invalidate_topic_listings()
 
-            except Exception as e:
-                self.failed_rows += 1
-                error_msg = f"Row {row_num}: {str(e)}"
+        logger.info(f"Bulk import completed: {self.successful_rows} of {self.total_rows} questions created")
+
+        # Update log status and return results
+        if self.log:
+            if self.failed_rows == 0 and self.skipped_count == 0:
+                self.log.status = 'completed'
+                self.log.success_message = f"Successfully imported {self.successful_rows} questions"
+            else:
+                self.log.status = 'completed_with_errors'
                 if self.import_mode == 'partial':
-                    self.skipped_rows.append({
-                        'row_number': row_num,
-                        'error': str(e),
-                        'data': dict(row)
-                    })
-                    if self.log:
-                        self.log.add_warning(f"Skipped {error_msg}")
+                    self.log.success_message = f"Successfully imported {self.successful_rows} questions, skipped {self.skipped_count} with errors"
                 else:
-                    self.errors.append(error_msg)
-                    if self.log:
-                        self.log.add_error(error_msg)
+                    self.log.error_message = f"Imported {self.successful_rows} questions, {self.failed_rows} failed"
 
-        print(f"📋 Validated {len(validated_data)} questions, {self.failed_rows} failed validation")
+            self.log.successful_rows = self.successful_rows
+            self.log.failed_rows = self.failed_rows if self.import_mode == 'strict' else self.skipped_count
+            self.log.save()
 
-        # Phase 2: Bulk create hierarchy (subjects, class levels, topics)
-        if self.log:
-            self.log.add_info("Phase 2: Creating hierarchy (subjects, class levels, topics)")
-        self._bulk_create_hierarchy(validated_data, subjects_cache, class_levels_cache, topics_cache)
+        return {
+            'success': True,
+            'total_processed': self.successful_rows + self.failed_rows + self.skipped_count,
+            'successful_rows': self.successful_rows,
+            'failed_rows': self.failed_rows,
+            'skipped_rows': self.skipped_count,
+            'errors': self.errors,
+            'skipped_details': self.skipped_rows,
+            'import_mode': self.import_mode
+        }
 
-        # Phase 3: Bulk create questions and answer choices
-        if self.log:
-            self.log.add_info("Phase 3: Bulk creating questions and answer choices")
-        self._bulk_create_questions(validated_data, topics_cache)
+    def _validate_question_row(self, row_num, row):
+        """Validated, normalised data for one CSV row; raises ValueError for invalid rows"""
+        required_fields = ['subject_name', 'class_level_name', 'topic_title', 'question_text', 'question_type']
+
+        # Validate required fields
+        missing_fields = [field for field in required_fields if not row.get(field, '').strip()]
+        if missing_fields:
+            available_fields = list(row.keys())
+            raise ValueError(f"Missing required fields: {', '.join(missing_fields)}. Available fields: {', '.join(available_fields)}")
+
+        # Validate question type and required fields
+        question_type = row.get('question_type', '').strip().lower()
+        valid_question_types = ['multiple_choice', 'fill_blank', 'true_false', 'short_answer']
+
+        if not question_type:
+            raise ValueError("Missing question type field")
+        elif question_type not in valid_question_types:
+            # Handle common variations and provide helpful suggestions
+            suggestions = {
+                'mc': 'multiple_choice',
+                'multiple': 'multiple_choice',
+                'choice': 'multiple_choice',
+                'mcq': 'multiple_choice',
+                'fill': 'fill_blank',
+                'blank': 'fill_blank',
+                'tf': 'true_false',
+                'boolean': 'true_false',
+                'short': 'short_answer',
+                'essay': 'short_answer',
+                'text': 'short_answer'
+            }
+
+            suggestion = suggestions.get(question_type, None)
+            if suggestion:
+                raise ValueError(f"Invalid question type: '{question_type}'. Did you mean '{suggestion}'? Valid types: {', '.join(valid_question_types)}")
+            else:
+                raise ValueError(f"Invalid question type: '{question_type}'. Must be one of: {', '.join(valid_question_types)}")
+
+        return {
+            'row_num': row_num,
+            'subject_name': row['subject_name'].strip(),
+            'class_level_name': row['class_level_name'].strip(),
+            'topic_title': row['topic_title'].strip(),
+            'question_text': row['question_text'].strip(),
+            'question_type': question_type,
+            'correct_answer': row.get('correct_answer', '').strip(),
+            'explanation': row.get('explanation', '').strip(),
+            'difficulty': row.get('difficulty', 'medium').lower(),
+            'points': int(row.get('points', 1)),
+            'time_limit': int(row.get('time_limit', 45)),
+            'choice_a': row.get('choice_a', '').strip(),
+            'choice_b': row.get('choice_b', '').strip(),
+            'choice_c': row.get('choice_c', '').strip(),
+            'choice_d': row.get('choice_d', '').strip(),
+        }
+
+    def _record_row_failure(self, row_num, error, data):
+        """Count a rejected row, keeping the first MAX_REPORTED_ROWS for the result"""
+        self.failed_rows += 1
+        error_msg = f"Row {row_num}: {str(error)}"
+        if self.import_mode == 'partial':
+            self.skipped_count += 1
+            if len(self.skipped_rows) < MAX_REPORTED_ROWS:
+                self.skipped_rows.append({
+                    'row_number': row_num,
+                    'error': str(error),
+                    'data': data
+                })
+            if self.log:
+                self.log.add_warning(f"Skipped {error_msg}")
+        else:
+            if len(self.errors) < MAX_REPORTED_ROWS:
+                self.errors.append(error_msg)
+            if self.log:
+                self.log.add_error(error_msg)
+
+    def _import_batch(self, batch, hierarchy, touched_topic_ids):
+        """Resolve the hierarchy for a batch of validated rows and create its questions"""
+        if self.progress_callback:
+            fraction = self._read_fraction()
+            self.progress_callback(
+                f"Importing questions... {self.total_rows:,} rows read",
+                fraction * 100 if fraction is not None else None
+            )
 
-    def _bulk_create_hierarchy(self, validated_data, subjects_cache, class_levels_cache, topics_cache):
-        """Bulk create subjects, class levels, and topics"""
-        print("🏗️ Creating hierarchy (subjects, class levels, topics)...")
+        # Only rows whose topic has not been seen yet need the hierarchy resolved
+        unresolved = [data for data in batch if self._topic_key(data) not in hierarchy.topics]
+        if unresolved:
+            self._bulk_create_hierarchy(unresolved, hierarchy)
 
-        # Collect unique hierarchy items
-        unique_subjects = set()
-        unique_class_levels = set()
-        unique_topics = set()
+        touched_topic_ids.update(self._bulk_create_questions(batch, hierarchy.topics))
+
+    @staticmethod
+    def _topic_key(data):
+        """Hierarchy key of a validated row's topic"""
+        return (name_key(data['subject_name']), name_key(data['class_level_name']), name_key(data['topic_title']))
+
+    def _bulk_create_hierarchy(self, validated_data, hierarchy):
+        """
+        Resolve the subjects, class levels and topics named by validated rows, creating missing ones
+
+        Only names not already in ``hierarchy`` are looked up, one query per
+        level scoped to the parents the rows refer to; names are compared
+        with ``name_key`` on both sides.
+        """
+        logger.info("Resolving import hierarchy (subjects, class levels, topics)")
+
+        # Collect unique hierarchy items, keyed by name_key
+        subject_names = {}
+        class_level_names = {}
+        topic_titles = {}
 
         for data in validated_data:
-            unique_subjects.add(data['subject_name'])
-            unique_class_levels.add((data['subject_name'], data['class_level_name']))
-            unique_topics.add((data['subject_name'], data['class_level_name'], data['topic_title']))
+            topic_key = self._topic_key(data)
+            subject_names.setdefault(topic_key[0], data['subject_name'])
+            class_level_names.setdefault(topic_key[:2], data['class_level_name'])
+            topic_titles.setdefault(topic_key, data['topic_title'])
+
+        subjects_created = self._resolve_subjects(subject_names, hierarchy)
+        class_levels_created = self._resolve_class_levels(class_level_names, hierarchy)
+        topics_created = self._resolve_topics(topic_titles, hierarchy)
+
+        if topics_created:
+            # bulk_create skips signals, so refresh learners' topic totals and cached listings here
+            reconcile_user_progress(class_level_ids={topic.class_level_id for topic in topics_created})
+            invalidate_topic_listings()
+
+        if subjects_created or class_levels_created or topics_created:
+            invalidate_all_dashboards()
+
+    def _resolve_subjects(self, subject_names, hierarchy):
+        """Fill ``hierarchy.subjects`` for ``subject_names``; returns the subjects created"""
+        missing = {key: name for key, name in subject_names.items() if key not in hierarchy.subjects}
+        if not missing:
+            return []
+
+        # Subjects are few, and SQL cannot fold non-ASCII case on every
+        # database, so their names are all matched here
+        for subject_id, name in Subject.objects.values_list('id', 'name'):
+            key = name_key(name)
+            if key in missing:
+                hierarchy.subjects[key] = subject_id
 
-        # Bulk create subjects
-        existing_subjects = {s.name.lower(): s for s in Subject.objects.all()}
         subjects_to_create = []
-
-        for subject_name in unique_subjects:
-            if subject_name.lower() not in existing_subjects:
+        next_order = (Subject.objects.aggregate(max_order=Max('order'))['max_order'] or 0) + 1
+        for key, subject_name in missing.items():
+            if key not in hierarchy.subjects:
                 subjects_to_create.append(Subject(
                     name=subject_name,
                     description=f"Auto-created subject for {subject_name}",
                     icon='📚',
                     color='#3B82F6',
-                    order=len(existing_subjects) + len(subjects_to_create) + 1,
+                    order=next_order + len(subjects_to_create),
                     is_active=True
                 ))
 
         if subjects_to_create:
             Subject.objects.bulk_create(subjects_to_create)
-            print(f"✅ Created {len(subjects_to_create)} new subjects")
+            for subject in subjects_to_create:
+                hierarchy.subjects[name_key(subject.name)] = subject.pk
+            logger.info(f"Created {len(subjects_to_create)} new subjects")
             if self.log:
                 self.log.add_info(f"Created {len(subjects_to_create)} new subjects: {[s.name for s in subjects_to_create]}")
+        return subjects_to_create
+
+    def _resolve_class_levels(self, class_level_names, hierarchy):
+        """Fill ``hierarchy.class_levels`` for ``class_level_names``; returns the class levels created"""
+        missing = {key: name for key, name in class_level_names.items() if key not in hierarchy.class_levels}
+        if not missing:
+            return []
+
+        subject_keys = {hierarchy.subjects[subject_key]: subject_key for subject_key, _ in missing}
+        existing = ClassLevel.objects.filter(subject_id__in=subject_keys)
+        for class_level_id, subject_id, name in existing.values_list('id', 'subject_id', 'name'):
+            key = (subject_keys[subject_id], name_key(name))
+            if key in missing:
+                hierarchy.class_levels[key] = class_level_id
+
+        unresolved = [key for key in missing if key not in hierarchy.class_levels]
+        if not unresolved:
+            return []
+
+        # Levels without a number in their name go after the subject's highest level
+        next_level = {}
+        unnumbered = {hierarchy.subjects[subject_key] for subject_key, level_key in unresolved if not re.search(r'\d+', level_key)}
+        if unnumbered:
+            next_level = dict(
+                ClassLevel.objects.filter(subject_id__in=unnumbered)
+                .values('subject_id').annotate(max_level=Max('level_number')).values_list('subject_id', 'max_level')
+            )
 
-        # Refresh subjects cache
-        for subject in Subject.objects.all():
-            subjects_cache[subject.name.lower()] = subject
-
-        # Bulk create class levels
-        existing_class_levels = {(cl.subject.name.lower(), cl.name.lower()): cl for cl in ClassLevel.objects.select_related('subject')}
         class_levels_to_create = []
+        for subject_key, level_key in unresolved:
+            subject_id = hierarchy.subjects[subject_key]
+            class_level_name = missing[(subject_key, level_key)]
+
+            # Extract level number from name
+            level_match = re.search(r'\d+', class_level_name)
+            if level_match:
+                level_number = int(level_match.group())
+            else:
+                level_number = (next_level.get(subject_id) or 0) + 1
+                next_level[subject_id] = level_number
+
+            class_levels_to_create.append(ClassLevel(
+                subject_id=subject_id,
+                name=class_level_name,
+                level_number=level_number,
+                description=f"Auto-created class level for {class_level_name}",
+                pass_percentage=60,
+                is_active=True
+            ))
+
+        ClassLevel.objects.bulk_create(class_levels_to_create)
+        for key, class_level in zip(unresolved, class_levels_to_create):
+            hierarchy.class_levels[key] = class_level.pk
+        logger.info(f"Created {len(class_levels_to_create)} new class levels")
+        return class_levels_to_create
+
+    def _resolve_topics(self, topic_titles, hierarchy):
+        """Fill ``hierarchy.topics`` for ``topic_titles``; returns the topics created"""
+        missing = {key: title for key, title in topic_titles.items() if key not in hierarchy.topics}
+        if not missing:
+            return []
+
+        class_level_keys = {hierarchy.class_levels[key[:2]]: key[:2] for key in missing}
+        with transaction.atomic():
+            # Lock the class levels so concurrent imports take turns reading
+            # the existing topics and assigning the next orders
+            list(ClassLevel.objects.select_for_update().filter(pk__in=class_level_keys).order_by('pk').values_list('pk'))
+
+            existing = Topic.objects.filter(class_level_id__in=class_level_keys)
+            for topic_id, class_level_id, title in existing.values_list('id', 'class_level_id', 'title'):
+                key = class_level_keys[class_level_id] + (name_key(title),)
+                if key in missing:
+                    hierarchy.topics[key] = topic_id
+
+            unresolved = [key for key in missing if key not in hierarchy.topics]
+            if unresolved:
+                return self._create_topics(unresolved, missing, hierarchy)
+        return []
+
+    def _create_topics(self, unresolved, titles, hierarchy):
+        """Create the topics for ``unresolved`` keys; called with their class levels locked"""
+        # New topics go after the highest order in their class level
+        class_level_ids = {hierarchy.class_levels[key[:2]] for key in unresolved}
+        next_order = dict(
+            Topic.objects.filter(class_level_id__in=class_level_ids)
+            .values('class_level_id').annotate(max_order=Max('order')).values_list('class_level_id', 'max_order')
+        )
 
-        for subject_name, class_level_name in unique_class_levels:
-            key = (subject_name.lower(), class_level_name.lower())
-            if key not in existing_class_levels:
-                subject = subjects_cache[subject_name.lower()]
-
-                # Extract level number from name
-                import re
-                level_match = re.search(r'\d+', class_level_name)
-                level_number = int(level_match.group()) if level_match else ClassLevel.objects.filter(subject=subject).count() + 1
-
-                class_levels_to_create.append(ClassLevel(
-                    subject=subject,
-                    name=class_level_name,
-                    level_number=level_number,
-                    description=f"Auto-created class level for {class_level_name}",
-                    pass_percentage=60,
-                    is_active=True
-                ))
-
-        if class_levels_to_create:
-            ClassLevel.objects.bulk_create(class_levels_to_create)
-            print(f"✅ Created {len(class_levels_to_create)} new class levels")
-
-        # Refresh class levels cache
-        for class_level in ClassLevel.objects.select_related('subject'):
-            key = (class_level.subject.name.lower(), class_level.name.lower())
-            class_levels_cache[key] = class_level
-
-        # Bulk create topics
-        existing_topics = {(t.class_level.subject.name.lower(), t.class_level.name.lower(), t.title.lower()): t
-                          for t in Topic.objects.select_related('class_level__subject')}
         topics_to_create = []
-
-        for subject_name, class_level_name, topic_title in unique_topics:
-            key = (subject_name.lower(), class_level_name.lower(), topic_title.lower())
-            if key not in existing_topics:
-                class_level = class_levels_cache[(subject_name.lower(), class_level_name.lower())]
-
-                topics_to_create.append(Topic(
-                    class_level=class_level,
-                    title=topic_title,
-                    description=f"Auto-created topic for {topic_title}",
-                    order=Topic.objects.filter(class_level=class_level).count() + 1,
-                    difficulty_level='beginner',
-                    estimated_duration=30,
-                    is_active=True
-                ))
-
-        if topics_to_create:
-            Topic.objects.bulk_create(topics_to_create)
-            print(f"✅ Created {len(topics_to_create)} new topics")
-
-        # Refresh topics cache
-        for topic in Topic.objects.select_related('class_level__subject'):
-            key = (topic.class_level.subject.name.lower(), topic.class_level.name.lower(), topic.title.lower())
-            topics_cache[key] = topic
-    def _bulk_create_questions(self, validated_data, topics_cache):
-        """Bulk create questions and answer choices"""
-        print(f"📝 Bulk creating {len(validated_data)} questions...")
-
+        for key in unresolved:
+            class_level_id = hierarchy.class_levels[key[:2]]
+            order = (next_order.get(class_level_id) or 0) + 1
+            next_order[class_level_id] = order
+
+            topics_to_create.append(Topic(
+                class_level_id=class_level_id,
+                title=titles[key],
+                description=f"Auto-created topic for {titles[key]}",
+                order=order,
+                difficulty_level='beginner',
+                estimated_duration=30,
+                is_active=True
+            ))
+
+        Topic.objects.bulk_create(topics_to_create)
+        for key, topic in zip(unresolved, topics_to_create):
+            hierarchy.topics[key] = topic.pk
+        logger.info(f"Created {len(topics_to_create)} new topics")
+        return topics_to_create
+
+    def _bulk_create_questions(self, validated_data, topic_ids):
+        """Bulk create questions and answer choices; returns the ids of topics that gained questions"""
         questions_to_create = []
-        answer_choices_to_create = []
 
         # Prepare questions for bulk creation
         for data in validated_data:
             try:
-                # Get topic from cache
-                topic_key = (data['subject_name'].lower(), data['class_level_name'].lower(), data['topic_title'].lower())
-                topic = topics_cache.get(topic_key)
+                # Get topic from the resolved hierarchy
+                topic_id = topic_ids.get(self._topic_key(data))
 
-                if not topic:
+                if not topic_id:
                     raise ValueError(f"Topic not found: {data['topic_title']}")
 
                 # Validate question type specific requirements
@@ -480,7 +718,7 @@ Available Topics: {', '.join([f'{topic[0]} ({topic[1]} - {topic[2]})' for topic
 
                 # Create question object (not saved yet)
                 question = Question(
-                    topic=topic,
+                    topic_id=topic_id,
                     question_text=data['question_text'],
                     question_type=data['question_type'],
                     correct_answer=data['correct_answer'],
@@ -494,110 +732,62 @@ Available Topics: {', '.join([f'{topic[0]} ({topic[1]} - {topic[2]})' for topic
                 questions_to_create.append((question, data))
 
             except Exception as e:
-                self.failed_rows += 1
-                error_msg = f"Row {data['row_num']}: {str(e)}"
-                if self.import_mode == 'partial':
-                    self.skipped_rows.append({
-                        'row_number': data['row_num'],
-                        'error': str(e),
-                        'data': data
-                    })
-                    if self.log:
-                        self.log.add_warning(f"Skipped {error_msg}")
-                else:
-                    self.errors.append(error_msg)
-                    if self.log:
-                        self.log.add_error(error_msg)
+                self._record_row_failure(data['row_num'], e, data)
 
-        # Bulk create questions in chunks for better performance
-        chunk_size = 500  # Process 500 questions at a time
-        total_chunks = (len(questions_to_create) + chunk_size - 1) // chunk_size
+        if not questions_to_create:
+            return set()
 
-        for chunk_num in range(total_chunks):
-            start_idx = chunk_num * chunk_size
-            end_idx = min(start_idx + chunk_size, len(questions_to_create))
-            chunk = questions_to_create[start_idx:end_idx]
-
-            print(f"📦 Processing chunk {chunk_num + 1}/{total_chunks} ({len(chunk)} questions)")
-
-            try:
-                with transaction.atomic():
-                    # Extract just the question objects for bulk_create
-                    questions_only = [item[0] for item in chunk]
-                    created_questions = Question.objects.bulk_create(questions_only)
-
-                    # Create answer choices for multiple choice questions
-                    choices_batch = []
-                    for i, (question, data) in enumerate(chunk):
-                        created_question = created_questions[i]
-
-                        if data['question_type'] == 'multiple_choice':
-                            choices = [
-                                ('a', data['choice_a']),
-                                ('b', data['choice_b']),
-                                ('c', data['choice_c']),
-                                ('d', data['choice_d'])
-                            ]
-
-                            for choice_value, choice_text in choices:
-                                if choice_text:
-                                    choices_batch.append(AnswerChoice(
-                                        question=created_question,
-                                        choice_text=choice_text,
-                                        is_correct=(choice_value == data['correct_answer'].lower()),
-                                        order=ord(choice_value) - ord('a')
-                                    ))
-
-                    # Bulk create answer choices
-                    if choices_batch:
-                        AnswerChoice.objects.bulk_create(choices_batch)
-
-                    self.successful_rows += len(chunk)
-                    print(f"✅ Successfully created {len(chunk)} questions with answer choices")
-
-                    if self.log:
-                        self.log.add_info(f"Chunk {chunk_num + 1}/{total_chunks}: Created {len(chunk)} questions")
-
-            except Exception as e:
-                # Handle chunk failure
-                print(f"❌ Error creating chunk {chunk_num + 1}: {str(e)}")
+        logger.info(f"Creating {len(questions_to_create)} questions")
+        try:
+            with transaction.atomic():
+                # Extract just the question objects for bulk_create
+                questions_only = [item[0] for item in questions_to_create]
+                created_questions = Question.objects.bulk_create(questions_only)
+                # bulk_create skips signals, so index the new questions for duplicate detection
+                index_questions(created_questions)
+
+                # Create answer choices for multiple choice questions
+                choices_batch = []
+                for created_question, (question, data) in zip(created_questions, questions_to_create):
+                    if data['question_type'] == 'multiple_choice':
+                        choices = [
+                            ('a', data['choice_a']),
+                            ('b', data['choice_b']),
+                            ('c', data['choice_c']),
+                            ('d', data['choice_d'])
+                        ]
+
+                        for choice_value, choice_text in choices:
+                            if choice_text:
+                                choices_batch.append(AnswerChoice(
+                                    question=created_question,
+                                    choice_text=choice_text,
+                                    is_correct=(choice_value == data['correct_answer'].lower()),
+                                    order=ord(choice_value) - ord('a')
+                                ))
+
+                # Bulk create answer choices
+                if choices_batch:
+                    AnswerChoice.objects.bulk_create(choices_batch)
+
+                self.successful_rows += len(questions_to_create)
                 if self.log:
-                    self.log.add_error(f"Chunk {chunk_num + 1} failed: {str(e)}")
-
-                # Add failed questions to error tracking
-                for question, data in chunk:
-                    self.failed_rows += 1
-                    error_msg = f"Row {data['row_num']}: Chunk creation failed - {str(e)}"
-                    self.errors.append(error_msg)
-
-        print(f"🎉 Bulk import completed! {self.successful_rows} questions created successfully")
+                    self.log.add_info(f"Rows up to {self.total_rows}: Created {len(questions_to_create)} questions")
 
-        # Update log status and return results
-        if self.log:
-            if self.failed_rows == 0 and len(self.skipped_rows) == 0:
-                self.log.status = 'completed'
-                self.log.success_message = f"Successfully imported {self.successful_rows} questions"
-            else:
-                self.log.status = 'completed_with_errors'
-                if self.import_mode == 'partial':
-                    self.log.success_message = f"Successfully imported {self.successful_rows} questions, skipped {len(self.skipped_rows)} with errors"
-                else:
-                    self.log.error_message = f"Imported {self.successful_rows} questions, {self.failed_rows} failed"
+        except Exception as e:
+            # Handle batch failure
+            logger.error(f"Error creating questions: {e}")
+            if self.log:
+                self.log.add_error(f"Batch ending at row {self.total_rows} failed: {str(e)}")
 
-            self.log.successful_rows = self.successful_rows
-            self.log.failed_rows = self.failed_rows if self.import_mode == 'strict' else len(self.skipped_rows)
-            self.log.save()
+            # Add failed questions to error tracking
+            self.failed_rows += len(questions_to_create)
+            for question, data in questions_to_create:
+                if len(self.errors) < MAX_REPORTED_ROWS:
+                    self.errors.append(f"Row {data['row_num']}: Batch creation failed - {str(e)}")
+            return set()
 
-        return {
-            'success': True,
-            'total_processed': self.successful_rows + self.failed_rows + len(self.skipped_rows),
-            'successful_rows': self.successful_rows,
-            'failed_rows': self.failed_rows,
-            'skipped_rows': len(self.skipped_rows),
-            'errors': self.errors,
-            'skipped_details': self.skipped_rows,
-            'import_mode': self.import_mode
-        }
+        return {question.topic_id for question, data in questions_to_create}
 
     def import_study_notes(self, csv_data):
         """Import study notes from CSV with proper hierarchy validation"""
@@ -0,0 +1,133 @@
+"""
+Process-local snapshots for singleton settings models.
+
+Settings rows (SiteSettings, BillingSettings) are read on every request by
+middleware, context processors and template helpers but change rarely. Each
+process keeps the row's field values in memory together with a version stamp
+stored in the shared cache:
+
+* within ``SETTINGS_SNAPSHOT_TTL`` seconds the snapshot is used as-is (no
+  queries, no cache lookups);
+* after that the version stamp is re-read from the cache and the row is only
+  reloaded from the database when the stamp changed;
+* saving or deleting the row clears the local snapshot and writes a new stamp
+  once the transaction commits, so other workers pick up the change on their
+  next check;
+* a row reloaded inside a transaction is only kept once that transaction
+  commits, so values a rolled back transaction wrote are never cached.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+VERSION_KEY = 'settings_snapshot_version_{label}'
+DEFAULT_TTL = 30  # seconds between version checks
+
+
+class SettingsSnapshot:
+    """
+    Cached copy of a singleton settings row.
+
+    ``loader`` fetches (or creates) the row from the database. ``get()``
+    returns a new model instance built from the cached values on every call,
+    so callers may modify and save it without affecting other requests.
+    """
+
+    def __init__(self, model, loader):
+        self.model = model
+        self.loader = loader
+        self.version_key = VERSION_KEY.format(label=model._meta.label_lower)
+
+        self._lock = threading.Lock()
+        self._field_names = None
+        self._values = None
+        self._version = None
+        self._checked_at = 0.0
+
+        self.hits = 0
+        self.reloads = 0
+        self.invalidations = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'SETTINGS_SNAPSHOT_TTL', DEFAULT_TTL)
+
+    def get(self):
+        """Return the settings instance, hitting the database only when stale"""
+        values = self._values
+        now = time.monotonic()
+
+        if values is not None and now - self._checked_at < self.ttl:
+            self.hits += 1
+            return self._build(values)
+
+        version = cache.get(self.version_key)
+        if values is not None and version is not None and version == self._version:
+            self._checked_at = now
+            self.hits += 1
+            return self._build(values)
+
+        return self._reload(version)
+
+    def _reload(self, version):
+        if version is None:
+            cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = cache.get(self.version_key)
+
+        instance = self.loader()
+        # Counted after loading, as the loader may create (and so invalidate) the row
+        invalidations = self.invalidations
+        field_names = [field.attname for field in self.model._meta.concrete_fields]
+        values = tuple(getattr(instance, name) for name in field_names)
+
+        def store():
+            with self._lock:
+                if self.invalidations != invalidations:
+                    return  # Saved again since it was read
+                self._field_names = field_names
+                self._values = values
+                self._version = version
+                self._checked_at = time.monotonic()
+                self.reloads += 1
+
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # The row may hold this transaction's uncommitted writes
+            transaction.on_commit(store)
+        else:
+            store()
+
+        return instance
+
+    def _build(self, values):
+        return self.model.from_db(DEFAULT_DB_ALIAS, self._field_names, values)
+
+    def invalidate(self):
+        """Drop the local snapshot now and publish a new version after commit"""
+        with self._lock:
+            self._values = None
+            self._version = None
+            self.invalidations += 1
+
+        transaction.on_commit(self._publish_version)
+
+    def _publish_version(self):
+        cache.set(self.version_key, uuid.uuid4().hex, None)
+
+    def clear(self):
+        """Forget the local snapshot without touching the shared version"""
+        with self._lock:
+            self._values = None
+            self._version = None
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'reloads': self.reloads,
+            'invalidations': self.invalidations,
+            'cached': self._values is not None,
+        }
@@ -9,7 +9,7 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt, requires_csrf_token
 from django.utils.decorators import method_decorator
 from subjects.models import Subject, ClassLevel, Topic
-from progress.models import UserProgress
+from .dashboard import get_dashboard_data
 from .models import HeroSection, SiteStatistic, UserFeedback
 from .seo import SEOManager, MetaTagsHelper
 import logging
@@ -79,86 +79,10 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             context['class_levels'] = user.CLASS_LEVEL_CHOICES
             return context
 
-        # Get user's current progress
-        from progress.models import UserProgress, TopicProgress
-        from subjects.models import ClassLevel, Subject
-
-        # Get current grade subjects with detailed progress
-        from subjects.models import Topic
-        from django.urls import reverse
-
-        current_grade_subjects = []
-        for subject in Subject.objects.filter(
-            classlevels__level_number=user.current_class_level,
-            is_active=True
-        ).distinct().order_by('order'):
-            try:
-                class_level = ClassLevel.objects.get(
-                    subject=subject,
-                    level_number=user.current_class_level
-                )
-
-                # Get or create progress for this subject
-                progress, created = UserProgress.objects.get_or_create(
-                    user=user,
-                    class_level=class_level,
-                    defaults={'is_started': False}
-                )
-                if created or progress.total_topics == 0:
-                    progress.update_progress()
-
-                # Get topics with progress
-                topics = Topic.objects.filter(
-                    class_level=class_level,
-                    is_active=True
-                ).order_by('order')
-
-                # Find next incomplete topic
-                next_topic = None
-                for topic in topics:
-                    try:
-                        topic_progress = TopicProgress.objects.get(
-                            user=user,
-                            topic=topic
-                        )
-                        if not topic_progress.is_completed:
-                            next_topic = topic
-                            break
-                    except TopicProgress.DoesNotExist:
-                        next_topic = topic
-                        break
-
-                # Calculate completion stats
-                completed_topics = TopicProgress.objects.filter(
-                    user=user,
-                    topic__class_level=class_level,
-                    is_completed=True
-                ).count()
-
-                current_grade_subjects.append({
-                    'subject': subject,
-                    'class_level': class_level,
-                    'progress': progress,
-                    'topics_count': topics.count(),
-                    'completed_topics': completed_topics,
-                    'completion_percentage': (completed_topics / topics.count() * 100) if topics.count() > 0 else 0,
-                    'next_topic': next_topic,
-                    'next_topic_url': reverse('subjects:topic_detail', args=[
-                        subject.id, class_level.id, next_topic.id
-                    ]) if next_topic else None,
-                    'is_completed': progress.is_completed if progress else False
-                })
-            except ClassLevel.DoesNotExist:
-                continue
-
-        # Get recent activity (last 5 topics worked on)
-        recent_activity = TopicProgress.objects.filter(
-            user=user,
-            is_started=True,
-            topic__class_level__level_number=user.current_class_level
-        ).select_related(
-            'topic__class_level__subject'
-        ).order_by('-updated_at')[:5]
+        # Subjects, progress and recent activity for the current grade
+        dashboard_data = get_dashboard_data(user, user.current_class_level)
+        current_grade_subjects = dashboard_data['current_grade_subjects']
+        recent_activity = dashboard_data['recent_activity']
 
         # Calculate overall stats for current grade
         total_subjects = len(current_grade_subjects)
@@ -13,6 +13,10 @@ python manage.py collectstatic --noinput
 
 echo "✅ Deployment setup completed!"
 
+# Queued background jobs run on this machine, next to the web server
+echo "⚙️ Starting background job worker..."
+python manage.py run_jobs --workers 1 &
+
 # Start the application
 echo "🌟 Starting Gunicorn server..."
 exec gunicorn pentora_platform.wsgi:application \
@@ -372,6 +372,36 @@ QUIZ_QUESTIONS_PER_TOPIC = 10
 TEST_QUESTIONS_PER_TOPIC = 20
 EXAM_QUESTIONS_PER_LEVEL = 30
 
+# Analytics ingestion buffer (see analytics/buffer.py)
+ANALYTICS_BUFFER_ENABLED = config('ANALYTICS_BUFFER_ENABLED', default=True, cast=bool)
+ANALYTICS_BUFFER_MAX_EVENTS = config('ANALYTICS_BUFFER_MAX_EVENTS', default=10000, cast=int)
+ANALYTICS_BUFFER_BATCH_SIZE = config('ANALYTICS_BUFFER_BATCH_SIZE', default=500, cast=int)
+ANALYTICS_BUFFER_FLUSH_INTERVAL = config('ANALYTICS_BUFFER_FLUSH_INTERVAL', default=5.0, cast=float)
+
+# Raw analytics retention (see analytics/retention.py). Archives are the only
+# copy of pruned rows, so the directory must be persistent storage (e.g. a
+# mounted Fly volume); archive_analytics refuses to prune while it is unset
+ANALYTICS_RETENTION_DAYS = config('ANALYTICS_RETENTION_DAYS', default=90, cast=int)
+ANALYTICS_ARCHIVE_DIR = config('ANALYTICS_ARCHIVE_DIR', default='')
+ANALYTICS_ARCHIVE_BATCH_SIZE = config('ANALYTICS_ARCHIVE_BATCH_SIZE', default=5000, cast=int)
+
+# Seconds a worker trusts its SiteSettings/BillingSettings snapshot before
+# re-checking the shared version stamp (see core/utils/settings_snapshot.py)
+SETTINGS_SNAPSHOT_TTL = config('SETTINGS_SNAPSHOT_TTL', default=30, cast=int)
+
+# Background jobs (see core/jobs.py); eager mode runs jobs inline on submit
+BACKGROUND_JOBS_EAGER = config('BACKGROUND_JOBS_EAGER', default=False, cast=bool)
+BACKGROUND_JOBS_WORKERS = config('BACKGROUND_JOBS_WORKERS', default=2, cast=int)
+BACKGROUND_JOBS_STALE_SECONDS = config('BACKGROUND_JOBS_STALE_SECONDS', default=600, cast=int)
+# Seconds since a worker's last heartbeat before the admin reports that no worker is running
+BACKGROUND_JOBS_WORKER_TIMEOUT = config('BACKGROUND_JOBS_WORKER_TIMEOUT', default=60, cast=int)
+
+# Question CSV imports are streamed from a copy of the upload kept in default
+# storage (see core/utils/csv_import.py); the directory is relative to that
+# storage, which is local to the web machine, so jobs run on the same machine
+CSV_IMPORT_MAX_UPLOAD_MB = config('CSV_IMPORT_MAX_UPLOAD_MB', default=100, cast=int)
+CSV_IMPORT_UPLOAD_DIR = config('CSV_IMPORT_UPLOAD_DIR', default='imports/csv')
+
 # ============================================================================
 # PERFORMANCE AND OPTIMIZATION SETTINGS
 # ============================================================================
@@ -403,7 +433,20 @@ if not DEBUG:
                 'MAX_ENTRIES': 1000,  # Limit memory usage
                 'CULL_FREQUENCY': 3,
             }
-        }
+        },
+        # Version stamps that every process must agree on (the web server and
+        # the run_jobs processes each have their own LocMem "default"); the
+        # table is created by core migration 0008
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'pentora_shared_cache',
+            'TIMEOUT': None,
+            'OPTIONS': {
+                # Stamps never expire, and culling one would let stale entries
+                # cached under an older version be served again
+                'MAX_ENTRIES': 1000000,
+            },
+        },
     }
 
     # Static file compression is handled by WhiteNoise in production
@@ -476,7 +519,12 @@ if DEBUG:
         'default': {
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
             'LOCATION': 'unique-snowflake',
-        }
+        },
+        # Same store as "default": a single development process needs no sharing
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        },
     }
 
 # File upload settings
@@ -0,0 +1,85 @@
+"""
+Per-user daily study activity index.
+
+Loads one row per active day from StudySession with a single grouped query
+and answers streak and weekly-activity questions in memory.
+"""
+
+from datetime import timedelta
+
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import StudySession
+
+# Streaks are counted up to a year back
+MAX_STREAK_DAYS = 366
+
+
+class DailyActivityIndex:
+    """
+    Days on which a user had study sessions.
+
+    ``days`` maps each active date to ``{'sessions': count, 'first_started_at': datetime}``.
+    """
+
+    def __init__(self, days, today):
+        self.days = days
+        self.today = today
+
+    @classmethod
+    def for_user(cls, user, today=None, max_days=MAX_STREAK_DAYS):
+        """Load the last ``max_days`` days of activity in one query"""
+        today = today or timezone.now().date()
+        since = timezone.now() - timedelta(days=max_days + 1)
+
+        rows = (
+            StudySession.objects
+            .filter(user=user, started_at__gte=since)
+            .order_by()
+            .values('started_at__date')
+            .annotate(sessions=Count('id'), first_started_at=Min('started_at'))
+        )
+        days = {
+            row['started_at__date']: {
+                'sessions': row['sessions'],
+                'first_started_at': row['first_started_at'],
+            }
+            for row in rows
+        }
+        return cls(days, today)
+
+    def studied_on(self, date):
+        return date in self.days
+
+    def current_streak(self, limit=MAX_STREAK_DAYS):
+        """Consecutive active days ending today"""
+        streak = 0
+        current_date = self.today
+        while current_date in self.days and streak < limit:
+            streak += 1
+            current_date -= timedelta(days=1)
+        return streak
+
+    def week_activity(self):
+        """Activity for the last 7 days, oldest first"""
+        week = []
+        for offset in range(6, -1, -1):
+            date = self.today - timedelta(days=offset)
+            week.append({
+                'date': date,
+                'studied': date in self.days,
+                'partial': False  # Could be enhanced to show partial study days
+            })
+        return week
+
+    def active_days_since(self, date):
+        """Number of active days from ``date`` up to today"""
+        return sum(1 for day in self.days if date <= day <= self.today)
+
+    def first_session_since(self, date):
+        """Start time of the earliest session on or after ``date``"""
+        active = [day for day in self.days if date <= day <= self.today]
+        if not active:
+            return None
+        return self.days[min(active)]['first_started_at']
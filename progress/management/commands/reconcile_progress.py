@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from progress.utils import reconcile_user_progress
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Reconcile incremental UserProgress counters with TopicProgress for all users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of users reconciled per batch',
+        )
+        parser.add_argument(
+            '--user-id',
+            type=str,
+            help='Reconcile progress for a specific user ID',
+        )
+
+    def handle(self, *args, **options):
+        if options['user_id']:
+            updated = reconcile_user_progress(user_ids=[options['user_id']])
+            self.stdout.write(self.style.SUCCESS(f'Reconciled progress for user {options["user_id"]}: {updated} record(s) updated'))
+            return
+
+        batch_size = options['batch_size']
+        user_ids = list(User.objects.filter(progress__isnull=False).distinct().values_list('id', flat=True))
+        total_updated = 0
+
+        self.stdout.write(f'Reconciling progress for {len(user_ids)} users in batches of {batch_size}...')
+
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            updated = reconcile_user_progress(user_ids=batch)
+            total_updated += updated
+            self.stdout.write(f'  - Users {start + 1}-{start + len(batch)}: {updated} record(s) updated')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully reconciled progress: {total_updated} record(s) updated'))
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Value, When
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
@@ -54,23 +56,30 @@ class UserProgress(models.Model):
 
     def update_progress(self):
         """Update progress based on completed topics"""
-        from subjects.models import Topic
+        self.recompute()
 
-        # Get all topics for this class level
-        all_topics = Topic.objects.filter(class_level=self.class_level, is_active=True)
-        self.total_topics = all_topics.count()
+    def recompute(self):
+        """
+        Recount total and completed topics with a single aggregate query.
 
-        # Count completed topics
-        completed_topics = 0
-        for topic in all_topics:
-            if TopicProgress.objects.filter(
-                user=self.user,
-                topic=topic,
-                is_completed=True
-            ).exists():
-                completed_topics += 1
+        Day-to-day changes are applied incrementally by
+        ``apply_topic_completion``; this is the repair path for new records
+        and for reconciling drifted counters.
+        """
+        from subjects.models import Topic
 
-        self.topics_completed = completed_topics
+        completed_progress = TopicProgress.objects.filter(
+            topic=OuterRef('pk'),
+            user=self.user,
+            is_completed=True
+        )
+        counts = Topic.objects.filter(class_level=self.class_level, is_active=True).aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(Exists(completed_progress)))
+        )
+
+        self.total_topics = counts['total']
+        self.topics_completed = counts['completed']
 
         # Check if level is completed
         if self.topics_completed == self.total_topics and self.total_topics > 0:
@@ -80,6 +89,46 @@ class UserProgress(models.Model):
 
         self.save()
 
+    @classmethod
+    def apply_topic_completion(cls, user_id, class_level_id, delta):
+        """
+        Apply a +1/-1 topic completion delta to a user's class level progress.
+
+        Uses one UPDATE with F-expressions, so concurrent submissions do not
+        overwrite each other. A missing progress record is created and
+        recomputed instead. A level that drops below all of its topics is no
+        longer completed, unless its final exam was passed.
+        """
+        now = timezone.now()
+        reaches_total = Q(total_topics__gt=0, topics_completed__gte=F('total_topics') - delta)
+        falls_below = Q(topics_completed__lt=F('total_topics') - delta, passed=False)
+
+        updated = cls.objects.filter(user_id=user_id, class_level_id=class_level_id).update(
+            topics_completed=Greatest(F('topics_completed') + delta, 0),
+            is_completed=Case(
+                When(reaches_total, then=Value(True)),
+                When(falls_below, then=Value(False)),
+                default=F('is_completed')
+            ),
+            completed_at=Case(
+                When(reaches_total & Q(completed_at__isnull=True), then=Value(now)),
+                When(falls_below, then=Value(None)),
+                default=F('completed_at')
+            ),
+            updated_at=now
+        )
+
+        if not updated:
+            progress, _ = cls.objects.get_or_create(
+                user_id=user_id,
+                class_level_id=class_level_id,
+                defaults={
+                    'is_started': True,
+                    'started_at': now
+                }
+            )
+            progress.recompute()
+
 
 class TopicProgress(models.Model):
     """
@@ -121,6 +170,41 @@ class TopicProgress(models.Model):
     def __str__(self):
         return f"{self.user.full_name} - {self.topic.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored completion state so save() can detect transitions
+        instance._stored_is_completed = instance.__dict__.get('is_completed')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'is_completed' in fields:
+            # The reloaded value is what is stored now
+            self._stored_is_completed = self.is_completed
+
+    def save(self, *args, **kwargs):
+        stored_is_completed = getattr(self, '_stored_is_completed', False)
+        super().save(*args, **kwargs)
+
+        # Inactive topics are not counted by UserProgress.recompute() either
+        if stored_is_completed is not None and self.is_completed != stored_is_completed and self.topic.is_active:
+            UserProgress.apply_topic_completion(
+                self.user_id,
+                self.topic.class_level_id,
+                1 if self.is_completed else -1
+            )
+        self._stored_is_completed = self.is_completed
+
+    def delete(self, *args, **kwargs):
+        was_counted = self.is_completed and self.topic.is_active
+        class_level_id = self.topic.class_level_id
+        result = super().delete(*args, **kwargs)
+
+        if was_counted:
+            UserProgress.apply_topic_completion(self.user_id, class_level_id, -1)
+        return result
+
     @property
     def completion_percentage(self):
         """Calculate completion percentage based on completed activities"""
@@ -168,24 +252,9 @@ class TopicProgress(models.Model):
             self.is_started = True
             self.started_at = timezone.now()
 
+        # Class level progress is updated incrementally by save() on completion changes
         self.save()
 
-        # Update class level progress
-        try:
-            class_progress = UserProgress.objects.get(
-                user=self.user,
-                class_level=self.topic.class_level
-            )
-            class_progress.update_progress()
-        except UserProgress.DoesNotExist:
-            # Create class progress if it doesn't exist
-            UserProgress.objects.create(
-                user=self.user,
-                class_level=self.topic.class_level,
-                is_started=True,
-                started_at=timezone.now()
-            )
-
     def update_test_score(self, score):
         """Update best test score and check completion"""
         if score > self.best_test_score:
@@ -207,24 +276,9 @@ class TopicProgress(models.Model):
             if not self.completed_at:
                 self.completed_at = timezone.now()
 
+        # Class level progress is updated incrementally by save() on completion changes
         self.save()
 
-        # Update class level progress
-        try:
-            class_progress = UserProgress.objects.get(
-                user=self.user,
-                class_level=self.topic.class_level
-            )
-            class_progress.update_progress()
-        except UserProgress.DoesNotExist:
-            # Create class progress if it doesn't exist
-            UserProgress.objects.create(
-                user=self.user,
-                class_level=self.topic.class_level,
-                is_started=True,
-                started_at=timezone.now()
-            )
-
     def check_completion_requirements(self):
         """Check if all requirements are met for topic completion"""
         passing_score = 60
@@ -0,0 +1,16 @@
+"""
+Signal handlers for the progress app
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from subjects.models import Topic
+from .utils import reconcile_user_progress
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def reconcile_progress_for_topic(sender, instance, **kwargs):
+    """Adding, removing or (de)activating a topic changes every learner's totals"""
+    reconcile_user_progress(class_level_ids=[instance.class_level_id])
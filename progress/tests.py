@@ -1,3 +1,147 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from subjects.models import Subject, ClassLevel, Topic
+from .activity import DailyActivityIndex
+from .models import UserProgress, TopicProgress, StudySession
+
+
+class IncrementalProgressTestCase(TestCase):
+    """Test cases for incremental UserProgress counters"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='learner@test.com', password='testpass123')
+        subject = Subject.objects.create(name='English')
+        self.class_level = ClassLevel.objects.create(subject=subject, name='Grade 3', level_number=3)
+        self.topics = [
+            Topic.objects.create(class_level=self.class_level, title=f'Topic {number}', order=number)
+            for number in range(1, 4)
+        ]
+        self.progress = UserProgress.objects.create(user=self.user, class_level=self.class_level)
+        self.progress.recompute()
+
+    def test_recompute_counts_topics(self):
+        self.assertEqual(self.progress.total_topics, 3)
+        self.assertEqual(self.progress.topics_completed, 0)
+
+    def test_topic_completion_applies_delta(self):
+        """Completing and un-completing a topic updates counters without a recount"""
+        topic_progress = TopicProgress.objects.create(user=self.user, topic=self.topics[0], is_started=True)
+
+        with self.assertNumQueries(2):
+            topic_progress.is_completed = True
+            topic_progress.save()
+
+        self.progress.refresh_from_db()
+        self.assertEqual(self.progress.topics_completed, 1)
+
+        topic_progress = TopicProgress.objects.get(pk=topic_progress.pk)
+        topic_progress.is_completed = False
+        topic_progress.save()
+        self.progress.refresh_from_db()
+        self.assertEqual(self.progress.topics_completed, 0)
+
+    def test_refresh_before_save_does_not_reapply_delta(self):
+        topic_progress = TopicProgress.objects.create(user=self.user, topic=self.topics[0])
+        other = TopicProgress.objects.get(pk=topic_progress.pk)
+        other.is_completed = True
+        other.save()
+
+        topic_progress.refresh_from_db()
+        topic_progress.study_time = 5
+        topic_progress.save()
+
+        self.progress.refresh_from_db()
+        self.assertEqual(self.progress.topics_completed, 1)
+
+    def test_inactive_topic_completion_is_not_counted(self):
+        Topic.objects.filter(pk=self.topics[2].pk).update(is_active=False)
+        self.progress.recompute()
+        topic_progress = TopicProgress.objects.create(user=self.user, topic=Topic.objects.get(pk=self.topics[2].pk))
+
+        topic_progress.is_completed = True
+        topic_progress.save()
+
+        self.progress.refresh_from_db()
+        self.assertEqual((self.progress.total_topics, self.progress.topics_completed), (2, 0))
+
+    def test_completing_all_topics_completes_level(self):
+        for topic in self.topics:
+            TopicProgress.objects.create(user=self.user, topic=topic, is_completed=True)
+
+        self.progress.refresh_from_db()
+        self.assertEqual(self.progress.topics_completed, 3)
+        self.assertTrue(self.progress.is_completed)
+        self.assertIsNotNone(self.progress.completed_at)
+
+    def test_uncompleting_a_topic_reopens_level(self):
+        completions = [
+            TopicProgress.objects.create(user=self.user, topic=topic, is_completed=True) for topic in self.topics
+        ]
+
+        completions[0].delete()
+
+        self.progress.refresh_from_db()
+        self.assertEqual(self.progress.topics_completed, 2)
+        self.assertFalse(self.progress.is_completed)
+        self.assertIsNone(self.progress.completed_at)
+
+    def test_passed_level_stays_completed(self):
+        completions = [
+            TopicProgress.objects.create(user=self.user, topic=topic, is_completed=True) for topic in self.topics
+        ]
+        UserProgress.objects.filter(pk=self.progress.pk).update(passed=True)
+
+        completions[0].is_completed = False
+        completions[0].save()
+
+        self.progress.refresh_from_db()
+        self.assertTrue(self.progress.is_completed)
+
+    def test_reconcile_command_repairs_drift(self):
+        TopicProgress.objects.create(user=self.user, topic=self.topics[0], is_completed=True)
+        UserProgress.objects.filter(pk=self.progress.pk).update(topics_completed=0, total_topics=7)
+
+        call_command('reconcile_progress', stdout=open('/dev/null', 'w'))
+
+        self.progress.refresh_from_db()
+        self.assertEqual(self.progress.total_topics, 3)
+        self.assertEqual(self.progress.topics_completed, 1)
+
+
+class DailyActivityIndexTestCase(TestCase):
+    """Test cases for streaks and weekly activity from the daily index"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='streak@test.com', password='testpass123')
+        subject = Subject.objects.create(name='Science')
+        class_level = ClassLevel.objects.create(subject=subject, name='Grade 2', level_number=2)
+        self.topic = Topic.objects.create(class_level=class_level, title='Water', order=1)
+
+        now = timezone.now()
+        # Today and the 3 days before, twice on one day, then a gap and an older day
+        for days_ago in [0, 1, 1, 2, 3, 5]:
+            StudySession.objects.create(user=self.user, topic=self.topic, started_at=now - timedelta(days=days_ago))
+
+    def test_index_is_loaded_with_one_query(self):
+        with self.assertNumQueries(1):
+            activity = DailyActivityIndex.for_user(self.user)
+            streak = activity.current_streak()
+            week = activity.week_activity()
+
+        self.assertEqual(streak, 4)
+        self.assertEqual(len(week), 7)
+        self.assertEqual([day['studied'] for day in week], [False, True, False, True, True, True, True])
+        self.assertEqual(activity.days[timezone.now().date() - timedelta(days=1)]['sessions'], 2)
+
+    def test_active_days_since(self):
+        activity = DailyActivityIndex.for_user(self.user, max_days=7)
+        today = timezone.now().date()
 
-# Create your tests here.
+        self.assertEqual(activity.active_days_since(today - timedelta(days=7)), 5)
+        self.assertIsNotNone(activity.first_session_since(today - timedelta(days=7)))
+        self.assertIsNone(activity.first_session_since(today + timedelta(days=1)))
@@ -0,0 +1,66 @@
+"""
+Progress maintenance utilities
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import UserProgress, TopicProgress
+
+
+def reconcile_user_progress(user_ids=None, class_level_ids=None):
+    """
+    Rebuild UserProgress counters from TopicProgress with grouped aggregates.
+
+    Totals are counted once per class level and completions once per
+    (user, class level), then only the drifted rows are written back with
+    ``bulk_update``. Returns the number of updated records.
+    """
+    from subjects.models import Topic
+
+    progress_records = UserProgress.objects.all()
+    topics = Topic.objects.filter(is_active=True)
+    completions = TopicProgress.objects.filter(is_completed=True, topic__is_active=True)
+
+    if user_ids is not None:
+        progress_records = progress_records.filter(user_id__in=user_ids)
+        completions = completions.filter(user_id__in=user_ids)
+    if class_level_ids is not None:
+        progress_records = progress_records.filter(class_level_id__in=class_level_ids)
+        topics = topics.filter(class_level_id__in=class_level_ids)
+        completions = completions.filter(topic__class_level_id__in=class_level_ids)
+
+    totals = dict(
+        topics.values('class_level_id').annotate(count=Count('id')).values_list('class_level_id', 'count')
+    )
+
+    completed = defaultdict(int)
+    for row in completions.values('user_id', 'topic__class_level_id').annotate(count=Count('id')):
+        completed[(row['user_id'], row['topic__class_level_id'])] = row['count']
+
+    now = timezone.now()
+    changed = []
+    for progress in progress_records.iterator(chunk_size=2000):
+        total_topics = totals.get(progress.class_level_id, 0)
+        topics_completed = completed[(progress.user_id, progress.class_level_id)]
+
+        if progress.total_topics == total_topics and progress.topics_completed == topics_completed:
+            continue
+
+        progress.total_topics = total_topics
+        progress.topics_completed = topics_completed
+        if topics_completed == total_topics and total_topics > 0:
+            progress.is_completed = True
+            if not progress.completed_at:
+                progress.completed_at = now
+        progress.updated_at = now
+        changed.append(progress)
+
+    UserProgress.objects.bulk_update(
+        changed,
+        ['total_topics', 'topics_completed', 'is_completed', 'completed_at', 'updated_at'],
+        batch_size=500
+    )
+    return len(changed)
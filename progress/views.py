@@ -4,6 +4,7 @@ from django.core.paginator import Paginator
 from django.db.models import Sum, Avg
 from django.utils import timezone
 from datetime import timedelta
+from .activity import DailyActivityIndex
 from .models import UserProgress, TopicProgress, StudySession
 from subjects.models import Subject, Topic
 from content.models import Quiz, Test
@@ -171,47 +172,11 @@ class ProgressOverviewView(LoginRequiredMixin, TemplateView):
             total=Sum('duration')
         )['total'] or 0
 
-        # Calculate study streak and week activity
-        from datetime import datetime, timedelta
-        today = timezone.now().date()
-
-        # Calculate study streak (consecutive days with study sessions)
-        study_streak = 0
-        current_date = today
-        while True:
-            sessions_on_date = StudySession.objects.filter(
-                user=user,
-                started_at__date=current_date
-            ).exists()
-
-            if sessions_on_date:
-                study_streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
-
-            # Limit to reasonable streak calculation
-            if study_streak > 365:
-                break
-
-        # Calculate this week's activity (last 7 days)
-        week_activity = []
-        week_study_days = 0
-        for i in range(7):
-            date = today - timedelta(days=6-i)
-            has_sessions = StudySession.objects.filter(
-                user=user,
-                started_at__date=date
-            ).exists()
-
-            if has_sessions:
-                week_study_days += 1
-
-            week_activity.append({
-                'date': date,
-                'studied': has_sessions,
-                'partial': False  # Could be enhanced to show partial study days
-            })
+        # Calculate study streak and week activity from one grouped query
+        activity = DailyActivityIndex.for_user(user)
+        study_streak = activity.current_streak()
+        week_activity = activity.week_activity()
+        week_study_days = sum(1 for day in week_activity if day['studied'])
 
         # Get recent achievements (last 5)
         recent_achievements = []
@@ -264,7 +229,6 @@ class AchievementsView(LoginRequiredMixin, TemplateView):
         quiz_attempts = Quiz.objects.filter(user=user)
         test_attempts = Test.objects.filter(user=user)
         topic_progress = TopicProgress.objects.filter(user=user)
-        study_sessions = StudySession.objects.filter(user=user)
 
         # Achievement calculations
         achievements_earned = 0
@@ -320,9 +284,9 @@ class AchievementsView(LoginRequiredMixin, TemplateView):
 
         # Study Streak Achievement (7 consecutive days)
         # Check if user has study sessions in last 7 days
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        recent_sessions = study_sessions.filter(started_at__gte=seven_days_ago)
-        unique_days = recent_sessions.values('started_at__date').distinct().count()
+        seven_days_ago = (timezone.now() - timedelta(days=7)).date()
+        activity = DailyActivityIndex.for_user(user, max_days=7)
+        unique_days = activity.active_days_since(seven_days_ago)
 
         if unique_days >= 7:
             achievements_earned += 1
@@ -332,7 +296,7 @@ class AchievementsView(LoginRequiredMixin, TemplateView):
                 'description': 'Study for 7 consecutive days',
                 'points': 25,
                 'earned': True,
-                'earned_date': recent_sessions.last().started_at,
+                'earned_date': activity.first_session_since(seven_days_ago),
                 'category': 'progress',
                 'icon': 'fas fa-fire'
             })
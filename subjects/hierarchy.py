@@ -0,0 +1,34 @@
+"""
+Name lookups over the subject, class level and topic hierarchy.
+
+CSV imports refer to subjects, class levels and topics by name, matched
+case-insensitively through ``name_key``. An import resolves each name once
+into an ImportHierarchy and reuses the ids for its later rows. Nothing is
+kept across imports: they run in a job process that never sees the web
+process's renames and deletes, so every import reads the current rows.
+"""
+
+
+def name_key(name):
+    """
+    Case-insensitive key of a subject, class level or topic name.
+
+    Stored names are normalised with this too, in Python, rather than with
+    the database's LOWER(), which on SQLite only folds ASCII letters.
+    """
+    return name.casefold()
+
+
+class ImportHierarchy:
+    """
+    Hierarchy ids resolved during one import, keyed by ``name_key`` names.
+
+    ``subjects`` maps a subject name, ``class_levels`` a (subject, class level)
+    name pair and ``topics`` a (subject, class level, topic) name triple to
+    the row's id.
+    """
+
+    def __init__(self):
+        self.subjects = {}
+        self.class_levels = {}
+        self.topics = {}
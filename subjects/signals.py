@@ -0,0 +1,21 @@
+"""
+Signal handlers for the subjects app
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from content.models import Question, StudyNote
+from .models import Topic
+from .topic_listing import invalidate_topic_listings
+
+
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=StudyNote)
+@receiver(post_delete, sender=StudyNote)
+def invalidate_listings_for_content(sender, instance, **kwargs):
+    """Topics, question counts and note availability shown to visitors changed"""
+    invalidate_topic_listings()
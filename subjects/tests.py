@@ -1,3 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from content.models import Question, StudyNote
+from progress.models import TopicProgress
+from .models import Subject, ClassLevel, Topic
+from .topic_listing import get_topic_listing
+
+
+class TopicListingTestCase(TestCase):
+    """Test cases for the shared topic listing queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='reader@test.com', password='testpass123')
+
+        subject = Subject.objects.create(name='Social Studies')
+        self.class_level = ClassLevel.objects.create(subject=subject, name='Grade 6', level_number=6)
+        self.topics = [
+            Topic.objects.create(class_level=self.class_level, title=f'Topic {number}', order=number)
+            for number in range(1, 6)
+        ]
+
+        for topic in self.topics[:3]:
+            for number in range(2):
+                Question.objects.create(topic=topic, question_text=f'{topic.title} Q{number}', correct_answer='a')
+        Question.objects.create(topic=self.topics[3], question_text='Retired', correct_answer='a', is_active=False)
+        StudyNote.objects.create(topic=self.topics[0], title='Notes', content='Content')
+
+        TopicProgress.objects.create(user=self.user, topic=self.topics[1], is_started=True, is_completed=True)
+
+    def test_user_listing_uses_two_queries(self):
+        """Content availability and progress do not cost per-topic queries"""
+        with self.assertNumQueries(2):
+            topics = get_topic_listing(self.class_level, self.user)
+
+        self.assertEqual([topic.question_count for topic in topics], [2, 2, 2, 0, 0])
+        self.assertEqual([topic.has_questions for topic in topics], [True, True, True, False, False])
+        self.assertEqual([topic.has_study_notes for topic in topics], [True, False, False, False, False])
+        self.assertIsNone(topics[0].topic_progress)
+        self.assertTrue(topics[1].topic_progress.is_completed)
+
+    def test_anonymous_listing_is_cached_until_content_changes(self):
+        topics = get_topic_listing(self.class_level, AnonymousUser())
+        self.assertIsNone(topics[1].topic_progress)
+
+        with self.assertNumQueries(0):
+            get_topic_listing(self.class_level, AnonymousUser())
+
+        StudyNote.objects.create(topic=self.topics[2], title='More notes', content='Content')
+
+        topics = get_topic_listing(self.class_level, AnonymousUser())
+        self.assertTrue(topics[2].has_study_notes)
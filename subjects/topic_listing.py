@@ -0,0 +1,84 @@
+"""
+Topic listing queries shared by the topic, quiz topic and learn pages.
+
+Active topics of a class level are loaded with their active question count
+and study note availability annotated in one query. For signed-in users the
+user's TopicProgress rows are prefetched with a second query. The anonymous
+listing is cached per class level and refreshed when topics, questions or
+study notes change; its version lives in the "shared" cache, so changes made
+by a CSV import in the job process reach the web process too.
+"""
+
+from django.core.cache import cache, caches
+from django.db.models import Count, Exists, OuterRef, Prefetch, Q
+
+from content.models import StudyNote
+from progress.models import TopicProgress
+
+TOPIC_LISTING_TIMEOUT = 60 * 15  # 15 minutes
+VERSION_KEY = 'topic_listing_version'
+LISTING_KEY = 'topic_listing_{class_level_id}_v{version}'
+
+
+def annotated_topics(class_level, user=None):
+    """
+    Active topics of a class level ordered for display.
+
+    Each topic has ``question_count`` and ``has_study_notes`` annotations;
+    when ``user`` is given the user's progress rows are prefetched into
+    ``user_topic_progress``.
+    """
+    topics = class_level.topics.filter(is_active=True).annotate(
+        question_count=Count('questions', filter=Q(questions__is_active=True)),
+        has_study_notes=Exists(StudyNote.objects.filter(topic=OuterRef('pk'), is_active=True))
+    ).order_by('order')
+
+    if user is not None:
+        topics = topics.prefetch_related(Prefetch(
+            'user_progress',
+            queryset=TopicProgress.objects.filter(user=user).order_by(),
+            to_attr='user_topic_progress'
+        ))
+    return topics
+
+
+def _finalize(topics, with_progress):
+    for topic in topics:
+        topic.has_questions = topic.question_count > 0
+        topic.is_available = True  # All topics are available - users choose their own learning path
+        if with_progress:
+            topic.topic_progress = topic.user_topic_progress[0] if topic.user_topic_progress else None
+        else:
+            topic.topic_progress = None
+    return topics
+
+
+def get_topic_listing(class_level, user=None):
+    """
+    List a class level's topics with content availability and progress.
+
+    Returns Topic instances with ``question_count``, ``has_questions``,
+    ``has_study_notes``, ``is_available`` and ``topic_progress`` (the user's
+    TopicProgress, or None when there is none or no user).
+    """
+    if user is not None and user.is_authenticated:
+        return _finalize(list(annotated_topics(class_level, user)), with_progress=True)
+
+    version = caches['shared'].get(VERSION_KEY, 0)
+    key = LISTING_KEY.format(class_level_id=class_level.id, version=version)
+
+    topics = cache.get(key)
+    if topics is None:
+        topics = _finalize(list(annotated_topics(class_level)), with_progress=False)
+        cache.set(key, topics, TOPIC_LISTING_TIMEOUT)
+    return topics
+
+
+def invalidate_topic_listings():
+    """Drop all cached anonymous topic listings"""
+    shared_cache = caches['shared']
+    try:
+        shared_cache.incr(VERSION_KEY)
+    except ValueError:
+        # Missing key: start after the implicit version 0
+        shared_cache.set(VERSION_KEY, 1, None)
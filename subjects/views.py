@@ -11,6 +11,8 @@ import json
 from .models import Subject, ClassLevel, Topic
 from content.models import StudyNote
 from progress.models import UserProgress, StudyNoteProgress
+from core.dashboard import get_dashboard_data
+from .topic_listing import get_topic_listing
 
 
 class SubjectListView(TemplateView):
@@ -37,48 +39,20 @@ class SimpleLearnView(TemplateView):
             # Get user's current grade
             user_grade = self.request.user.current_class_level or 5
 
-            # Get subjects available for user's current grade
-            subjects = Subject.objects.filter(
-                classlevels__level_number=user_grade,
-                is_active=True
-            ).distinct().order_by('order')
-
-            # Get progress data for each subject
-            subjects_with_progress = []
-            completed_subjects = 0
-            total_subjects = subjects.count()
-
-            for subject in subjects:
-                try:
-                    # Get the class level for this subject and user's grade
-                    class_level = ClassLevel.objects.get(
-                        subject=subject,
-                        level_number=user_grade,
-                        is_active=True
-                    )
-
-                    # Get or create user progress for this subject
-                    progress, created = UserProgress.objects.get_or_create(
-                        user=self.request.user,
-                        class_level=class_level,
-                        defaults={'is_started': False}
-                    )
+            # Subjects with progress for the grade, shared with the dashboard snapshot
+            grade_subjects = get_dashboard_data(self.request.user, user_grade)['current_grade_subjects']
+            total_subjects = len(grade_subjects)
 
-                    # Update progress if needed
-                    if created or progress.total_topics == 0:
-                        progress.update_progress()
-
-                    if progress.is_completed:
-                        completed_subjects += 1
-
-                    subjects_with_progress.append({
-                        'subject': subject,
-                        'progress': progress
-                    })
-
-                except ClassLevel.DoesNotExist:
-                    # Subject doesn't have this grade level
-                    continue
+            # Subjects whose class level for this grade is inactive are not listed
+            subjects_with_progress = [
+                {
+                    'subject': subject_data['subject'],
+                    'progress': subject_data['progress']
+                }
+                for subject_data in grade_subjects
+                if subject_data['class_level'].is_active
+            ]
+            completed_subjects = sum(1 for item in subjects_with_progress if item['progress'].is_completed)
 
             # Calculate overall completion rate
             completion_rate = (completed_subjects / total_subjects * 100) if total_subjects > 0 else 0
@@ -307,54 +281,25 @@ class TopicListView(TemplateView):
         subject = get_object_or_404(Subject, id=subject_id, is_active=True)
         level = get_object_or_404(ClassLevel, id=level_id, subject=subject, is_active=True)
 
-        topics = level.topics.filter(is_active=True).order_by('order')
-
-        # Add content availability information
-        from content.models import Question, StudyNote
+        # Topics with content availability (and the user's progress) in one or two queries
+        topics = get_topic_listing(level, self.request.user)
 
         # Add user progress data for authenticated users
         if self.request.user.is_authenticated:
             from progress.models import TopicProgress, UserProgress
 
-            # Get user progress for each topic
-            topics_with_progress = []
             completed_topics = 0
             total_duration = 0
 
             for topic in topics:
-                # Check content availability
-                has_questions = Question.objects.filter(topic=topic, is_active=True).exists()
-                has_study_notes = StudyNote.objects.filter(topic=topic, is_active=True).exists()
-
-                # Get or create topic progress
-                try:
-                    topic_progress = TopicProgress.objects.get(
-                        user=self.request.user,
-                        topic=topic
-                    )
-                except TopicProgress.DoesNotExist:
+                if topic.topic_progress is None:
                     # Create a new progress object but don't save it yet
-                    topic_progress = TopicProgress(
+                    topic.topic_progress = TopicProgress(
                         user=self.request.user,
                         topic=topic
                     )
 
-                # All topics are available - no locking based on previous completion
-                # Users can choose their own learning path
-                is_available = True
-
-                # Store progress data and content availability as attributes
-                setattr(topic, 'topic_progress', topic_progress)
-                setattr(topic, 'is_available', is_available)
-                setattr(topic, 'has_questions', has_questions)
-                setattr(topic, 'has_study_notes', has_study_notes)
-
-                topics_with_progress.append({
-                    'topic': topic,
-                    'user_progress': topic_progress
-                })
-
-                if topic_progress.is_completed:
+                if topic.topic_progress.is_completed:
                     completed_topics += 1
 
                 total_duration += topic.estimated_duration or 15
@@ -363,33 +308,18 @@ class TopicListView(TemplateView):
             user_progress_percentage = (completed_topics / len(topics)) * 100 if topics else 0
 
             # Get or create class level progress
-            try:
-                class_progress = UserProgress.objects.get(
-                    user=self.request.user,
-                    class_level=level
-                )
-            except UserProgress.DoesNotExist:
-                class_progress = UserProgress.objects.create(
-                    user=self.request.user,
-                    class_level=level
-                )
+            class_progress, created = UserProgress.objects.get_or_create(
+                user=self.request.user,
+                class_level=level
+            )
 
-            context['topics'] = [item['topic'] for item in topics_with_progress]
+            context['topics'] = topics
             context['completed_topics'] = completed_topics
             context['user_progress_percentage'] = user_progress_percentage
             context['total_duration'] = total_duration
             context['class_progress'] = class_progress
         else:
-            # For non-authenticated users, just show topics without progress but with content availability
-            for topic in topics:
-                # Check content availability
-                has_questions = Question.objects.filter(topic=topic, is_active=True).exists()
-                has_study_notes = StudyNote.objects.filter(topic=topic, is_active=True).exists()
-
-                setattr(topic, 'is_available', True)  # Show all as available for visitors
-                setattr(topic, 'topic_progress', None)
-                setattr(topic, 'has_questions', has_questions)
-                setattr(topic, 'has_study_notes', has_study_notes)
+            # For non-authenticated users, show topics without progress but with content availability
             context['topics'] = topics
             context['completed_topics'] = 0
             context['user_progress_percentage'] = 0
@@ -568,7 +498,6 @@ class QuizTopicsView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        from content.models import Question
 
         grade_number = kwargs.get('grade_number')
         subject_id = kwargs.get('subject_id')
@@ -583,48 +512,37 @@ class QuizTopicsView(TemplateView):
         )
 
         # Get topics with questions for this subject/level
-        topics = class_level.topics.filter(is_active=True).order_by('order')
+        topics = get_topic_listing(class_level, self.request.user)
 
         topics_data = []
         for topic in topics:
-            question_count = Question.objects.filter(
-                topic=topic,
-                is_active=True
-            ).count()
-
-            if question_count > 0:
+            if topic.has_questions:
                 # Check if user has completed this topic and get progress details
                 is_completed = False
                 progress_percentage = 0
                 best_score = 0
                 attempts_count = 0
 
-                if self.request.user.is_authenticated:
-                    from progress.models import TopicProgress
-                    topic_progress = TopicProgress.objects.filter(
-                        user=self.request.user,
-                        topic=topic
-                    ).first()
-
-                    if topic_progress:
-                        is_completed = topic_progress.is_completed
-                        best_score = topic_progress.best_quiz_score
-
-                        # Calculate progress percentage based on completion status
-                        if is_completed:
-                            progress_percentage = 100
-                        elif topic_progress.quiz_completed:
-                            # Quiz attempted but not passed
-                            progress_percentage = 50
-                        elif topic_progress.is_started:
-                            # Started but no quiz taken
-                            progress_percentage = 25
-                        else:
-                            progress_percentage = 0
+                topic_progress = topic.topic_progress
+                if topic_progress:
+                    is_completed = topic_progress.is_completed
+                    best_score = topic_progress.best_quiz_score
+
+                    # Calculate progress percentage based on completion status
+                    if is_completed:
+                        progress_percentage = 100
+                    elif topic_progress.quiz_completed:
+                        # Quiz attempted but not passed
+                        progress_percentage = 50
+                    elif topic_progress.is_started:
+                        # Started but no quiz taken
+                        progress_percentage = 25
+                    else:
+                        progress_percentage = 0
 
                 topics_data.append({
                     'topic': topic,
-                    'question_count': question_count,
+                    'question_count': topic.question_count,
                     'is_completed': is_completed,
                     'progress_percentage': progress_percentage,
                     'best_score': best_score,
@@ -899,35 +817,13 @@ class QuizTopicsWithProgressAPIView(View):
                 is_active=True
             )
 
-            from content.models import Question
-            from progress.models import TopicProgress
-
-            topics = level.topics.filter(is_active=True).order_by('order')
+            topics = get_topic_listing(level, request.user)
 
             topics_data = []
             for topic in topics:
-                # Count active questions for this topic
-                question_count = Question.objects.filter(
-                    topic=topic,
-                    is_active=True
-                ).count()
-
                 # Only include topics with questions
-                if question_count > 0:
-                    # Get user progress if authenticated
-                    is_completed = False
-                    progress_percentage = 0
-
-                    if request.user.is_authenticated:
-                        try:
-                            topic_progress = TopicProgress.objects.get(
-                                user=request.user,
-                                topic=topic
-                            )
-                            is_completed = topic_progress.is_completed
-                            progress_percentage = topic_progress.completion_percentage
-                        except TopicProgress.DoesNotExist:
-                            pass
+                if topic.has_questions:
+                    topic_progress = topic.topic_progress
 
                     topics_data.append({
                         'id': str(topic.id),
@@ -936,9 +832,9 @@ class QuizTopicsWithProgressAPIView(View):
                         'order': topic.order,
                         'estimated_duration': topic.estimated_duration,
                         'difficulty_level': topic.difficulty_level,
-                        'question_count': question_count,
-                        'is_completed': is_completed,
-                        'progress_percentage': progress_percentage
+                        'question_count': topic.question_count,
+                        'is_completed': topic_progress.is_completed if topic_progress else False,
+                        'progress_percentage': topic_progress.completion_percentage if topic_progress else 0
                     })
 
             return JsonResponse({